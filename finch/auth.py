@@ -3,8 +3,6 @@
 import base64
 import sys
 
-from oauthlib.oauth1 import rfc5849
-
 if sys.version > "3":
     unicode = str
 
@@ -33,6 +31,9 @@ def _basic_auth_str(username, password=None):
 
 class OAuth1(object):
     def __init__(self, client_key, client_secret, resource_owner_key, resource_owner_secret):
+        # oauthlib is only imported when OAuth1 is used
+        from oauthlib.oauth1 import rfc5849
+
         self._oauth_client = rfc5849.Client(
             client_key=client_key,
             client_secret=client_secret,
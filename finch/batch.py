@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sending the requests of many collection operations in a single
+batch request.
+
+A :class:`Batch` is used as the client of the collections whose
+operations should be batched. Their requests are collected until
+:meth:`Batch.send` is called::
+
+    batch = Batch(session, '/batch', format=MultipartFormat())
+    users, repos = Users(batch), Repos(batch)
+
+    users.get(1, on_user)
+    repos.add(repo, on_repo)
+    users.delete(user, on_deleted)
+
+    batch.send()
+
+The batch response is split back into a response for each operation,
+so every callback runs just as if its request had been sent alone.
+
+The batch request is sent with the earliest deadline of its operations.
+An operation cancelled after the batch was sent runs its callback with
+:class:`errors.Cancelled` at once, and the batch request is cancelled
+when all of them are. Batch requests are ``POST`` requests, so they are
+never hedged.
+
+"""
+
+try:
+    from http.client import BAD_REQUEST, responses
+except ImportError:
+    from httplib import BAD_REQUEST, responses
+
+import uuid
+from functools import partial
+from io import BytesIO
+
+from tornado import escape, httpclient, httputil
+
+from finch import errors
+from finch.body import body_view, json_decode
+from finch.deadline import Deadline
+
+
+class Batch(object):
+    """Collects the requests fetched through it and sends them to `url`
+    with `client`, encoded with `format` (a :class:`JSONArrayFormat`
+    by default).
+
+    The batch response is limited to `max_body_size` bytes, and the
+    response of each operation to the `max_body_size` it was fetched
+    with.
+
+    """
+
+    accepts_fetch_options = True
+
+    def __init__(self, client, url, format=None, max_body_size=None):
+        self.client = client
+        self.url = url
+        self.format = format or JSONArrayFormat()
+        self.max_body_size = max_body_size
+
+        self._operations = []
+
+    def __len__(self):
+        return len(self._operations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        if type_ is None:
+            self.send()
+
+    def fetch(self, url, callback, params=None, hedge=None, deadline=None,
+              max_body_size=None, **kwargs):
+
+        if params is not None:
+            url = httputil.url_concat(url, params)
+
+        kwargs['headers'] = httputil.HTTPHeaders(kwargs.get('headers') or {})
+        request = httpclient.HTTPRequest(url=url, **kwargs)
+        self._operations.append(
+            _Operation(request, callback, deadline, max_body_size))
+
+    def send(self, callback=None, deadline=None):
+        """Sends the collected requests and runs `callback(error)` once
+        every operation got its response.
+
+        Operations cancelled before sending are left out. The batch
+        request expires with `deadline` or the earliest deadline of the
+        operations, whichever comes first.
+
+        """
+
+        operations, self._operations = self._operations, []
+        pending = []
+
+        for operation in operations:
+            if operation.deadline is not None and operation.deadline.cancelled:
+                operation.fail(errors.Cancelled())
+            else:
+                pending.append(operation)
+
+        if not pending:
+            if callback is not None:
+                callback(None)
+            return
+
+        body, content_type = self.format.encode(
+            [operation.request for operation in pending])
+
+        deadline = _earliest(pending, Deadline.from_timeout(deadline))
+
+        for operation in pending:
+            operation.watch(partial(self._on_cancel, pending, deadline))
+
+        options = {}
+
+        if getattr(self.client, 'accepts_fetch_options', False):
+            options['deadline'] = deadline
+            options['max_body_size'] = self.max_body_size
+
+        self.client.fetch(
+            self.url,
+            method='POST',
+            headers={'Content-Type': content_type},
+            body=body,
+            callback=partial(self.on_send, pending, callback),
+            **options)
+
+    def _on_cancel(self, operations, deadline):
+        if all(operation.done for operation in operations):
+            deadline.cancel()
+
+    def on_send(self, operations, callback, response):
+        # Operations cancelled meanwhile already ran their callbacks
+        for operation in operations:
+            operation.unwatch()
+
+        if response.code >= BAD_REQUEST:
+            error = getattr(response, 'error', None)
+
+            if not isinstance(error, errors.FinchError):
+                error = errors.HTTPError(response.code)
+
+            for operation in operations:
+                operation.fail(error, response.code)
+        else:
+            try:
+                parts = self.format.decode(response, len(operations))
+
+                if len(parts) != len(operations):
+                    raise ValueError(
+                        'The batch response has {} parts for {} requests'.format(
+                            len(parts), len(operations)))
+            except Exception as decode_error:
+                error = errors.BatchError(str(decode_error))
+
+                for operation in operations:
+                    operation.fail(error)
+            else:
+                error = None
+
+                for operation, (code, headers, body) in zip(operations, parts):
+                    operation.respond(code, headers, body)
+
+        if callback is not None:
+            callback(error)
+
+
+class JSONArrayFormat(object):
+    """Sends the requests as a JSON array of objects with their
+    ``method``, ``url``, ``headers`` and ``body``, and expects a JSON
+    array with the ``status``, ``headers`` and ``body`` of each
+    response, in the same order.
+
+    JSON bodies are embedded as JSON values and other bodies as text.
+
+    """
+
+    content_type = 'application/json'
+
+    def encode(self, requests):
+        return escape.json_encode(
+            [_json_request(request) for request in requests]), self.content_type
+
+    def decode(self, response, count):
+        return [_json_response(part) for part in _json_body(response)]
+
+
+class ODataFormat(object):
+    """Sends the requests as an OData JSON batch: a ``requests`` array
+    of objects with an ``id``. The ``responses`` array of the batch
+    response is matched to the requests by their ids, so they can come
+    in any order.
+
+    """
+
+    content_type = 'application/json'
+
+    def encode(self, requests):
+        body = {'requests': []}
+
+        for index, request in enumerate(requests):
+            part = _json_request(request)
+            part['id'] = str(index)
+            body['requests'].append(part)
+
+        return escape.json_encode(body), self.content_type
+
+    def decode(self, response, count):
+        parts = {}
+
+        for part in _json_body(response)['responses']:
+            parts[part['id']] = _json_response(part)
+
+        return [parts[str(index)] for index in range(count) if str(index) in parts]
+
+
+class MultipartFormat(object):
+    """Sends each request as an ``application/http`` part of a
+    ``multipart/mixed`` body and reads the responses from the parts of
+    the ``multipart/mixed`` batch response, in the same order.
+
+    Nested multipart parts, like OData change sets, are not supported.
+
+    """
+
+    def encode(self, requests):
+        boundary = 'batch_{}'.format(uuid.uuid4().hex)
+        body = BytesIO()
+
+        for index, request in enumerate(requests):
+            body.write(escape.utf8(
+                '--{}\r\n'
+                'Content-Type: application/http\r\n'
+                'Content-Transfer-Encoding: binary\r\n'
+                'Content-ID: <{}>\r\n'
+                '\r\n'
+                '{} {} HTTP/1.1\r\n'.format(
+                    boundary, index, request.method, request.url)))
+
+            for name, value in request.headers.get_all():
+                body.write(escape.utf8('{}: {}\r\n'.format(name, value)))
+
+            body.write(b'\r\n')
+
+            if request.body:
+                body.write(request.body)
+
+            body.write(b'\r\n')
+
+        body.write(escape.utf8('--{}--\r\n'.format(boundary)))
+
+        return body.getvalue(), 'multipart/mixed; boundary={}'.format(boundary)
+
+    def decode(self, response, count):
+        boundary = _boundary(response.headers.get('Content-Type', ''))
+        delimiter = b'--' + escape.utf8(boundary)
+        parts = []
+
+        # The first chunk is the preamble and the last one the epilogue
+        for chunk in body_view(response).tobytes().split(delimiter)[1:]:
+            if chunk.startswith(b'--'):
+                break
+
+            parts.append(_http_response(_part_content(chunk)))
+
+        return parts
+
+
+class _Operation(object):
+    def __init__(self, request, callback, deadline, max_body_size):
+        self.request = request
+        self.callback = callback
+        self.deadline = deadline
+        self.max_body_size = max_body_size
+        self.done = False
+
+        self._on_cancel = None
+
+    def watch(self, on_cancelled):
+        """Fails the operation with :class:`errors.Cancelled` as soon as
+        its deadline is cancelled, then runs `on_cancelled`.
+
+        """
+
+        if self.deadline is not None:
+            self._on_cancel = partial(self._cancel, on_cancelled)
+            self.deadline.add_cancel_callback(self._on_cancel)
+
+    def unwatch(self):
+        if self._on_cancel is not None:
+            self.deadline.remove_cancel_callback(self._on_cancel)
+            self._on_cancel = None
+
+    def _cancel(self, on_cancelled):
+        self._on_cancel = None
+        self.fail(errors.Cancelled())
+        on_cancelled()
+
+    def respond(self, code, headers, body):
+        if self.max_body_size is not None and len(body) > self.max_body_size:
+            self.fail(errors.BodyTooLarge(self.max_body_size))
+            return
+
+        self._finish(httpclient.HTTPResponse(
+            self.request, code, headers=headers, buffer=BytesIO(body),
+            reason=responses.get(code, 'Unknown'), request_time=0))
+
+    def fail(self, error, code=599):
+        self._finish(httpclient.HTTPResponse(
+            self.request, code, error=error, request_time=0))
+
+    def _finish(self, response):
+        if not self.done:
+            self.done = True
+            self.callback(response)
+
+
+def _earliest(operations, deadline):
+    # The batch is cancelled with the send deadline, or on its own once
+    # every operation was cancelled
+    earliest = deadline.child() if deadline is not None else Deadline()
+
+    for operation in operations:
+        expires = getattr(operation.deadline, 'expires', None)
+
+        if expires is not None and (earliest.expires is None or
+                                    expires < earliest.expires):
+            earliest.expires = expires
+
+    return earliest
+
+
+def _json_request(request):
+    part = {
+        'method': request.method,
+        'url': request.url,
+        'headers': dict(request.headers),
+    }
+
+    if request.body:
+        if _is_json(request.headers.get('Content-Type')):
+            part['body'] = json_decode(request.body)
+        else:
+            part['body'] = escape.to_unicode(request.body)
+
+    return part
+
+
+def _json_response(part):
+    headers = httputil.HTTPHeaders(part.get('headers') or {})
+    body = part.get('body')
+
+    if body is None:
+        body = b''
+    elif isinstance(body, escape.unicode_type) and not _is_json(
+            headers.get('Content-Type')):
+        body = escape.utf8(body)
+    else:
+        body = escape.utf8(escape.json_encode(body))
+
+    return part['status'], headers, body
+
+
+def _json_body(response):
+    return json_decode(body_view(response))
+
+
+def _is_json(content_type):
+    return content_type is not None and 'json' in content_type
+
+
+def _boundary(content_type):
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.strip().partition('=')
+
+        if name.lower() == 'boundary':
+            return value.strip('"')
+
+    raise ValueError('The batch response is not multipart: {}'.format(
+        content_type))
+
+
+def _part_content(chunk):
+    # Drops the line break after the delimiter, the part headers and the
+    # line break that belongs to the next delimiter
+    _, _, content = chunk.partition(b'\r\n\r\n')
+
+    if content.endswith(b'\r\n'):
+        content = content[:-2]
+
+    return content
+
+
+def _http_response(content):
+    head, _, body = content.partition(b'\r\n\r\n')
+    start_line, _, header_lines = escape.native_str(head).partition('\r\n')
+
+    code = httputil.parse_response_start_line(start_line).code
+    headers = httputil.HTTPHeaders.parse(header_lines)
+
+    return code, headers, body
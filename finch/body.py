@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Access to response bodies without copying them.
+
+``response.body`` copies the whole response buffer into a new bytes
+object, and decoding it as JSON with ``tornado.escape`` makes another
+copy. Custom ``decode`` methods can use :func:`body_view` instead to
+read the buffer in place, and :func:`json_decode` to parse it::
+
+    def decode(self, response):
+        return json_decode(body_view(response))['items']
+
+Sessions with a ``spool_threshold`` read the bodies into a
+:class:`SpooledBody`, which keeps the large ones in a temporary file
+that is mapped into memory once the whole body arrived.
+
+"""
+
+import codecs
+from io import BytesIO
+
+from tornado import escape
+
+from finch import errors
+
+
+def body_view(response):
+    """Returns a `memoryview` of the `response` body. The response
+    buffer is shared, not copied, when the body wasn't read yet.
+
+    """
+
+    buffer_ = getattr(response, 'buffer', None)
+
+    if getattr(response, '_body', None) is None and hasattr(buffer_, 'getbuffer'):
+        return buffer_.getbuffer()
+
+    return memoryview(escape.utf8(response.body))
+
+
+def json_decode(data):
+    """Parses the UTF-8 encoded JSON document in `data`, a `memoryview`
+    or any other bytes-like object, decoding it to text only once.
+
+    """
+
+    if not isinstance(data, escape.unicode_type):
+        data = codecs.decode(data, 'utf-8')
+
+    return escape.json_decode(data)
+
+
+class SpooledBody(object):
+    """The buffer of a response body read in chunks with :meth:`write`.
+
+    Writing more than `max_size` bytes raises
+    :class:`errors.BodyTooLarge`. With a `spool_threshold`, bodies over
+    that many bytes are moved to a temporary file. :meth:`finish` maps
+    that file into memory and closes it, and :meth:`close` (or leaving
+    the body used as a context manager) releases the body.
+
+    """
+
+    def __init__(self, max_size=None, spool_threshold=None):
+        self.max_size = max_size
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self.too_large = False
+
+        self._map = None
+
+        if spool_threshold is None:
+            self._file = BytesIO()
+        else:
+            # Only sessions that spool pay for importing tempfile
+            import tempfile
+            self._file = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+    @property
+    def spooled(self):
+        return self.spool_threshold is not None and self.size > self.spool_threshold
+
+    def expect(self, length):
+        """Raises :class:`errors.BodyTooLarge` right away when the body
+        is announced to be over `max_size` bytes.
+
+        """
+
+        self._check(length)
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        self._check(self.size)
+
+        self._file.write(chunk)
+
+    def _check(self, size):
+        if self.max_size is not None and size > self.max_size:
+            self.too_large = True
+            raise errors.BodyTooLarge(self.max_size)
+
+    def finish(self):
+        """Called once the whole body was written. A spooled body is
+        mapped into memory and its file closed, so the response doesn't
+        hold a file descriptor.
+
+        """
+
+        if not self.spooled or self._map is not None:
+            return
+
+        import mmap
+
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._file.close()
+
+    def getvalue(self):
+        if self._map is not None:
+            return self._map[:]
+
+        if isinstance(self._file, BytesIO):
+            return self._file.getvalue()
+
+        self._file.seek(0)
+
+        return self._file.read()
+
+    def getbuffer(self):
+        if isinstance(self._file, BytesIO):
+            return self._file.getbuffer()
+
+        if not self.spooled:
+            return memoryview(self.getvalue())
+
+        self.finish()
+
+        return memoryview(self._map)
+
+    def close(self):
+        self._file.close()
+
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Still viewed by a memoryview, it is unmapped when the
+                # views are released
+                pass
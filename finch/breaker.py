@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-host circuit breakers, so requests to a failing backend are
+rejected right away instead of waiting for their timeouts."""
+
+import collections
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """Keeps a circuit for each host a :class:`finch.Session` talks to.
+
+    A circuit opens when, among the last `window` requests (and at
+    least `min_requests`), the ratio of failures reaches `failure_rate`.
+    Server errors, timeouts and requests slower than `slow_threshold`
+    seconds are failures.
+
+    An open circuit rejects every request for `reset_timeout` seconds.
+    Then it becomes half-open and lets `half_open_probes` requests
+    through: if all of them succeed the circuit closes again, if any of
+    them fails it opens again.
+
+    """
+
+    def __init__(self, failure_rate=0.5, min_requests=20, window=100,
+                 slow_threshold=None, reset_timeout=30, half_open_probes=1,
+                 clock=time.time):
+
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.slow_threshold = slow_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+
+        self._circuits = {}
+
+    def state(self, host):
+        return self._circuit(host).state
+
+    def allow(self, host):
+        circuit = self._circuit(host)
+
+        if circuit.state == OPEN:
+            if self.clock() - circuit.opened_at < self.reset_timeout:
+                return False
+
+            circuit.half_open()
+
+        if circuit.state == HALF_OPEN:
+            if circuit.probes >= self.half_open_probes:
+                return False
+
+            circuit.probes += 1
+
+        return True
+
+    def record(self, host, response, latency):
+        failed = (response.code >= 500 or
+                  (self.slow_threshold is not None and
+                   latency > self.slow_threshold))
+
+        circuit = self._circuit(host)
+
+        if circuit.state == HALF_OPEN:
+            if failed:
+                circuit.open(self.clock())
+                return
+
+            circuit.successes += 1
+
+            if circuit.successes >= self.half_open_probes:
+                circuit.close()
+            return
+
+        circuit.outcomes.append(failed)
+
+        if len(circuit.outcomes) < self.min_requests:
+            return
+
+        if sum(circuit.outcomes) >= self.failure_rate * len(circuit.outcomes):
+            circuit.open(self.clock())
+
+    def discard(self, host):
+        """Gives back the probe slot of a request that didn't reach
+        the host.
+
+        """
+
+        circuit = self._circuit(host)
+
+        if circuit.state == HALF_OPEN and circuit.probes > 0:
+            circuit.probes -= 1
+
+    def _circuit(self, host):
+        try:
+            return self._circuits[host]
+        except KeyError:
+            return self._circuits.setdefault(host, _Circuit(self.window))
+
+
+class _Circuit(object):
+    def __init__(self, window):
+        self.outcomes = collections.deque(maxlen=window)
+        self.close()
+
+    def open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+
+    def half_open(self):
+        self.state = HALF_OPEN
+        self.probes = 0
+        self.successes = 0
+
+    def close(self):
+        self.state = CLOSED
+        self.opened_at = None
+        self.outcomes.clear()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Write-behind buffering of the objects added to a collection."""
+
+try:
+    from http.client import BAD_REQUEST
+except ImportError:
+    from httplib import BAD_REQUEST
+
+import collections
+import logging
+from functools import partial
+
+from tornado import escape, ioloop
+
+from finch.body import body_view, json_decode
+
+log = logging.getLogger(__name__)
+
+
+class WriteBuffer(object):
+    """Collects the objects added to a `collection` and sends them
+    together when there are `max_size` of them or the oldest one has
+    waited `max_latency` seconds.
+
+    If the collection declares a `batch_url` the new objects are sent
+    in a single `POST` request with a JSON array of their encoded bodies,
+    and the response should be a JSON array with the created resources
+    in the same order (or empty). Otherwise, and for already persisted
+    objects or objects whose body isn't JSON or that decode their own
+    response, they are added with :meth:`Collection.add`, at most
+    `max_concurrency` at a time.
+
+    Every `callback` passed to :meth:`add` is run with its own object
+    or error, just like :meth:`Collection.add` does. An exception raised
+    by a callback is logged and doesn't stop the others from running.
+
+    """
+
+    def __init__(self, collection, max_size=100, max_latency=0.05,
+                 max_concurrency=10):
+
+        self.collection = collection
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.max_concurrency = max_concurrency
+
+        self._pending = []
+        self._timeout = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, obj, callback):
+        self._pending.append((obj, callback))
+
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timeout is None:
+            io_loop = ioloop.IOLoop.current()
+            self._timeout = io_loop.add_timeout(
+                io_loop.time() + self.max_latency, self._on_timeout)
+
+    def _on_timeout(self):
+        self._timeout = None
+        self.flush()
+
+    def flush(self):
+        if self._timeout is not None:
+            ioloop.IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+
+        pending, self._pending = self._pending, []
+
+        new, resources, single = [], [], []
+
+        for item in pending:
+            resource = self._batch_resource(item[0])
+
+            if resource is None:
+                single.append(item)
+            else:
+                new.append(item)
+                resources.append(resource)
+
+        if new:
+            self.request_batch(new, resources)
+        if single:
+            _Burst(self.collection, single, self.max_concurrency).start()
+
+    def _batch_resource(self, obj):
+        # Objects that can't go in a JSON array batch, or whose response
+        # can't be read from it, are added one by one
+        if (self.collection.batch_url is None or
+                getattr(obj, '_persisted', False) is True or
+                hasattr(obj, 'decode')):
+            return None
+
+        body, content_type = self.collection._encode(obj)
+
+        if 'json' not in content_type:
+            return None
+
+        return json_decode(body)
+
+    def request_batch(self, items, resources):
+        body = escape.json_encode(resources)
+
+        self.collection.client.fetch(
+            self.collection.batch_url,
+            method='POST',
+            headers={'Content-Type': 'application/json'},
+            body=body,
+            callback=partial(self.on_batch, items),
+            **self.collection._fetch_options())
+
+    def on_batch(self, items, response):
+        if response.code >= BAD_REQUEST:
+            for _, callback in items:
+                self.collection.on_error(
+                    partial(_run_callback, callback, None), response)
+            return
+
+        data = body_view(response)
+
+        if len(data) == 0:
+            resources = [None] * len(items)
+        else:
+            try:
+                resources = self._decode_batch(response, data)
+
+                if not isinstance(resources, list) or len(resources) != len(items):
+                    raise ValueError(
+                        'The batch response should be a JSON array with a '
+                        'resource for each added object')
+            except Exception as error:
+                for _, callback in items:
+                    _run_callback(callback, None, error)
+                return
+
+        self.collection._invalidate()
+
+        for (obj, callback), resource in zip(items, resources):
+            self.collection._on_added(
+                partial(_run_callback, callback), obj, resource)
+
+    def _decode_batch(self, response, data):
+        if hasattr(self.collection, 'decode_batch'):
+            return self.collection.decode_batch(response)
+
+        return json_decode(data)
+
+
+class _Burst(object):
+    def __init__(self, collection, items, max_concurrency):
+        self.collection = collection
+        self.items = collections.deque(items)
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.starting = False
+
+    def start(self):
+        # Adds that complete at once call start again from _on_add; the
+        # loop below already picks up the freed slots
+        if self.starting:
+            return
+
+        self.starting = True
+
+        try:
+            while self.items and self.active < self.max_concurrency:
+                obj, callback = self.items.popleft()
+                self.active += 1
+                self.collection.add(obj, partial(self._on_add, callback))
+        finally:
+            self.starting = False
+
+    def _on_add(self, callback, obj, error):
+        self.active -= 1
+        _run_callback(callback, obj, error)
+        self.start()
+
+
+def _run_callback(callback, *args):
+    try:
+        callback(*args)
+    except Exception:
+        log.exception('Error in a write buffer callback')
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import time
+
+
+class Cache(object):
+    """An in-memory store of collection results that remembers when
+    each of them was stored.
+
+    With a `max_size`, storing a new result evicts the least recently
+    used one once the cache is full. With a `max_age`, results stored
+    more than `max_age` seconds ago are dropped when they are looked up
+    and whenever a new result is stored.
+
+    """
+
+    def __init__(self, clock=time.time, max_size=None, max_age=None):
+        self.clock = clock
+        self.max_size = max_size
+        self.max_age = max_age
+        # In least recently used order
+        self._entries = collections.OrderedDict()
+        # In the order they were stored, so the expired ones come first
+        self._stored = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+
+        if entry is None:
+            return None
+
+        if self._expired(entry):
+            del self._stored[key]
+            return None
+
+        self._entries[key] = entry
+
+        return entry
+
+    def set(self, key, value):
+        self.delete(key)
+
+        entry = _Entry(value, self.clock())
+        self._entries[key] = entry
+        self._stored[key] = entry
+
+        self._evict()
+
+    def age(self, entry):
+        return self.clock() - entry.stored_at
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+        self._stored.pop(key, None)
+
+    def keys(self):
+        return list(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._stored.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        while self._stored and self._expired(next(iter(self._stored.values()))):
+            key, _ = self._stored.popitem(last=False)
+            del self._entries[key]
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                key, _ = self._entries.popitem(last=False)
+                del self._stored[key]
+
+    def _expired(self, entry):
+        return self.max_age is not None and self.age(entry) >= self.max_age
+
+
+class _Entry(object):
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
@@ -23,44 +23,183 @@ try:
 except ImportError:
     from urllib import splitquery
 
+import copy
+import logging
+import sys
 from functools import partial
 
 import booby.inspection
-from tornado import escape
+from booby import Model
+from tornado import escape, ioloop
 
-from finch import errors
+from finch import errors, hydration, paging, patch, related
+from finch.body import body_view, json_decode
+from finch.cache import Cache
+from finch.deadline import Deadline
+from finch.export import CSV, NDJSON, Exporter
+from finch.results import LazyResult
+from finch.watch import Watch
+
+log = logging.getLogger(__name__)
 
 
 class Collection(object):
     model = None
 
+    fields_param = 'fields'
+    fields_separator = ','
+
+    lazy = False
+    validate_models = False
+
+    decode_executor = None
+    decode_threshold = 1024 * 1024
+
+    max_body_size = None
+
+    hedging = None
+
+    fresh_ttl = None
+    stale_ttl = 0
+    cache_size = None
+
+    batch_url = None
+
+    watch_url = None
+
+    total_header = None
+    page_param = 'page'
+    first_page = 1
+    offset_param = None
+    page_size = None
+    page_size_param = None
+
+    patch_format = None
+
     def __init__(self, client):
         self.client = client
+        self.cache = Cache(max_size=self.cache_size, max_age=self._max_age())
+        self._revalidating = {}
+        self._generation = 0
+        self._references = {}
 
     def on_error(self, callback, response):
-        callback(errors.HTTPError(response.code))
+        error = getattr(response, 'error', None)
+
+        if isinstance(error, errors.FinchError):
+            callback(error)
+        else:
+            callback(errors.HTTPError(response.code))
+
+    def all(self, callback, deadline=None, include=None, parallel_pages=None,
+            on_page=None):
 
-    def all(self, callback):
-        self.request_all(callback)
+        deadline = _deadline(deadline)
 
-    def request_all(self, callback):
-        self.client.fetch(self.url, callback=partial(self.on_query, callback))
+        if on_page is not None:
+            if include:
+                raise ValueError('Included references need the entire collection')
 
-    def query(self, params, callback):
-        self.request_query(callback, params)
+            self.request_pages(parallel_pages or 1, callback, deadline=deadline,
+                               on_page=on_page)
+            return deadline
 
-    def request_query(self, params, callback):
-        self.client.fetch(self.url, params=params, callback=partial(self.on_query, callback))
+        if include:
+            callback = partial(self._on_include, include, deadline, callback)
+
+        if parallel_pages is None:
+            request = partial(self.request_all)
+        else:
+            request = partial(self.request_pages, parallel_pages)
+
+        if self.fresh_ttl is None:
+            request(callback, deadline=deadline)
+        else:
+            self._cached_read(('all', self.url), request, callback, deadline)
+
+        return deadline
+
+    def request_pages(self, parallel_pages, callback, deadline=None, on_page=None):
+        paging.PageRange(self, parallel_pages, deadline, on_page).start(callback)
+
+    def request_all(self, callback, deadline=None):
+        self.client.fetch(self.url,
+            callback=partial(self.on_query, callback, deadline=deadline),
+            **self._fetch_options(deadline, read=True))
+
+    def query(self, params, callback, fields=None, deadline=None, include=None):
+        if callable(params) and not callable(callback):
+            # Positional callers pass the callback first, which is what
+            # query has always forwarded as the callback
+            params, callback = callback, params
+
+        deadline = _deadline(deadline)
+
+        if include:
+            callback = partial(self._on_include, include, deadline, callback)
+
+        request = partial(self.request_query, params, fields=fields)
+
+        if self.fresh_ttl is None:
+            request(callback, deadline=deadline)
+        else:
+            key = ('query', self.url, _canonical_params(params),
+                   None if fields is None else tuple(sorted(fields)))
 
-    def on_query(self, callback, response):
+            self._cached_read(key, request, callback, deadline)
+
+        return deadline
+
+    def request_query(self, params, callback, fields=None, deadline=None):
+        if fields is not None:
+            params = dict(params or {})
+            params[self.fields_param] = self.fields_separator.join(fields)
+
+        self.client.fetch(self.url, params=params,
+            callback=partial(self.on_query, callback, fields=fields, deadline=deadline),
+            **self._fetch_options(deadline, read=True))
+
+    def next_page(self, response):
+        return None
+
+    def total_count(self, response):
+        if self.total_header is None:
+            return None
+
+        try:
+            return int(response.headers[self.total_header])
+        except (KeyError, ValueError):
+            return None
+
+    def page_params(self, index):
+        if self.offset_param is not None:
+            params = {self.offset_param: index * self.page_size}
+        else:
+            params = {self.page_param: self.first_page + index}
+
+        if self.page_size_param is not None and self.page_size is not None:
+            params[self.page_size_param] = self.page_size
+
+        return params
+
+    def on_query(self, callback, response, fields=None, deadline=None, pages=None):
         if response.code >= BAD_REQUEST:
             self.on_error(partial(callback, None), response)
             return
 
-        if hasattr(self, 'decode'):
-            collection = self.decode(response)
-        else:
-            collection = escape.json_decode(response.body)
+        self._decode(getattr(self, 'decode', None), response, partial(
+            self._on_query_decoded, callback, response, fields, deadline, pages))
+
+    def _on_query_decoded(self, callback, response, fields, deadline, pages,
+                          collection, error=None):
+
+        if error is None and deadline is not None and deadline.cancelled:
+            # Cancelled while decoding in an executor
+            error = errors.Cancelled()
+
+        if error is not None:
+            callback(None, error)
+            return
 
         if not isinstance(collection, list):
             callback(None, ValueError("""
@@ -71,44 +210,290 @@ class Collection(object):
 
             return
 
+        if pages is not None:
+            pages.extend(collection)
+            collection = pages
+
+        next_url = self.next_page(response)
+
+        if next_url is not None:
+            self.client.fetch(next_url, callback=partial(
+                self.on_query, callback, fields=fields, deadline=deadline,
+                pages=collection), **self._fetch_options(deadline, read=True))
+            return
+
+        self._on_resources(callback, collection, fields)
+
+    def _on_resources(self, callback, collection, fields=None):
+        hydrate = self._hydrate
+
+        if fields is not None:
+            hydrate = lambda r: self._hydrate(_project(r, fields))
+
+        if self.lazy:
+            callback(LazyResult(collection, hydrate), None)
+            return
+
         result = []
 
         try:
             for r in collection:
-                obj = self.model(**r)
-                obj._persisted = True
-                result.append(obj)
+                result.append(hydrate(r))
         except Exception as error:
             callback(None, error)
         else:
             callback(result, None)
 
-    def get(self, id_, callback):
-        self.request_get(id_, callback)
+    def export(self, fileobj, callback, format=NDJSON, params=None,
+               fields=None, deadline=None):
+
+        if format == CSV and fields is None:
+            fields = list(booby.inspection.get_fields(self.model))
+
+        exporter = Exporter(fileobj, format, fields)
+        deadline = _deadline(deadline)
+
+        self.request_export(exporter, callback, params=params, deadline=deadline)
+
+        return deadline
+
+    def request_export(self, exporter, callback, params=None, deadline=None):
+        if exporter.fields is not None:
+            params = dict(params or {})
+            params[self.fields_param] = self.fields_separator.join(exporter.fields)
 
-    def request_get(self, id_, callback):
-        self.client.fetch(self._url(id_), callback=partial(self.on_get, callback))
+        self.client.fetch(self.url, params=params,
+            callback=partial(self.on_export, exporter, callback, deadline),
+            **self._fetch_options(deadline, read=True))
 
-    def on_get(self, callback, response):
+    def on_export(self, exporter, callback, deadline, response):
         if response.code >= BAD_REQUEST:
             self.on_error(partial(callback, None), response)
             return
 
-        result = self.model()
+        self._decode(getattr(self, 'decode', None), response, partial(
+            self._on_export_decoded, exporter, callback, deadline, response))
+
+    def _on_export_decoded(self, exporter, callback, deadline, response,
+                           collection, error=None):
 
-        if hasattr(result, 'decode'):
-            resource = result.decode(response)
+        if error is None and deadline is not None and deadline.cancelled:
+            error = errors.Cancelled()
+        if error is None and not isinstance(collection, list):
+            error = ValueError('The response body was expected to be a JSON array')
+
+        if error is None:
+            try:
+                exporter.write(collection)
+            except Exception as write_error:
+                error = write_error
+
+        if error is not None:
+            callback(None, error)
+            return
+
+        next_url = self.next_page(response)
+
+        if next_url is not None:
+            self.client.fetch(next_url,
+                callback=partial(self.on_export, exporter, callback, deadline),
+                **self._fetch_options(deadline, read=True))
+            return
+
+        try:
+            exporter.flush()
+        except Exception as error:
+            callback(None, error)
         else:
-            resource = escape.json_decode(response.body)
+            callback(exporter.count, None)
 
+    def watch(self, callback, **options):
+        return Watch(self, **options).start(callback)
+
+    def _on_include(self, include, deadline, callback, result, error):
+        if error is not None:
+            callback(None, error)
+            return
+
+        related.resolve(self, result, include, callback, deadline=deadline)
+
+    def _referenced(self, collection_class):
         try:
-            result.update(resource)
+            return self._references[collection_class]
+        except KeyError:
+            return self._references.setdefault(
+                collection_class, collection_class(self.client))
+
+    def _fetch_options(self, deadline=None, read=False):
+        options = {}
+
+        # A plain tornado client rejects the options it doesn't know
+        if not getattr(self.client, 'accepts_fetch_options', False):
+            return options
+
+        if deadline is not None:
+            options['deadline'] = deadline
+        if read and self.hedging is not None:
+            options['hedge'] = self.hedging
+        if self.max_body_size is not None:
+            options['max_body_size'] = self.max_body_size
+
+        return options
+
+    def _decode_collection(self, response):
+        if hasattr(self, 'decode'):
+            return self.decode(response)
+
+        return json_decode(body_view(response))
+
+    def _hydrate(self, resource):
+        obj = hydration.hydrator(self.model)(resource)
+
+        if self.validate_models:
+            hydration.validator(self.model)(obj)
+
+        self._mark_persisted(obj)
+
+        return obj
+
+    def _mark_persisted(self, obj):
+        obj._persisted = True
+
+        if self.patch_format is not None:
+            patch.snapshot(obj)
+
+    def get(self, id_, callback, deadline=None):
+        deadline = _deadline(deadline)
+        request = partial(self.request_get, id_)
+
+        if self.fresh_ttl is None:
+            request(callback, deadline=deadline)
+        else:
+            self._cached_read(('get', id_), request, callback, deadline)
+
+        return deadline
+
+    def _cached_read(self, key, request, callback, deadline):
+        # The refresh is shared by every caller reading the same key, so
+        # cancelling only discards the callback of the caller that did
+        request = partial(request, deadline=deadline.detached())
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            age = self.cache.age(entry)
+
+            if age < self._max_age():
+                callback(_copy_result(entry.value), None)
+
+                if age >= self.fresh_ttl:
+                    self._revalidate(key, request, None)
+                return
+
+        self._revalidate(key, request, _Cancellable(deadline, callback))
+
+    def _max_age(self):
+        if self.fresh_ttl is not None:
+            return self.fresh_ttl + self.stale_ttl
+
+    def _revalidate(self, key, request, callback):
+        waiting = self._revalidating.get(key)
+
+        if waiting is not None:
+            if callback is not None:
+                waiting.append(callback)
+            return
+
+        self._revalidating[key] = [callback] if callback is not None else []
+
+        request(partial(self._on_revalidated, key, self._generation))
+
+    def _on_revalidated(self, key, generation, result, error):
+        waiting = self._revalidating.pop(key, [])
+
+        # Results fetched before a write may miss it, so aren't cached
+        if error is None and generation == self._generation:
+            self.cache.set(key, result)
+
+        for callback in waiting:
+            callback(_copy_result(result), error)
+
+    def request_get(self, id_, callback, deadline=None):
+        self.client.fetch(self._url(id_),
+            callback=partial(self.on_get, callback, deadline=deadline),
+            **self._fetch_options(deadline, read=True))
+
+    def on_get(self, callback, response, deadline=None):
+        if response.code >= BAD_REQUEST:
+            self.on_error(partial(callback, None), response)
+            return
+
+        result = self.model()
+
+        self._decode(getattr(result, 'decode', None), response,
+                     partial(self._on_get_decoded, callback, result, deadline))
+
+    def _on_get_decoded(self, callback, result, deadline, resource, error=None):
+        if error is None and deadline is not None and deadline.cancelled:
+            # Cancelled while decoding in an executor
+            error = errors.Cancelled()
+
+        if error is not None:
+            callback(None, error)
+            return
+
+        try:
+            hydration.updater(type(result))(result, resource)
+
+            if self.validate_models:
+                hydration.validator(type(result))(result)
         except Exception as error:
             callback(None, error)
         else:
-            result._persisted = True
+            self._mark_persisted(result)
             callback(result, None)
 
+    def _decode(self, decode, response, callback):
+        executor = self.decode_executor
+        data = body_view(response)
+
+        if executor is None or len(data) < self.decode_threshold:
+            if decode is None:
+                callback(json_decode(data))
+            else:
+                callback(decode(response))
+            return
+
+        if decode is None:
+            if _is_process_pool(executor):
+                # Memory views can't be sent to another process
+                data = data.tobytes()
+
+            future = executor.submit(json_decode, data)
+        elif _is_process_pool(executor):
+            # Bound decode methods can't be sent to another process
+            _warn_process_pool(type(self))
+            callback(decode(response))
+            return
+        else:
+            future = executor.submit(decode, response)
+
+        on_decoded = partial(self._on_decoded, callback)
+        diagnostics = getattr(self.client, 'diagnostics', None)
+
+        if diagnostics is not None:
+            on_decoded = diagnostics.timed(
+                on_decoded, url=getattr(response, 'effective_url', None))
+
+        ioloop.IOLoop.current().add_future(future, on_decoded)
+
+    def _on_decoded(self, callback, future):
+        try:
+            result = future.result()
+        except Exception as error:
+            callback(None, error)
+        else:
+            callback(result)
+
     def _url(self, obj_or_id):
         if isinstance(obj_or_id, self.model):
             id_ = self._id(obj_or_id)
@@ -129,28 +514,67 @@ class Collection(object):
 
         return url
 
-    def add(self, obj, callback):
-        self.request_add(obj, callback)
+    def _invalidate(self, id_=None):
+        """Drops the cached results of `all` and `query`, and the cached
+        `get` of `id_`, after a write to the collection.
+
+        """
+
+        self._generation += 1
+
+        for key in self.cache.keys():
+            if key[0] != 'get' or key[1] == id_:
+                self.cache.delete(key)
+
+    def add(self, obj, callback, deadline=None):
+        deadline = _deadline(deadline)
+
+        self.request_add(obj, partial(self._on_written, obj, callback),
+                         deadline=deadline)
+
+        return deadline
+
+    def _on_written(self, obj, callback, result, error):
+        if error is None:
+            self._invalidate(self._id(obj))
+
+        callback(result, error)
+
+    def request_add(self, obj, callback, deadline=None):
+        persisted = getattr(obj, '_persisted', False) is True
+        changed = patch.changed_fields(obj) if persisted else None
+
+        if self.patch_format is not None and changed is not None:
+            if not changed:
+                callback(obj, None)
+                return
 
-    def request_add(self, obj, callback):
-        if getattr(obj, '_persisted', False) is True:
             url = self._url(obj)
-            method = 'PUT'
+            method = 'PATCH'
+            body, content_type = patch.encode(obj, changed, self.patch_format)
         else:
-            url = self.url
-            method = 'POST'
+            if persisted:
+                url = self._url(obj)
+                method = 'PUT'
+            else:
+                url = self.url
+                method = 'POST'
 
-        if hasattr(obj, 'encode'):
-            body, content_type = obj.encode()
-        else:
-            body, content_type = escape.json_encode(dict(obj)), 'application/json'
+            body, content_type = self._encode(obj)
 
         self.client.fetch(
             url,
             method=method,
             headers={'Content-Type': content_type},
             body=body,
-            callback=partial(self.on_add, callback, obj))
+            callback=partial(self.on_add, callback, obj),
+            **self._fetch_options(deadline))
+
+    def _encode(self, obj):
+        if hasattr(obj, 'encode'):
+            return obj.encode()
+
+        return escape.json_encode(dict(obj)), 'application/json'
 
     def _id(self, obj):
         for name, field in booby.inspection.get_fields(obj).items():
@@ -162,36 +586,50 @@ class Collection(object):
             self.on_error(partial(callback, None), response)
             return
 
-        try:
-            obj._url = response.headers['Location']
-        except KeyError:
-            pass
+        data = body_view(response)
 
-        if len(response.body) == 0:
-            obj._persisted = True
-            callback(obj, None)
+        if len(data) == 0:
+            resource = None
+        elif hasattr(obj, 'decode'):
+            resource = obj.decode(response)
         else:
-            if hasattr(obj, 'decode'):
-                resource = obj.decode(response)
-            else:
-                resource = escape.json_decode(response.body)
+            resource = json_decode(data)
 
-            try:
-                obj.update(resource)
-            except Exception as error:
-                callback(None, error)
-            else:
-                obj._persisted = True
-                callback(obj, None)
+        self._on_added(callback, obj, resource, response.headers.get('Location'))
+
+    def _on_added(self, callback, obj, resource, location=None):
+        if location is not None:
+            obj._url = location
+
+        try:
+            if resource is not None:
+                hydration.updater(type(obj))(obj, resource)
+        except Exception as error:
+            callback(None, error)
+        else:
+            self._mark_persisted(obj)
+            callback(obj, None)
+
+    def delete(self, obj, callback, deadline=None):
+        deadline = _deadline(deadline)
+
+        self.request_delete(obj, partial(self._on_deleted, obj, callback),
+                            deadline=deadline)
+
+        return deadline
 
-    def delete(self, obj, callback):
-        self.request_delete(obj, callback)
+    def _on_deleted(self, obj, callback, error):
+        if error is None:
+            self._invalidate(self._id(obj))
 
-    def request_delete(self, obj, callback):
+        callback(error)
+
+    def request_delete(self, obj, callback, deadline=None):
         self.client.fetch(
             self._url(obj),
             method='DELETE',
-            callback=partial(self.on_delete, callback))
+            callback=partial(self.on_delete, callback),
+            **self._fetch_options(deadline))
 
     def on_delete(self, callback, response):
         if response.code >= BAD_REQUEST:
@@ -199,3 +637,102 @@ class Collection(object):
             return
 
         callback(None)
+
+
+def _deadline(timeout):
+    # Every operation has a deadline, even without a time limit, so it
+    # can be cancelled
+    return Deadline.from_timeout(timeout) or Deadline()
+
+
+class _Cancellable(object):
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.done = False
+
+        deadline.add_cancel_callback(self.cancel)
+
+    def __call__(self, result, error):
+        if self.done:
+            return
+
+        self.done = True
+        self.deadline.remove_cancel_callback(self.cancel)
+        self.callback(result, error)
+
+    def cancel(self):
+        if not self.done:
+            self.done = True
+            self.callback(None, errors.Cancelled())
+
+
+def _canonical_params(params):
+    if not params:
+        return ()
+
+    if hasattr(params, 'items'):
+        params = params.items()
+
+    return tuple(sorted((_text(name), _text(value)) for name, value in params))
+
+
+def _text(value):
+    if isinstance(value, (bytes, escape.unicode_type)):
+        return escape.to_unicode(value)
+
+    return escape.to_unicode(str(value))
+
+
+def _project(resource, fields):
+    return dict((name, resource[name]) for name in fields if name in resource)
+
+
+def _is_process_pool(executor):
+    # Looked up lazily, since importing it loads multiprocessing. No
+    # executor can be a process pool until its module was imported.
+    process = sys.modules.get('concurrent.futures.process')
+
+    return (process is not None and
+            isinstance(executor, process.ProcessPoolExecutor))
+
+
+_process_pool_warned = set()
+
+
+def _warn_process_pool(collection_class):
+    if collection_class in _process_pool_warned:
+        return
+
+    _process_pool_warned.add(collection_class)
+    log.warning(
+        '%s defines a decode method, which cannot be run in a process pool. '
+        'Its responses are decoded on the IOLoop thread instead; use a '
+        'thread pool as decode_executor to offload them.',
+        collection_class.__name__)
+
+
+def _copy_result(result):
+    # Every caller gets its own models, so changing one doesn't change
+    # the cached result nor the one other callers got
+    if isinstance(result, LazyResult):
+        return result.copy()
+
+    return _copy_value(result)
+
+
+def _copy_value(value):
+    if isinstance(value, Model):
+        # The fields are the keys of the data, so they must not be copied
+        clone = copy.copy(value)
+        clone._data = dict((field, _copy_value(field_value))
+                           for field, field_value in value._data.items())
+        return clone
+
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+
+    if isinstance(value, dict):
+        return dict((key, _copy_value(item)) for key, item in value.items())
+
+    return copy.deepcopy(value)
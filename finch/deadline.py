@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+
+class Deadline(object):
+    """An overall time budget, in seconds, shared by all the requests
+    needed to complete an operation. Without a `timeout` the operation
+    has no time limit.
+
+    A deadline can also be cancelled, which drops the requests of the
+    operation that are queued and releases the ones in flight. The
+    `Collection` operations return their deadline for that purpose.
+
+    """
+
+    def __init__(self, timeout=None, clock=time.time):
+        self.clock = clock
+        self.expires = None if timeout is None else clock() + timeout
+        self.cancelled = False
+
+        self._cancel_callbacks = []
+
+    @classmethod
+    def from_timeout(cls, timeout):
+        if timeout is None or isinstance(timeout, cls):
+            return timeout
+
+        return cls(timeout)
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+
+        return max(self.expires - self.clock(), 0)
+
+    @property
+    def expired(self):
+        remaining = self.remaining()
+
+        return remaining is not None and remaining <= 0
+
+    def detached(self):
+        """Returns a deadline that expires with this one but is not
+        cancelled with it.
+
+        """
+
+        deadline = Deadline(clock=self.clock)
+        deadline.expires = self.expires
+
+        return deadline
+
+    def child(self):
+        """Returns a deadline that expires and is cancelled with this
+        one, but that can also be cancelled on its own.
+
+        """
+
+        deadline = self.detached()
+        self.add_cancel_callback(deadline.cancel)
+
+        return deadline
+
+    def cancel(self):
+        if self.cancelled:
+            return
+
+        self.cancelled = True
+
+        callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+
+        for callback in callbacks:
+            callback()
+
+    def add_cancel_callback(self, callback):
+        self._cancel_callbacks.append(callback)
+
+    def remove_cancel_callback(self, callback):
+        try:
+            self._cancel_callbacks.remove(callback)
+        except ValueError:
+            pass
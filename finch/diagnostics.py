@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measurement of the IOLoop lag and of the time spent in the callbacks
+and auth hooks finch runs on the IOLoop thread.
+
+A session with diagnostics times the auth hook and the response,
+streaming and header callbacks of every request it fetches. Its
+collections also time the callbacks that run once a `decode_executor`
+finished decoding. Other callbacks, like the timeouts of write buffers,
+hedges and watches, are only seen through the IOLoop lag::
+
+    diagnostics = Diagnostics(slow_threshold=0.05)
+    diagnostics.start()
+
+    session = Session(diagnostics=diagnostics)
+
+"""
+
+import collections
+import sys
+import threading
+import time
+import traceback
+from functools import partial
+
+from tornado import ioloop
+
+SlowCallback = collections.namedtuple(
+    'SlowCallback', 'name collection url duration stack')
+
+
+class Diagnostics(object):
+    """Keeps rolling statistics of the IOLoop lag and of the duration
+    of each timed callback, by name.
+
+    :param slow_threshold: Callbacks that take longer than this number
+        of seconds are recorded as a :class:`SlowCallback` in `slow`,
+        with their collection and url.
+    :param lag_interval: The seconds between the probes that measure
+        how late the IOLoop runs a scheduled callback.
+    :param window: How many durations are kept for the statistics.
+    :param max_slow: How many slow callbacks are kept.
+    :param sample_stacks: If `True` a watchdog thread samples the stack
+        of the IOLoop thread when a callback runs over `slow_threshold`.
+
+    """
+
+    def __init__(self, slow_threshold=0.1, lag_interval=0.5, window=1000,
+                 max_slow=100, sample_stacks=True, clock=time.time):
+
+        self.slow_threshold = slow_threshold
+        self.lag_interval = lag_interval
+        self.window = window
+        self.sample_stacks = sample_stacks
+        self.clock = clock
+
+        self.slow = collections.deque(maxlen=max_slow)
+
+        self._lags = collections.deque(maxlen=window)
+        self._durations = {}
+        self._current = None
+        self._timeout = None
+        self._stopped = None
+        self._thread_id = None
+
+    def start(self):
+        """Starts measuring the lag of the current IOLoop and, with
+        `sample_stacks`, the watchdog thread.
+
+        """
+
+        self._thread_id = threading.current_thread().ident
+        self._probe()
+
+        if self.sample_stacks:
+            self._stopped = threading.Event()
+
+            watchdog = threading.Thread(
+                target=self._watch, args=(self._stopped,), name='finch-diagnostics')
+            watchdog.daemon = True
+            watchdog.start()
+
+    def stop(self):
+        if self._timeout is not None:
+            ioloop.IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+
+        if self._stopped is not None:
+            self._stopped.set()
+            self._stopped = None
+
+    def timed(self, callback, url=None):
+        """Returns a function that runs `callback` and records how long
+        it took.
+
+        """
+
+        name, collection = _describe(callback)
+
+        return partial(self._run, callback, name, collection, url)
+
+    @property
+    def stats(self):
+        return {
+            'lag': _summary(self._lags),
+            'callbacks': dict((name, _summary(durations))
+                              for name, durations in self._durations.items()),
+            'slow': len(self.slow)
+        }
+
+    def _run(self, callback, name, collection, url, *args, **kwargs):
+        call = _Call(name, collection, url, self.clock())
+        previous, self._current = self._current, call
+
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            self._current = previous
+            self._record(call, self.clock() - call.start)
+
+    def _record(self, call, duration):
+        key = call.name if call.collection is None else '{}.{}'.format(
+            call.collection, call.name)
+
+        try:
+            durations = self._durations[key]
+        except KeyError:
+            durations = self._durations.setdefault(
+                key, collections.deque(maxlen=self.window))
+
+        durations.append(duration)
+
+        if duration > self.slow_threshold:
+            self.slow.append(SlowCallback(
+                call.name, call.collection, call.url, duration, call.stack))
+
+    def _probe(self):
+        io_loop = ioloop.IOLoop.current()
+        expected = io_loop.time() + self.lag_interval
+
+        self._timeout = io_loop.add_timeout(
+            expected, partial(self._on_probe, expected))
+
+    def _on_probe(self, expected):
+        self._lags.append(max(ioloop.IOLoop.current().time() - expected, 0))
+        self._probe()
+
+    def _watch(self, stopped):
+        # Runs in the watchdog thread
+        while not stopped.wait(self.slow_threshold / 2.0):
+            call = self._current
+
+            if (call is None or call.stack is not None or
+                    self.clock() - call.start <= self.slow_threshold):
+                continue
+
+            frame = sys._current_frames().get(self._thread_id)
+
+            if frame is not None:
+                call.stack = traceback.format_stack(frame)
+
+
+class _Call(object):
+    def __init__(self, name, collection, url, start):
+        self.name = name
+        self.collection = collection
+        self.url = url
+        self.start = start
+        self.stack = None
+
+
+def _describe(callback):
+    func = callback
+
+    while isinstance(func, partial):
+        func = func.func
+
+    owner = getattr(func, '__self__', None)
+    name = getattr(func, '__name__', None)
+
+    if name is None:
+        # A callable object, like an auth hook
+        return type(func).__name__, None
+
+    if owner is None:
+        return name, None
+
+    return name, type(owner).__name__
+
+
+def _summary(values):
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p99': None, 'max': None}
+
+    ordered = sorted(values)
+
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p50': ordered[int(0.5 * (len(ordered) - 1))],
+        'p99': ordered[int(0.99 * (len(ordered) - 1))],
+        'max': ordered[-1]
+    }
@@ -25,14 +25,43 @@ class FinchError(Exception):
 
 
 class HTTPError(FinchError):
-    def __init__(self, code):
-        try:
-            message = responses[code]
-        except KeyError:
-            if code == 599:
-                message = 'Timeout'
-            else:
-                message = 'Status code {}'.format(code)
+    def __init__(self, code, message=None):
+        if message is None:
+            try:
+                message = responses[code]
+            except KeyError:
+                if code == 599:
+                    message = 'Timeout'
+                else:
+                    message = 'Status code {}'.format(code)
 
         super(HTTPError, self).__init__(message)
         self.code = code
+
+
+class DeadlineExceeded(HTTPError):
+    def __init__(self):
+        super(DeadlineExceeded, self).__init__(599, 'Deadline exceeded')
+
+
+class Cancelled(HTTPError):
+    def __init__(self):
+        super(Cancelled, self).__init__(599, 'Cancelled')
+
+
+class CircuitOpenError(FinchError):
+    def __init__(self, host):
+        super(CircuitOpenError, self).__init__(
+            'Circuit open for {}'.format(host))
+        self.host = host
+
+
+class BodyTooLarge(FinchError):
+    def __init__(self, limit):
+        super(BodyTooLarge, self).__init__(
+            'Response body over {} bytes'.format(limit))
+        self.limit = limit
+
+
+class BatchError(FinchError):
+    pass
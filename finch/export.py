@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Serialization of collection resources to NDJSON or CSV files as
+they are fetched."""
+
+import csv
+import io
+
+from tornado import escape
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = None
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+
+
+class Exporter(object):
+    """Writes resources to `fileobj`, a binary or text file, one per
+    line in `format`. The output is buffered and written once at least
+    `buffer_size` characters are pending.
+
+    CSV files start with a header row with the `fields` names. Nested
+    values are written as JSON.
+
+    """
+
+    def __init__(self, fileobj, format=NDJSON, fields=None, buffer_size=64 * 1024):
+        if format not in (NDJSON, CSV):
+            raise ValueError('Unknown export format {}'.format(format))
+        if format == CSV and fields is None:
+            raise ValueError('CSV exports need the list of fields')
+
+        self.fileobj = fileobj
+        self.format = format
+        self.fields = fields
+        self.buffer_size = buffer_size
+        self.count = 0
+
+        self._text = isinstance(fileobj, io.TextIOBase)
+        self._pending = []
+        self._pending_size = 0
+
+        if format == CSV:
+            self._append(self._csv_row(fields))
+
+    def write(self, resources):
+        for resource in resources:
+            if self.format == CSV:
+                self._append(self._csv_row(
+                    [_csv_value(resource.get(name)) for name in self.fields]))
+            else:
+                if self.fields is not None:
+                    resource = dict((name, resource[name])
+                                    for name in self.fields if name in resource)
+
+                self._append(escape.json_encode(resource) + '\n')
+
+            self.count += 1
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        data = ''.join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+
+        if not self._text:
+            data = escape.utf8(data)
+
+        self.fileobj.write(data)
+
+    def _append(self, line):
+        self._pending.append(line)
+        self._pending_size += len(line)
+
+        if self._pending_size >= self.buffer_size:
+            self.flush()
+
+    def _csv_row(self, values):
+        if _string_types is None:
+            row = io.StringIO()
+            csv.writer(row, lineterminator='\n').writerow(values)
+
+            return row.getvalue()
+
+        # The Python 2 csv module only writes byte strings
+        row = io.BytesIO()
+        csv.writer(row, lineterminator='\n').writerow(
+            [escape.utf8(value) if isinstance(value, _string_types) else value
+             for value in values])
+
+        return row.getvalue().decode('utf-8')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return escape.json_encode(value)
+
+    return value
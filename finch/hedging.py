@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Policies for hedged requests: when a read takes longer than usual
+a duplicate is sent and the first response wins."""
+
+import collections
+
+
+class HedgingPolicy(object):
+    """Decides when a request should be hedged.
+
+    :param delay: A fixed number of seconds to wait before hedging. If
+        `None` the delay is the `percentile` of the observed latencies,
+        once there are at least `min_samples` of them.
+    :param percentile: The latency percentile used as adaptive delay.
+    :param max_rate: The maximum ratio of hedged requests. Each request
+        earns `max_rate` hedges, up to a `burst` of saved hedges.
+    :param window: How many latencies are kept to compute the percentile.
+
+    """
+
+    def __init__(self, delay=None, percentile=0.95, max_rate=0.05,
+                 min_samples=20, window=1000, burst=10):
+
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.burst = burst
+
+        self._latencies = collections.deque(maxlen=window)
+        self._budget = 0.0
+
+        self.requests = 0
+        self.hedges = 0
+
+    def delay(self):
+        """Returns the seconds to wait before hedging a new request,
+        or `None` if it should not be hedged.
+
+        """
+
+        self.requests += 1
+        self._budget = min(self._budget + self.max_rate, self.burst)
+
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+
+        if len(self._latencies) < self.min_samples:
+            return None
+
+        latencies = sorted(self._latencies)
+
+        return latencies[int(self.percentile * (len(latencies) - 1))]
+
+    def allow(self):
+        """Returns `True` and spends from the hedging budget if there is
+        budget left for one more hedge.
+
+        """
+
+        if self._budget < 1:
+            return False
+
+        self._budget -= 1
+        self.hedges += 1
+
+        return True
+
+    def record(self, latency):
+        self._latencies.append(latency)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Functions generated for each model class to build, update and
+validate models from decoded resources.
+
+Booby sets every value through ``Model.__setitem__`` and the field
+descriptor. The generated functions store the values of plain fields
+straight into the model data instead, and check the builtin `String`,
+`Integer`, `Float` and `Boolean` validators inline. Anything they don't
+handle, like unknown keys, goes through the generic booby path, so the
+results and errors are the same.
+
+"""
+
+import weakref
+
+from booby import Model, errors, fields, validators
+
+try:
+    _string_types = basestring
+except NameError:
+    _string_types = str
+
+_INLINE_TYPES = {
+    validators.String: _string_types,
+    validators.Integer: int,
+    validators.Float: float,
+    validators.Boolean: bool,
+}
+
+_MESSAGES = {
+    validators.String: 'should be a string',
+    validators.Integer: 'should be an integer',
+    validators.Float: 'should be a float',
+    validators.Boolean: 'should be a boolean',
+}
+
+_hydrators = weakref.WeakKeyDictionary()
+_updaters = weakref.WeakKeyDictionary()
+_validators = weakref.WeakKeyDictionary()
+
+
+def hydrator(model):
+    """Returns a function that builds a `model` from a resource, like
+    ``model(**resource)`` does.
+
+    """
+
+    try:
+        return _hydrators[model]
+    except KeyError:
+        return _hydrators.setdefault(model, _generate_hydrator(model))
+
+
+def updater(model):
+    """Returns a function that updates a `model` object with a
+    resource, like ``obj.update(resource)`` does.
+
+    """
+
+    try:
+        return _updaters[model]
+    except KeyError:
+        return _updaters.setdefault(model, _generate_updater(model))
+
+
+def validator(model):
+    """Returns a function that validates a `model` object, like
+    ``obj.validate()`` does.
+
+    """
+
+    try:
+        return _validators[model]
+    except KeyError:
+        return _validators.setdefault(model, _generate_validator(model))
+
+
+def _generate_hydrator(model):
+    if _overrides(model, '__init__', '_update', '__setitem__'):
+        return lambda resource: model(**resource)
+
+    namespace, lines = _assignments(model)
+    custom = any(not _plain(field) for field in model._fields.values())
+
+    source = [
+        'def hydrate(resource):',
+        '    if type(resource) is not dict or not known.issuperset(resource):',
+        '        return model(**resource)',
+        '    obj = new(model)',
+        '    data = obj._data',
+    ]
+
+    if custom:
+        # The setters run in the order of the resource keys, like they
+        # do in the generic path, and a failing one raises what the
+        # generic path would raise
+        namespace['by_name'] = dict(model._fields)
+        namespace['plain'] = frozenset(
+            name for name, field in model._fields.items() if _plain(field))
+
+        source.extend([
+            '    try:',
+            '        for name, value in resource.items():',
+            '            if name in plain:',
+            '                data[by_name[name]] = value',
+            '            else:',
+            '                by_name[name].__set__(obj, value)',
+            '    except Exception:',
+            '        return model(**resource)',
+        ])
+    else:
+        source.extend(lines)
+
+    source.append('    return obj')
+
+    return _compile(model, 'hydrate', source, namespace)
+
+
+def _generate_updater(model):
+    if (_overrides(model, 'update', '_update', '__setitem__') or
+            not all(_plain(field) for field in model._fields.values())):
+        return lambda obj, resource: obj.update(resource)
+
+    namespace, lines = _assignments(model)
+
+    source = [
+        'def update(obj, resource):',
+        '    if type(resource) is not dict or not known.issuperset(resource):',
+        '        obj.update(resource)',
+        '        return',
+        '    data = obj._data',
+    ]
+    source.extend(lines)
+
+    return _compile(model, 'update', source, namespace)
+
+
+def _generate_validator(model):
+    if _overrides(model, 'validate'):
+        return lambda obj: obj.validate()
+
+    namespace = {'ValidationError': errors.ValidationError}
+    source = [
+        'def validate(obj):',
+        '    data = obj._data',
+    ]
+
+    for index, (name, field) in enumerate(model._fields.items()):
+        field_name = 'f{}'.format(index)
+        namespace[field_name] = field
+
+        source.append('    value = data[{0}] if {0} in data else '
+                      'getattr(obj, {1!r})'.format(field_name, name))
+
+        inline = _inline_type(field)
+
+        if inline is None:
+            source.append('    {}.validate(value)'.format(field_name))
+        else:
+            type_name = 't{}'.format(index)
+            namespace[type_name] = inline
+
+            source.append('    if value is not None and not isinstance('
+                          'value, {}):'.format(type_name))
+            source.append('        raise ValidationError({!r})'.format(
+                _MESSAGES[type(field.validators[0])]))
+
+    return _compile(model, 'validate', source, namespace)
+
+
+def _assignments(model):
+    namespace = {
+        'model': model,
+        'new': model.__new__,
+        'known': frozenset(model._fields),
+    }
+    lines = []
+
+    for index, (name, field) in enumerate(model._fields.items()):
+        field_name = 'f{}'.format(index)
+        namespace[field_name] = field
+
+        lines.append('    if {!r} in resource:'.format(name))
+
+        if _plain(field):
+            lines.append('        data[{}] = resource[{!r}]'.format(
+                field_name, name))
+        else:
+            lines.append('        {}.__set__(obj, resource[{!r}])'.format(
+                field_name, name))
+
+    return namespace, lines
+
+
+def _compile(model, name, source, namespace):
+    filename = '<finch.hydration {}.{}>'.format(model.__module__,
+                                               model.__name__)
+    code = compile('\n'.join(source) + '\n', filename, 'exec')
+    exec(code, namespace)
+
+    return namespace[name]
+
+
+def _plain(field):
+    return type(field).__set__ == fields.Field.__set__
+
+
+def _inline_type(field):
+    if (type(field).validate != fields.Field.validate or
+            len(field.validators) != 1):
+        return None
+
+    return _INLINE_TYPES.get(type(field.validators[0]))
+
+
+def _overrides(model, *names):
+    return any(getattr(model, name) != getattr(Model, name)
+               for name in names)
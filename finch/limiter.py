@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Adaptive limits for the requests in flight to each host, so bulk
+operations use the capacity a backend has without overloading it."""
+
+import collections
+import time
+
+OVERLOAD_CODES = (429, 503, 599)
+
+
+class AdaptiveLimiter(object):
+    """Keeps a concurrency limit for each host a :class:`finch.Session`
+    talks to, adjusted with additive increase and multiplicative
+    decrease (AIMD).
+
+    While the requests to a host use all of its limit and their
+    latency stays under `tolerance` times the baseline, the limit grows
+    by one for each limit worth of responses. The baseline is a moving
+    average of the latencies that decays over about `window` responses,
+    so it follows lasting changes of the host latency. A `429`, `503` or `599` response,
+    or a latency over that threshold, multiplies the limit by `backoff`.
+    Only requests sent after the last decrease can decrease it again,
+    so a burst of failures counts as a single overload.
+
+    Requests over the limit wait for a free slot.
+
+    """
+
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=100,
+                 backoff=0.5, tolerance=2.0, window=100, clock=time.time):
+
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.window = window
+        self.clock = clock
+
+        self._smoothing = 2.0 / (window + 1)
+
+        self._hosts = {}
+
+    def limit(self, host):
+        return int(self._host(host).limit)
+
+    def in_flight(self, host):
+        return self._host(host).in_flight
+
+    def pending(self, host):
+        return len(self._host(host).waiting)
+
+    def acquire(self, host, start):
+        """Calls `start` as soon as the requests in flight to `host` are
+        under its limit. The slot should be returned with :meth:`release`.
+
+        """
+
+        state = self._host(host)
+
+        if state.in_flight >= int(state.limit):
+            state.waiting.append(start)
+            return
+
+        state.in_flight += 1
+        start()
+
+    def cancel(self, host, start):
+        """Removes a `start` callable still waiting for a slot. Returns
+        `True` if it was waiting.
+
+        """
+
+        waiting = self._host(host).waiting
+
+        if start in waiting:
+            waiting.remove(start)
+            return True
+
+        return False
+
+    def release(self, host, response=None, latency=None):
+        """Returns a slot taken with :meth:`acquire`, adjusting the limit
+        of `host` with the `response` and its `latency` when given.
+
+        """
+
+        state = self._host(host)
+        saturated = state.in_flight >= int(state.limit) or bool(state.waiting)
+
+        state.in_flight -= 1
+
+        if response is not None:
+            self._adjust(state, response, latency, saturated)
+
+        while state.waiting and state.in_flight < int(state.limit):
+            state.in_flight += 1
+            state.waiting.popleft()()
+
+    def _adjust(self, state, response, latency, saturated):
+        overloaded = response.code in OVERLOAD_CODES
+
+        if not overloaded and latency is not None:
+            if state.baseline is None:
+                state.baseline = latency
+            elif latency > state.baseline * self.tolerance:
+                overloaded = True
+
+            state.baseline += self._smoothing * (latency - state.baseline)
+
+        if overloaded:
+            now = self.clock()
+
+            if now - (latency or 0) >= state.decreased_at:
+                state.limit = max(self.min_limit, state.limit * self.backoff)
+                state.decreased_at = now
+
+        elif saturated:
+            state.limit = min(self.max_limit, state.limit + 1.0 / state.limit)
+
+    def _host(self, host):
+        try:
+            return self._hosts[host]
+        except KeyError:
+            return self._hosts.setdefault(host, _Host(self.initial_limit))
+
+
+class _Host(object):
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.waiting = collections.deque()
+        self.baseline = None
+        self.decreased_at = float('-inf')
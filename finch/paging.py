@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent fetching of the pages of offset or page number paginated
+collections."""
+
+try:
+    from http.client import BAD_REQUEST
+except ImportError:
+    from httplib import BAD_REQUEST
+
+from functools import partial
+
+from finch import errors
+
+
+class PageRange(object):
+    """Fetches the first page of a `collection`, reads the total number
+    of resources from it with :meth:`Collection.total_count` and then
+    fetches the remaining pages, at most `concurrency` at a time. Each
+    page is requested with the parameters returned by
+    :meth:`Collection.page_params`.
+
+    The pages are reassembled in order. Without `on_page` the callback
+    runs with the entire collection. Otherwise `on_page` runs with the
+    models of each page, in order, as soon as the preceding pages
+    arrived, and the callback runs with `None` when all of them did.
+
+    """
+
+    def __init__(self, collection, concurrency, deadline=None, on_page=None):
+        if collection.offset_param is not None and collection.page_size is None:
+            raise ValueError(
+                '{} has an offset_param, so it needs a page_size to compute '
+                'the offset of each page'.format(type(collection).__name__))
+
+        self.collection = collection
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.on_page = on_page
+
+        self._callback = None
+        self._count = None
+        self._next = 1
+        self._delivered = 0
+        self._active = 0
+        self._done = False
+        self._pages = {}
+        self._resources = []
+
+    def start(self, callback):
+        self._callback = callback
+        self._fetch(0)
+
+    def _fetch(self, index):
+        collection = self.collection
+
+        self._active += 1
+
+        collection.client.fetch(collection.url,
+            params=collection.page_params(index),
+            callback=partial(self._on_response, index),
+            **collection._fetch_options(self.deadline, read=True))
+
+    def _on_response(self, index, response):
+        if self._done:
+            return
+
+        if response.code >= BAD_REQUEST:
+            self._active -= 1
+            self.collection.on_error(self._fail, response)
+            return
+
+        self.collection._decode(getattr(self.collection, 'decode', None),
+                                response, partial(self._on_decoded, index, response))
+
+    def _on_decoded(self, index, response, resources, error=None):
+        self._active -= 1
+
+        if self._done:
+            return
+
+        if error is None and self.deadline is not None and self.deadline.cancelled:
+            error = errors.Cancelled()
+        if error is None and not isinstance(resources, list):
+            error = ValueError('The page {} response body was expected to be '
+                               'a JSON array'.format(index))
+
+        if error is not None:
+            self._fail(error)
+            return
+
+        if index == 0:
+            self._count = self._page_count(response, len(resources))
+
+        self._pages[index] = resources
+        self._deliver()
+
+        while (not self._done and self._next < self._count and
+               self._active < self.concurrency):
+
+            self._next += 1
+            self._fetch(self._next - 1)
+
+    def _page_count(self, response, first_page_size):
+        total = self.collection.total_count(response)
+        page_size = self.collection.page_size or first_page_size
+
+        if total is None or page_size == 0:
+            return 1
+
+        return max(1, -(-total // page_size))
+
+    def _deliver(self):
+        while not self._done and self._delivered in self._pages:
+            resources = self._pages.pop(self._delivered)
+            self._delivered += 1
+
+            if self.on_page is None:
+                self._resources.extend(resources)
+            else:
+                self.collection._on_resources(self._on_page, resources)
+
+        if not self._done and self._delivered == self._count:
+            self._done = True
+
+            if self.on_page is None:
+                self.collection._on_resources(self._callback, self._resources)
+            else:
+                self._callback(None, None)
+
+    def _on_page(self, result, error):
+        if error is not None:
+            self._fail(error)
+        else:
+            self.on_page(result)
+
+    def _fail(self, error):
+        if not self._done:
+            self._done = True
+            self._callback(None, error)
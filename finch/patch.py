@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracking of the fields modified since a model was loaded, and their
+encoding as `JSON Merge Patch` (RFC 7396) or `JSON Patch` (RFC 6902)."""
+
+import copy
+
+from booby import Model
+from tornado import escape
+
+MERGE_PATCH = 'merge'
+JSON_PATCH = 'json-patch'
+
+
+def snapshot(obj):
+    """Records the current field values of `obj` as the baseline to
+    compare with in :func:`changed_fields`.
+
+    """
+
+    obj._baseline = dict(
+        (name, copy.deepcopy(_encode(getattr(obj, name))))
+        for name in obj._fields)
+
+
+def changed_fields(obj):
+    """Returns the names of the fields modified since the last
+    :func:`snapshot`, or `None` if `obj` has no snapshot.
+
+    """
+
+    baseline = getattr(obj, '_baseline', None)
+
+    if baseline is None:
+        return None
+
+    return [name for name in obj._fields
+            if _encode(getattr(obj, name)) != baseline.get(name)]
+
+
+def encode(obj, names, format):
+    """Returns the body and content type of a patch with the values of
+    the given field `names`.
+
+    """
+
+    if format == MERGE_PATCH:
+        patch = dict((name, _encode(getattr(obj, name))) for name in names)
+
+        return escape.json_encode(patch), 'application/merge-patch+json'
+
+    if format == JSON_PATCH:
+        patch = [{'op': _operation(obj, name), 'path': '/' + _pointer(name),
+                  'value': _encode(getattr(obj, name))} for name in names]
+
+        return escape.json_encode(patch), 'application/json-patch+json'
+
+    raise ValueError('Unknown patch format {}'.format(format))
+
+
+def _operation(obj, name):
+    # `replace` fails on a member the resource doesn't have, while `add`
+    # creates it or replaces it
+    baseline = getattr(obj, '_baseline', None) or {}
+
+    if baseline.get(name) is None:
+        return 'add'
+
+    return 'replace'
+
+
+def _encode(value):
+    if isinstance(value, Model):
+        return dict((name, _encode(getattr(value, name)))
+                    for name in value._fields)
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+
+    return value
+
+
+def _pointer(name):
+    return name.replace('~', '~0').replace('/', '~1')
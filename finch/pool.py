@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Transport configuration and connection bookkeeping for sessions."""
+
+import collections
+
+
+class ConnectionPool(object):
+    """Configures the http client used by a :class:`finch.Session` and
+    keeps track of the connections it makes.
+
+    :param curl: If `True` the session uses the pycurl based client,
+        which keeps connections alive and reuses them between requests.
+        Otherwise the Tornado simple client is used.
+    :param max_clients: The maximum number of simultaneous requests
+        for the http client.
+    :param max_host_connections: The maximum number of simultaneous
+        requests to the same host. The requests over this limit are
+        queued until a previous one finishes. `None` means no limit.
+    :param keep_alive: Enables TCP keep-alive probes (curl only).
+    :param tcp_nodelay: Disables the Nagle algorithm (curl only).
+
+    The `stats` count the recorded requests. Only curl reports how each
+    request was connected, so the new and reused connections and the
+    handshake time are `None` with the simple client.
+
+    """
+
+    def __init__(self, curl=False, max_clients=10, max_host_connections=None,
+                 keep_alive=True, tcp_nodelay=True):
+
+        self.curl = curl
+        self.max_clients = max_clients
+        self.max_host_connections = max_host_connections
+        self.keep_alive = keep_alive
+        self.tcp_nodelay = tcp_nodelay
+
+        self._active = collections.defaultdict(int)
+        self._waiting = collections.defaultdict(collections.deque)
+
+        connected = 0 if curl else None
+
+        self.stats = {
+            'requests': 0,
+            'new_connections': connected,
+            'reused_connections': connected,
+            'handshake_time': 0.0 if curl else None
+        }
+
+    def create_client(self, **kwargs):
+        if self.curl:
+            try:
+                from tornado.curl_httpclient import CurlAsyncHTTPClient
+            except ImportError:
+                raise ImportError('The curl transport requires pycurl')
+
+            client_class = CurlAsyncHTTPClient
+        else:
+            from tornado.simple_httpclient import SimpleAsyncHTTPClient
+
+            client_class = SimpleAsyncHTTPClient
+
+        return client_class(force_instance=True, max_clients=self.max_clients,
+                            **kwargs)
+
+    def request_options(self):
+        if self.curl:
+            return {'prepare_curl_callback': self._prepare_curl}
+
+        return {}
+
+    def _prepare_curl(self, curl):
+        import pycurl
+
+        if self.keep_alive:
+            curl.setopt(pycurl.TCP_KEEPALIVE, 1)
+        if self.tcp_nodelay:
+            curl.setopt(pycurl.TCP_NODELAY, 1)
+
+    def acquire(self, host, start):
+        """Calls `start` as soon as there is a free connection slot for
+        the given `host`. The slot should be returned with :meth:`release`.
+
+        """
+
+        limit = self.max_host_connections
+
+        if limit is not None and self._active[host] >= limit:
+            self._waiting[host].append(start)
+            return
+
+        self._active[host] += 1
+        start()
+
+    def release(self, host):
+        waiting = self._waiting.get(host)
+
+        if waiting:
+            waiting.popleft()()
+            return
+
+        self._active[host] -= 1
+
+        if self._active[host] <= 0:
+            del self._active[host]
+            self._waiting.pop(host, None)
+
+    def pending(self, host):
+        return len(self._waiting.get(host, ()))
+
+    def cancel(self, host, start):
+        """Removes a `start` callable still waiting for a slot. Returns
+        `True` if it was waiting.
+
+        """
+
+        waiting = self._waiting.get(host)
+
+        if waiting and start in waiting:
+            waiting.remove(start)
+            return True
+
+        return False
+
+    def record(self, response):
+        self.stats['requests'] += 1
+
+        time_info = getattr(response, 'time_info', None) or {}
+
+        if not self.curl or 'connect' not in time_info:
+            return
+
+        if time_info['connect'] > 0:
+            self.stats['new_connections'] += 1
+
+            appconnect = time_info.get('appconnect', 0)
+
+            if appconnect > 0:
+                self.stats['handshake_time'] += appconnect - time_info['connect']
+        else:
+            self.stats['reused_connections'] += 1
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resolution of model fields that reference resources of another
+collection.
+
+A field is declared as a reference passing the related collection class
+as its `reference` option. Its value is the id of the related resource
+or, with ``reference_by='url'``, its url::
+
+    class Repo(Model):
+        id = fields.Integer(primary=True)
+        owner = fields.String(reference=Users, reference_by='url')
+
+    repos.all(on_repos, include=['owner'])
+
+The related resources are fetched concurrently, once for each distinct
+value, and attached to the models in their ``_related`` dict.
+
+"""
+
+from functools import partial
+
+import booby.inspection
+
+
+def resolve(collection, result, include, callback, deadline=None):
+    """Fetches the resources referenced by the `include` fields of each
+    model in `result` and runs `callback(result, error)` when done.
+
+    """
+
+    try:
+        lookups = _lookups(collection, result, include)
+    except Exception as error:
+        callback(None, error)
+        return
+
+    if not lookups:
+        callback(result, None)
+        return
+
+    state = {'pending': len(lookups), 'error': None}
+
+    for (related, by, value), targets in lookups.items():
+        on_related = partial(_on_related, state, targets, result, callback)
+
+        if by == 'url':
+            related.client.fetch(value,
+                callback=partial(related.on_get, on_related, deadline=deadline),
+                **related._fetch_options(deadline, read=True))
+        else:
+            related.get(value, on_related, deadline=deadline)
+
+
+def _lookups(collection, result, include):
+    model_fields = booby.inspection.get_fields(collection.model)
+    references = {}
+
+    for name in include:
+        try:
+            options = model_fields[name].options
+        except KeyError:
+            raise ValueError('{} is not a field of {}'.format(
+                name, collection.model.__name__))
+
+        if 'reference' not in options:
+            raise ValueError('{} is not a reference field'.format(name))
+
+        references[name] = (collection._referenced(options['reference']),
+                            options.get('reference_by', 'id'))
+
+    lookups = {}
+
+    for obj in result:
+        if getattr(obj, '_related', None) is None:
+            obj._related = {}
+
+        for name in include:
+            value = getattr(obj, name)
+
+            if value is None:
+                obj._related[name] = None
+                continue
+
+            related, by = references[name]
+            lookups.setdefault((related, by, value), []).append((obj, name))
+
+    return lookups
+
+
+def _on_related(state, targets, result, callback, related, error):
+    if error is not None:
+        if state['error'] is None:
+            state['error'] = error
+    else:
+        for obj, name in targets:
+            obj._related[name] = related
+
+    state['pending'] -= 1
+
+    if state['pending'] == 0:
+        if state['error'] is not None:
+            callback(None, state['error'])
+        else:
+            callback(result, None)
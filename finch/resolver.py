@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A caching DNS resolver for the Tornado simple http client."""
+
+import socket
+import time
+
+from functools import partial
+
+from tornado import ioloop, netutil
+from tornado.concurrent import Future
+
+try:
+    from tornado.gen import convert_yielded
+except ImportError:
+    # Resolvers return futures in tornado < 4.3
+    def convert_yielded(future):
+        return future
+
+
+class CachingResolver(netutil.Resolver):
+    """Wraps a Tornado `resolver` caching its results.
+
+    Cached addresses are used for `ttl` seconds. Concurrent lookups of
+    the same name share a single request to the wrapped resolver. If a
+    lookup fails, the last known addresses are used for up to `stale_ttl`
+    more seconds before giving up.
+
+    The `overrides` mapping of host names to ip addresses is answered
+    locally without querying the wrapped resolver.
+
+    """
+
+    def initialize(self, resolver=None, ttl=300, stale_ttl=3600,
+                   overrides=None, clock=time.time):
+
+        if resolver is None:
+            resolver = netutil.Resolver()
+
+        self.resolver = resolver
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.overrides = overrides or {}
+        self.clock = clock
+
+        self._cache = {}
+        self._lookups = {}
+
+    def close(self):
+        self.resolver.close()
+
+    def resolve(self, host, port, family=socket.AF_UNSPEC, callback=None):
+        future = self._resolve(host, port, family)
+
+        if callback is not None:
+            ioloop.IOLoop.current().add_future(
+                future, lambda future: callback(future.result()))
+
+        return future
+
+    def _resolve(self, host, port, family):
+        if host in self.overrides:
+            return _done(_addrinfo(self.overrides[host], port))
+
+        key = (host, port, family)
+        entry = self._cache.get(key)
+        now = self.clock()
+
+        if entry is not None and entry.expires > now:
+            return _done(entry.addrinfo)
+
+        future = Future()
+
+        if key in self._lookups:
+            self._lookups[key].append(future)
+            return future
+
+        self._lookups[key] = [future]
+
+        lookup = convert_yielded(self.resolver.resolve(host, port, family))
+        ioloop.IOLoop.current().add_future(
+            lookup, partial(self._on_resolve, key, entry))
+
+        return future
+
+    def _on_resolve(self, key, stale, lookup):
+        waiting = self._lookups.pop(key)
+        now = self.clock()
+
+        try:
+            addrinfo = lookup.result()
+        except Exception as error:
+            if stale is not None and stale.expires + self.stale_ttl > now:
+                addrinfo = stale.addrinfo
+            else:
+                self._cache.pop(key, None)
+
+                for future in waiting:
+                    future.set_exception(error)
+                return
+        else:
+            self._cache[key] = _Entry(addrinfo, now + self.ttl)
+
+        for future in waiting:
+            future.set_result(addrinfo)
+
+
+class _Entry(object):
+    def __init__(self, addrinfo, expires):
+        self.addrinfo = addrinfo
+        self.expires = expires
+
+
+def _addrinfo(address, port):
+    if ':' in address:
+        return [(socket.AF_INET6, (address, port, 0, 0))]
+
+    return [(socket.AF_INET, (address, port))]
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+
+    return future
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+_MISSING = object()
+
+
+class LazyResult(Sequence):
+    """A read-only sequence of models built from the decoded resources
+    only when they are accessed.
+
+    Hydration errors are raised when the failing item is accessed. The
+    :meth:`validate` method and the :attr:`hydration_errors` property can
+    be used to check all the items at once.
+
+    """
+
+    def __init__(self, resources, hydrate):
+        self._resources = resources
+        self._hydrate = hydrate
+        self._objects = [_MISSING] * len(resources)
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        obj = self._objects[index]
+
+        if obj is _MISSING:
+            obj = self._hydrate(self._resources[index])
+            self._objects[index] = obj
+
+        return obj
+
+    def __repr__(self):
+        return '<{}.{}({} items)>'.format(
+            type(self).__module__, type(self).__name__, len(self))
+
+    def copy(self):
+        """Returns a new lazy result over the same resources, which
+        builds its own models.
+
+        """
+
+        return type(self)(self._resources, self._hydrate)
+
+    def validate(self):
+        """Builds all the pending models. If any of them fails then
+        raises the same exception the hydration had raised.
+
+        """
+
+        for index in range(len(self)):
+            self[index]
+
+    @property
+    def hydration_errors(self):
+        """Generator of index and exception pairs for each item that
+        could not be built.
+
+        """
+
+        for index in range(len(self)):
+            try:
+                self[index]
+            except Exception as error:
+                yield index, error
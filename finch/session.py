@@ -17,35 +17,488 @@
 """This module is a wrapper on top of the Tornado's HTTPClient."""
 
 try:
-    from urllib.parse import urljoin
+    from urllib.parse import urljoin, urlsplit
 except ImportError:
-    from urlparse import urljoin
+    from urlparse import urljoin, urlsplit
+
+import copy
+import logging
+from functools import partial
 
 from tornado import httpclient
 from tornado import httputil
+from tornado import ioloop
 
+from finch import errors
 from finch.auth import HTTPBasicAuth
+from finch.body import SpooledBody
+from finch.deadline import Deadline
+from finch.pool import ConnectionPool
 
 
 class Session(object):
-    def __init__(self, http_client, base_url=None, auth=None):
+    # Collections pass `deadline`, `hedge` and `max_body_size` only to
+    # clients that take them
+    accepts_fetch_options = True
+
+    def __init__(self, http_client=None, base_url=None, auth=None, pool=None,
+                 resolver=None, circuit_breaker=None, limiter=None,
+                 max_body_size=None, spool_threshold=None, diagnostics=None):
+
+        if http_client is None:
+            if pool is None:
+                pool = ConnectionPool()
+
+            if resolver is not None:
+                if pool.curl:
+                    raise ValueError(
+                        'A resolver can only be used with the simple client, '
+                        'curl resolves host names by itself')
+
+                http_client = pool.create_client(resolver=resolver)
+            else:
+                http_client = pool.create_client()
+
+        elif resolver is not None:
+            raise ValueError(
+                'A resolver can only be used when the session creates its own http client')
+        elif pool is not None:
+            raise ValueError(
+                'A pool configures the http client the session creates, it '
+                'cannot be used with an explicit http client')
+
         self.http_client = http_client
         self.base_url = base_url
+        self.pool = pool
+        self.circuit_breaker = circuit_breaker
+        self.limiter = limiter
+        self.max_body_size = max_body_size
+        self.spool_threshold = spool_threshold
+        self.diagnostics = diagnostics
 
         if isinstance(auth, tuple):
             self.auth = HTTPBasicAuth(*auth)
         else:
             self.auth = auth
 
-    def fetch(self, url, callback, params=None, **kwargs):
+    def fetch(self, url, callback, params=None, hedge=None, deadline=None,
+              max_body_size=None, **kwargs):
         if self.base_url is not None:
             url = urljoin(self.base_url, url)
         if params is not None:
             url = httputil.url_concat(url, params)
 
+        if self.pool is not None:
+            for name, value in self.pool.request_options().items():
+                kwargs.setdefault(name, value)
+
+        if self.diagnostics is not None:
+            callback = self.diagnostics.timed(callback, url=url)
+
+            for name in ('streaming_callback', 'header_callback'):
+                if kwargs.get(name) is not None:
+                    kwargs[name] = self.diagnostics.timed(kwargs[name], url=url)
+
         request = httpclient.HTTPRequest(url=url, **kwargs)
 
-        if self.auth is not None:
+        if max_body_size is None:
+            max_body_size = self.max_body_size
+
+        if deadline is not None:
+            callback = partial(self._on_deadline_response, deadline, callback)
+
+        if hedge is not None and request.method == 'GET':
+            # Each attempt is signed on its own
+            self._fetch_hedged(request, callback, hedge, deadline, max_body_size)
+        else:
+            self._sign(request)
+            self._dispatch(request, callback, deadline, max_body_size)
+
+    def _sign(self, request):
+        if self.auth is None:
+            return
+
+        if self.diagnostics is not None:
+            self.diagnostics.timed(self.auth, url=request.url)(request)
+        else:
             self.auth(request)
 
+    def _dispatch(self, request, callback, deadline=None, max_body_size=None):
+        host = urlsplit(request.url).netloc
+        flight = None
+
+        if deadline is not None:
+            flight = _Flight(deadline)
+            flight.callback = callback = partial(self._on_flight_response, flight, callback)
+
+            if deadline.cancelled:
+                callback(_cancelled_response(request))
+                return
+
+            flight.on_cancel = partial(self._on_cancel, flight, request)
+            deadline.add_cancel_callback(flight.on_cancel)
+
+        if self.circuit_breaker is not None:
+            if not self.circuit_breaker.allow(host):
+                callback(httpclient.HTTPResponse(
+                    request, 599, error=errors.CircuitOpenError(host),
+                    request_time=0))
+                return
+
+            callback = partial(self._on_breaker_response, host, callback)
+
+        if self.limiter is None:
+            self._connect(host, request, callback, deadline, flight, max_body_size)
+            return
+
+        start = partial(self._start_limited, host, request, callback, deadline,
+                        flight, max_body_size)
+        _queue(flight, self.limiter, host, start, callback)
+
+        self.limiter.acquire(host, start)
+
+    def _start_limited(self, host, request, callback, deadline=None, flight=None,
+                       max_body_size=None):
+        callback = partial(self._on_limiter_response, host, callback)
+
+        self._connect(host, request, callback, deadline, flight, max_body_size)
+
+    def _connect(self, host, request, callback, deadline=None, flight=None,
+                 max_body_size=None):
+        if self.pool is None:
+            self._send(request, callback, deadline, flight, max_body_size)
+            return
+
+        start = partial(self._send, request, partial(self._on_response, host, callback),
+                        deadline, flight, max_body_size)
+        _queue(flight, self.pool, host, start, callback)
+
+        self.pool.acquire(host, start)
+
+    def _send(self, request, callback, deadline=None, flight=None,
+              max_body_size=None):
+        if deadline is not None:
+            if deadline.cancelled:
+                callback(_cancelled_response(request))
+                return
+
+            remaining = deadline.remaining()
+
+            if remaining is not None:
+                if remaining <= 0:
+                    callback(httpclient.HTTPResponse(
+                        request, 599, error=errors.DeadlineExceeded(), request_time=0))
+                    return
+
+                request.connect_timeout = min(request.connect_timeout or remaining, remaining)
+                request.request_timeout = min(request.request_timeout or remaining, remaining)
+
+        if self.circuit_breaker is not None or self.limiter is not None:
+            callback = partial(
+                _on_timed_response, ioloop.IOLoop.current().time(), callback)
+
+        if flight is not None:
+            flight.queued = None
+            flight.sent = callback
+            callback = partial(self._on_sent_response, flight, callback)
+
+        if (max_body_size is not None or self.spool_threshold is not None or
+                (flight is not None and request.streaming_callback is not None)):
+            request, callback = self._streamed(flight, max_body_size, request, callback)
+
         self.http_client.fetch(request, callback=callback)
+
+    def _streamed(self, flight, max_body_size, request, callback):
+        # The http clients can't cancel a request, but raising from its
+        # streaming callback aborts the transfer at the next chunk. The
+        # same goes for bodies over the max size. Tornado logs what the
+        # callbacks raise, which isn't worth an error here.
+        logging.getLogger('tornado.application').addFilter(_ABORTED)
+        request = copy.copy(request)
+
+        if request.streaming_callback is None:
+            buffer_ = SpooledBody(max_body_size, self.spool_threshold)
+            request.streaming_callback = partial(self._on_chunk, flight, buffer_.write)
+            callback = partial(self._on_buffered_response, buffer_, callback)
+
+            if max_body_size is not None and request.header_callback is None:
+                request.header_callback = partial(_on_header, buffer_)
+        elif flight is not None:
+            request.streaming_callback = partial(
+                self._on_chunk, flight, request.streaming_callback)
+
+        return request, callback
+
+    def _on_chunk(self, flight, streaming_callback, chunk):
+        if flight is not None and flight.aborted:
+            raise errors.Cancelled()
+
+        streaming_callback(chunk)
+
+    def _on_buffered_response(self, buffer_, callback, response):
+        streamed = getattr(response, 'buffer', None)
+
+        if buffer_.too_large:
+            buffer_.close()
+
+            # Some clients report the aborted transfer as a closed stream
+            response = httpclient.HTTPResponse(
+                response.request, 599,
+                error=errors.BodyTooLarge(buffer_.max_size),
+                request_time=response.request_time)
+        elif streamed is not None and not streamed.getvalue():
+            buffer_.finish()
+
+            response.buffer = buffer_
+            response._body = None
+        else:
+            buffer_.close()
+
+        callback(response)
+
+    def _on_cancel(self, flight, request):
+        response = _cancelled_response(request)
+        queued, flight.queued = flight.queued, None
+
+        if queued is not None:
+            queue, host, start, callback = queued
+
+            if queue.cancel(host, start):
+                callback(response)
+                return
+
+        flight.aborted = True
+        sent, flight.sent = flight.sent, None
+
+        if sent is not None:
+            # The http clients can't abort a request in flight, so its
+            # pool and limiter slots are released now and its response
+            # dropped. The transfer itself goes on until it ends, or
+            # until the next chunk of a streamed body.
+            sent(response)
+        else:
+            flight.callback(response)
+
+    def _on_sent_response(self, flight, callback, response):
+        if flight.aborted:
+            return
+
+        flight.sent = None
+        callback(response)
+
+    def _on_flight_response(self, flight, callback, response):
+        if flight.done:
+            return
+
+        flight.done = True
+        flight.deadline.remove_cancel_callback(flight.on_cancel)
+
+        callback(response)
+
+    def _on_deadline_response(self, deadline, callback, response):
+        if (response.code == 599 and deadline.expired and
+                not isinstance(getattr(response, 'error', None), errors.FinchError)):
+            response.error = errors.DeadlineExceeded()
+
+        callback(response)
+
+    def _on_breaker_response(self, host, callback, response):
+        if isinstance(getattr(response, 'error', None), errors.FinchError):
+            # Rejected by finch before reaching the host
+            self.circuit_breaker.discard(host)
+        else:
+            self.circuit_breaker.record(host, response, response.request_time)
+
+        callback(response)
+
+    def _on_limiter_response(self, host, callback, response):
+        if isinstance(getattr(response, 'error', None), errors.FinchError):
+            # Rejected by finch before reaching the host
+            self.limiter.release(host)
+        else:
+            self.limiter.release(host, response, response.request_time)
+
+        callback(response)
+
+    def _on_response(self, host, callback, response):
+        self.pool.release(host)
+        self.pool.record(response)
+
+        callback(response)
+
+    def _fetch_hedged(self, request, callback, policy, deadline=None,
+                      max_body_size=None):
+        hedge = _Hedge(callback, deadline, max_body_size)
+
+        self._attempt(hedge, request, policy)
+
+        delay = policy.delay()
+
+        if delay is not None:
+            io_loop = ioloop.IOLoop.current()
+            hedge.timeout = io_loop.add_timeout(
+                io_loop.time() + delay,
+                partial(self._on_hedge_delay, hedge, request, policy))
+
+    def _attempt(self, hedge, request, policy):
+        # Signatures like OAuth1 nonces can't be sent twice, so every
+        # attempt signs its own copy of the request
+        request = copy.copy(request)
+        request.headers = httputil.HTTPHeaders(request.headers)
+        self._sign(request)
+
+        if hedge.deadline is not None:
+            deadline = hedge.deadline.child()
+        else:
+            deadline = Deadline()
+
+        hedge.attempts.append(deadline)
+
+        self._dispatch(request, partial(
+            self._on_hedged_response, hedge, policy, deadline,
+            ioloop.IOLoop.current().time()), deadline, hedge.max_body_size)
+
+    def _on_hedge_delay(self, hedge, request, policy):
+        hedge.timeout = None
+
+        if not hedge.done and policy.allow():
+            self._attempt(hedge, request, policy)
+
+    def _on_hedged_response(self, hedge, policy, deadline, start, response):
+        hedge.attempts.remove(deadline)
+
+        if hedge.deadline is not None:
+            hedge.deadline.remove_cancel_callback(deadline.cancel)
+
+        if response.code < 500:
+            policy.record(ioloop.IOLoop.current().time() - start)
+
+        if hedge.done:
+            return
+
+        if response.code >= 500 and hedge.attempts:
+            # The other attempt may still succeed
+            return
+
+        hedge.done = True
+
+        if hedge.timeout is not None:
+            ioloop.IOLoop.current().remove_timeout(hedge.timeout)
+            hedge.timeout = None
+
+        # The losing attempts release their connections
+        for attempt in list(hedge.attempts):
+            attempt.cancel()
+
+        hedge.callback(response)
+
+    @property
+    def stats(self):
+        if self.pool is None:
+            return None
+
+        return dict(self.pool.stats)
+
+    def warmup(self, callback, urls=None, connections=None):
+        """Opens `connections` connections to each of the given `urls`
+        (the `base_url` by default) before they are needed. With a
+        transport that reuses connections, such as curl, the first
+        requests don't have to pay for the TCP and TLS handshakes.
+
+        The `callback` receives an `HTTPError` if any of the connections
+        could not be made, or `None` otherwise.
+
+        """
+
+        if urls is None:
+            if self.base_url is None:
+                raise ValueError('The urls to warm up are required without a base_url')
+
+            urls = [self.base_url]
+
+        if connections is None:
+            connections = getattr(self.pool, 'max_host_connections', None) or 1
+
+        if not urls or connections <= 0:
+            callback(None)
+            return
+
+        state = {'pending': len(urls) * connections, 'error': None}
+
+        def on_response(response):
+            if response.code == 599 and state['error'] is None:
+                state['error'] = errors.HTTPError(response.code)
+
+            state['pending'] -= 1
+
+            if state['pending'] == 0:
+                callback(state['error'])
+
+        for url in urls:
+            for _ in range(connections):
+                self.fetch(url, method='HEAD', callback=on_response)
+
+
+def _on_header(buffer_, line):
+    name, _, value = line.partition(':')
+
+    if name.strip().lower() == 'content-length' and value.strip().isdigit():
+        buffer_.expect(int(value))
+
+
+def _on_timed_response(start, callback, response):
+    # The breaker and the limiter judge the host by the time it took to
+    # answer, without the time spent waiting in their queues. The http
+    # clients measure it from the start of the transfer.
+    if getattr(response, 'request_time', None) is None:
+        response.request_time = ioloop.IOLoop.current().time() - start
+
+    callback(response)
+
+
+class _AbortedFilter(logging.Filter):
+    def filter(self, record):
+        error = record.exc_info[1] if record.exc_info else None
+
+        # Tornado may log it again while handling it
+        while error is not None:
+            if isinstance(error, (errors.BodyTooLarge, errors.Cancelled)):
+                return False
+
+            error = getattr(error, '__context__', None)
+
+        return True
+
+
+_ABORTED = _AbortedFilter()
+
+
+def _cancelled_response(request):
+    return httpclient.HTTPResponse(
+        request, 599, error=errors.Cancelled(), request_time=0)
+
+
+def _queue(flight, queue, host, start, callback):
+    if flight is not None:
+        flight.queued = (queue, host, start, callback)
+
+
+class _Flight(object):
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.callback = None
+        self.on_cancel = None
+        self.queued = None
+        self.sent = None
+        self.aborted = False
+        self.done = False
+
+
+class _Hedge(object):
+    def __init__(self, callback, deadline, max_body_size):
+        self.callback = callback
+        self.deadline = deadline
+        self.max_body_size = max_body_size
+        self.attempts = []
+        self.done = False
+        self.timeout = None
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module keeps local mirrors of remote collections in sync by
+asking only for the resources that changed since the last refresh."""
+
+try:
+    from http.client import BAD_REQUEST
+except ImportError:
+    from httplib import BAD_REQUEST
+
+from functools import partial
+
+import booby.inspection
+
+
+class Mirror(object):
+    """A local copy of a :class:`finch.Collection` indexed by the
+    primary field of its model.
+
+    The first :meth:`refresh` fetches the entire collection. Following
+    refreshes send the high-water mark of the previous one in the
+    `since_param` query parameter, so the server only has to return
+    the resources created, updated or deleted after that.
+
+    The mark is the value of the `cursor_header` response header when
+    given, or the greatest `updated_field` value seen otherwise. Resources
+    with a true `deleted_field` are tombstones: they are removed from
+    `items` and recorded in `tombstones`.
+
+    Paginated deltas are followed with :meth:`Collection.next_page`, and
+    the changes are only applied, and the mark only moved, once every
+    page has been read.
+
+    """
+
+    def __init__(self, collection, since_param='updated_since',
+                 updated_field='updated_at', deleted_field='deleted',
+                 cursor_header=None):
+
+        self.collection = collection
+        self.since_param = since_param
+        self.updated_field = updated_field
+        self.deleted_field = deleted_field
+        self.cursor_header = cursor_header
+
+        self.mark = None
+        self.items = {}
+        self.tombstones = {}
+
+    def refresh(self, callback):
+        self.request_refresh(callback)
+
+    def request_refresh(self, callback):
+        params = None
+
+        if self.mark is not None:
+            params = {self.since_param: self.mark}
+
+        self.collection.client.fetch(
+            self.collection.url,
+            params=params,
+            callback=partial(self.on_refresh, callback),
+            **self.collection._fetch_options())
+
+    def on_refresh(self, callback, response, pages=None):
+        if response.code >= BAD_REQUEST:
+            self.collection.on_error(partial(callback, None), response)
+            return
+
+        resources = self.collection._decode_collection(response)
+
+        if not isinstance(resources, list):
+            callback(None, ValueError("""
+                The response body was expected to be a JSON array.
+
+                To properly process the response you should define a
+                `decode(response)` method in your `Collection` class."""))
+
+            return
+
+        if pages is not None:
+            pages.extend(resources)
+            resources = pages
+
+        next_url = self.collection.next_page(response)
+
+        if next_url is not None:
+            self.collection.client.fetch(next_url, callback=partial(
+                self.on_refresh, callback, pages=resources),
+                **self.collection._fetch_options())
+            return
+
+        try:
+            changes, deletions, mark = self._changes(resources)
+        except Exception as error:
+            callback(None, error)
+            return
+
+        for id_ in deletions:
+            self.items.pop(id_, None)
+            self.tombstones[id_] = deletions[id_]
+
+        for id_, obj in changes:
+            self.items[id_] = obj
+            self.tombstones.pop(id_, None)
+
+        if self.cursor_header is not None:
+            mark = response.headers.get(self.cursor_header, mark)
+
+        if mark is not None:
+            self.mark = mark
+
+        callback(self.items, None)
+
+    def _changes(self, resources):
+        model = self.collection.model
+        model_fields = booby.inspection.get_fields(model)
+        primary = _primary_name(model_fields)
+
+        changes, deletions, mark = [], {}, self.mark
+
+        for resource in resources:
+            updated = resource.get(self.updated_field)
+
+            if updated is not None and (mark is None or updated > mark):
+                mark = updated
+
+            if resource.get(self.deleted_field):
+                deletions[resource[primary]] = updated
+                continue
+
+            if self.deleted_field not in model_fields:
+                resource = dict(resource)
+                resource.pop(self.deleted_field, None)
+
+            obj = self.collection._hydrate(resource)
+            changes.append((getattr(obj, primary), obj))
+
+        return changes, deletions, mark
+
+
+def _primary_name(model_fields):
+    for name, field in model_fields.items():
+        if field.options.get('primary', False):
+            return name
+
+    raise ValueError('Mirrored models should have a primary field')
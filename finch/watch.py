@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014 Jaime Gil de Sagredo Luna
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Change feeds of remote collections, consumed as server-sent events
+or by long polling."""
+
+try:
+    from http.client import BAD_REQUEST
+except ImportError:
+    from httplib import BAD_REQUEST
+
+import codecs
+import collections
+import re
+from functools import partial
+
+from tornado import escape, ioloop
+
+from finch.body import body_view, json_decode
+from finch.deadline import Deadline
+
+SSE = 'sse'
+LONG_POLL = 'long-poll'
+
+ACTIONS = ('create', 'update', 'delete')
+
+Change = collections.namedtuple('Change', ['action', 'obj'])
+
+
+class Watch(object):
+    """Watches the change feed of a :class:`finch.Collection` at `url`
+    (the collection `watch_url` or `url` by default) and runs the
+    callback with a :class:`Change` for each `create`, `update` or
+    `delete` event, or with the error of a failed connection.
+
+    With the `sse` mode the feed is a `text/event-stream` response
+    read as it arrives. Each event type is the action and its data the
+    JSON resource. With the `long-poll` mode each response is a JSON
+    array of ``{"event": ..., "data": ..., "id": ...}`` objects and a new
+    request is sent right after.
+
+    Connections are resumed sending the id of the last event in the
+    `Last-Event-ID` header. After a stream ends the watch reconnects in
+    `retry` seconds (or what the server sent in a `retry` field), and
+    after a failure in exponentially longer delays up to `max_backoff`.
+
+    An event stream has no request timeout. Instead, a stream that
+    receives nothing, not even a comment used as heartbeat, for
+    `timeout` seconds is closed and reconnected without reporting an
+    error. Each long-poll request times out after `timeout` seconds.
+
+    """
+
+    def __init__(self, collection, url=None, mode=SSE, retry=1.0,
+                 max_backoff=60, timeout=300):
+
+        if mode not in (SSE, LONG_POLL):
+            raise ValueError('Unknown watch mode {}'.format(mode))
+
+        self.collection = collection
+        self.url = url or collection.watch_url or collection.url
+        self.mode = mode
+        self.retry = retry
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.last_event_id = None
+        self.running = False
+
+        self._callback = None
+        self._connection = 0
+        self._failures = 0
+        self._timeout = None
+        self._idle_timeout = None
+        self._last_chunk = None
+        self._parser = None
+        self._deadline = None
+
+    def start(self, callback):
+        self._callback = callback
+        self.running = True
+        self._connect()
+
+        return self
+
+    def stop(self):
+        self.running = False
+
+        if self._timeout is not None:
+            ioloop.IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+
+        self._close(abort=True)
+
+    def _close(self, abort):
+        if self._idle_timeout is not None:
+            ioloop.IOLoop.current().remove_timeout(self._idle_timeout)
+            self._idle_timeout = None
+
+        if abort and self._deadline is not None:
+            # Aborts the connection in flight
+            self._deadline.cancel()
+
+        self._deadline = None
+
+    def _connect(self):
+        self._timeout = None
+        self._connection += 1
+        self._deadline = Deadline()
+
+        headers = {}
+        options = {}
+        fetch_options = self.collection._fetch_options(self._deadline)
+
+        if self.last_event_id is not None:
+            headers['Last-Event-ID'] = self.last_event_id
+
+        if self.mode == SSE:
+            headers['Accept'] = 'text/event-stream'
+            self._parser = _EventParser()
+            options['streaming_callback'] = partial(self._on_chunk, self._connection)
+            # A stream lasts as long as the server keeps it open, so its
+            # size isn't limited either
+            options['request_timeout'] = 0
+            fetch_options.pop('max_body_size', None)
+
+            if self.timeout is not None:
+                self._last_chunk = ioloop.IOLoop.current().time()
+                self._wait_idle(self._connection, self.timeout)
+        else:
+            headers['Accept'] = 'application/json'
+            options['request_timeout'] = self.timeout
+
+        options.update(fetch_options)
+
+        self.collection.client.fetch(self.url, headers=headers,
+            callback=partial(self._on_response, self._connection), **options)
+
+    def _wait_idle(self, connection, delay):
+        io_loop = ioloop.IOLoop.current()
+        self._idle_timeout = io_loop.add_timeout(
+            io_loop.time() + delay, partial(self._on_idle, connection))
+
+    def _on_idle(self, connection):
+        self._idle_timeout = None
+
+        if not self.running or connection != self._connection:
+            return
+
+        # Chunks only record when they arrived, instead of rescheduling
+        # the timeout each time
+        remaining = self._last_chunk + self.timeout - ioloop.IOLoop.current().time()
+
+        if remaining > 0:
+            self._wait_idle(connection, remaining)
+            return
+
+        # A planned reconnection of a stalled stream, not an error
+        self._connection += 1
+        self._close(abort=True)
+        self._reconnect(self.retry)
+
+    def _on_chunk(self, connection, chunk):
+        if not self.running or connection != self._connection:
+            return
+
+        self._last_chunk = ioloop.IOLoop.current().time()
+
+        for event in self._parser.feed(chunk):
+            self._on_event(event)
+
+        if self._parser.retry is not None:
+            self.retry = self._parser.retry / 1000.0
+
+    def _on_response(self, connection, response):
+        if not self.running or connection != self._connection:
+            return
+
+        self._close(abort=False)
+
+        if response.code >= BAD_REQUEST:
+            self._failures += 1
+            self.collection.on_error(partial(self._callback, None), response)
+            self._reconnect(self._backoff())
+            return
+
+        if self.mode == SSE:
+            self._reconnect(self.retry)
+            return
+
+        try:
+            events = json_decode(body_view(response))
+
+            if not isinstance(events, list):
+                raise ValueError('The long-poll response body was expected '
+                                 'to be a JSON array of events')
+        except Exception as error:
+            self._failures += 1
+            self._callback(None, error)
+            self._reconnect(self._backoff())
+            return
+
+        for event in events:
+            self._on_event(event)
+
+        self._reconnect(0)
+
+    def _on_event(self, event):
+        if not self.running:
+            return
+
+        if event.get('id') is not None:
+            self.last_event_id = event['id']
+
+        action = event.get('event')
+
+        if action not in ACTIONS:
+            return
+
+        try:
+            resource = event.get('data')
+
+            if isinstance(resource, escape.unicode_type):
+                resource = escape.json_decode(resource)
+
+            obj = self.collection._hydrate(resource)
+        except Exception as error:
+            self._callback(None, error)
+            return
+
+        self._failures = 0
+        self._callback(Change(action, obj), None)
+
+    def _backoff(self):
+        return min(self.retry * 2 ** (self._failures - 1), self.max_backoff)
+
+    def _reconnect(self, delay):
+        if not self.running:
+            return
+
+        io_loop = ioloop.IOLoop.current()
+        self._timeout = io_loop.add_timeout(io_loop.time() + delay, self._connect)
+
+
+class _EventParser(object):
+    """Incremental parser of the `text/event-stream` format."""
+
+    def __init__(self):
+        self.last_id = None
+        self.retry = None
+
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        # The pieces of the incomplete last line, which are only joined
+        # once its line break arrives
+        self._pending = []
+        self._event = None
+        self._data = []
+
+    def feed(self, chunk):
+        text = self._decoder.decode(chunk)
+
+        if (u'\n' not in text and u'\r' not in text and
+                not (self._pending and self._pending[-1].endswith(u'\r'))):
+            if text:
+                self._pending.append(text)
+            return []
+
+        buffer_ = u''.join(self._pending) + text
+        self._pending = []
+        events = []
+        start = 0
+
+        for match in _LINE_END.finditer(buffer_):
+            if match.group() == u'\r' and match.end() == len(buffer_):
+                # Might be the first half of a CRLF
+                break
+
+            event = self._line(buffer_[start:match.start()])
+            start = match.end()
+
+            if event is not None:
+                events.append(event)
+
+        if start < len(buffer_):
+            self._pending.append(buffer_[start:])
+
+        return events
+
+    def _line(self, line):
+        if not line:
+            return self._dispatch()
+
+        if line.startswith(u':'):
+            return None
+
+        name, _, value = line.partition(u':')
+
+        if value.startswith(u' '):
+            value = value[1:]
+
+        if name == u'data':
+            self._data.append(value)
+        elif name == u'event':
+            self._event = value
+        elif name == u'id' and u'\0' not in value:
+            self.last_id = value
+        elif name == u'retry' and value.isdigit():
+            self.retry = int(value)
+
+    def _dispatch(self):
+        event, data = self._event, self._data
+        self._event, self._data = None, []
+
+        if not data:
+            return None
+
+        return {'event': event or u'message', 'data': u'\n'.join(data),
+                'id': self.last_id}
+
+
+_LINE_END = re.compile(u'\r\n|\r|\n')
@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 
+from tornado import httpclient
+
 
 class HTTPClient(object):
+    # Takes the options of a finch session
+    accepts_fetch_options = True
+
     def __init__(self):
         self._next_response = None
         self._last_request = None
+        self._queued_responses = []
+        self.requests = []
 
     @property
     def next_response(self):
@@ -22,14 +29,54 @@ class HTTPClient(object):
     def last_request(self, value):
         self._last_request = _HTTPRequest(*value)
 
+    def queue_responses(self, *responses):
+        self._queued_responses.extend(responses)
+
     def fetch(self, request, callback, **kwargs):
         self.last_request = request, kwargs
+        self.requests.append(self.last_request)
+
+        if self._queued_responses:
+            self.next_response = self._queued_responses.pop(0)
 
         callback(self.next_response)
 
 
+class TornadoHTTPClient(HTTPClient):
+    """Rejects the options a tornado `AsyncHTTPClient` doesn't take."""
+
+    accepts_fetch_options = False
+
+    def fetch(self, request, callback, **kwargs):
+        httpclient.HTTPRequest(request, **kwargs)
+
+        super(TornadoHTTPClient, self).fetch(request, callback, **kwargs)
+
+
+class DeferredHTTPClient(object):
+    """Keeps the fetched requests pending until they are answered
+    with the `respond` method.
+
+    """
+
+    accepts_fetch_options = True
+
+    def __init__(self):
+        self.pending = []
+        self.requests = []
+
+    def fetch(self, request, callback, **kwargs):
+        self.pending.append((request, callback))
+        self.requests.append(_HTTPRequest(request, kwargs))
+
+    def respond(self, code, body='', headers=None, time_info=None, index=0):
+        request, callback = self.pending.pop(index)
+
+        callback(_HTTPResponse(code, body, headers, time_info, request))
+
+
 class _HTTPResponse(object):
-    def __init__(self, code, body, headers=None):
+    def __init__(self, code, body, headers=None, time_info=None, request=None):
         self.code = code
         self.body = body
 
@@ -37,6 +84,8 @@ class _HTTPResponse(object):
             headers = {}
 
         self.headers = headers
+        self.time_info = time_info or {}
+        self.request = request
 
 
 class _HTTPRequest(object):
@@ -46,3 +95,4 @@ class _HTTPRequest(object):
         self.body = options.get('body')
         self.headers = options.get('headers')
         self.params = options.get('params')
+        self.options = options
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from http.client import OK, CREATED, NO_CONTENT, NOT_FOUND, INTERNAL_SERVER_ERROR
+except ImportError:
+    from httplib import OK, CREATED, NO_CONTENT, NOT_FOUND, INTERNAL_SERVER_ERROR
+
+from booby import Model, fields
+from tornado import escape
+from hamcrest import *
+
+from tests.unit import fake_httpclient
+
+from finch import errors, Collection
+from finch.batch import Batch, JSONArrayFormat, MultipartFormat, ODataFormat
+
+
+class TestJSONArrayBatch(object):
+    def test_when_operations_added_then_does_not_send_requests(self):
+        self.users.get(1, self.on_result)
+
+        assert_that(self.client.requests, is_(empty()))
+        assert_that(self.batch, has_length(1))
+
+    def test_when_sent_then_sends_single_request_with_every_operation(self):
+        self.users.get(1, self.on_result)
+        self.users.add(User(name='Bar'), self.on_result)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 1, 'name': 'Foo'}},
+            {'status': 201, 'body': {'id': 2, 'name': 'Bar'}}])
+
+        self.batch.send()
+
+        assert_that(self.client.requests, has_length(1))
+        assert_that(self.client.last_request, has_properties(
+            url='/batch', method='POST'))
+        assert_that(escape.json_decode(self.client.last_request.body), contains(
+            has_entries(method='GET', url='/users/1'),
+            has_entries(method='POST', url='/users', body={'name': 'Bar', 'id': None})))
+
+    def test_when_sent_then_runs_each_callback_with_its_result(self):
+        self.users.get(1, self.on_result)
+        self.users.add(User(name='Bar'), self.on_result)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 1, 'name': 'Foo'}},
+            {'status': 201, 'body': {'id': 2, 'name': 'Bar'}}])
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            contains(has_properties(id=1, name='Foo'), None),
+            contains(has_properties(id=2, name='Bar'), None)))
+
+    def test_when_operation_fails_then_runs_its_callback_with_error(self):
+        self.users.get(1, self.on_result)
+        self.users.delete(User(id=2), self.on_error)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 404}, {'status': 204}])
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            contains(None, has_properties(code=NOT_FOUND)),
+            None))
+
+    def test_when_batch_request_fails_then_runs_every_callback_with_error(self):
+        self.users.get(1, self.on_result)
+        self.users.delete(User(id=2), self.on_error)
+        self.client.next_response = INTERNAL_SERVER_ERROR, ''
+
+        self.batch.send(self.on_error)
+
+        assert_that(self.results, contains(
+            contains(None, has_properties(code=INTERNAL_SERVER_ERROR)),
+            has_properties(code=INTERNAL_SERVER_ERROR),
+            has_properties(code=INTERNAL_SERVER_ERROR)))
+
+    def test_when_response_parts_do_not_match_then_runs_callbacks_with_batch_error(self):
+        self.users.get(1, self.on_result)
+        self.users.get(2, self.on_result)
+        self.client.next_response = OK, escape.json_encode([{'status': 200}])
+
+        self.batch.send(self.on_error)
+
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.BatchError)),
+            contains(None, instance_of(errors.BatchError)),
+            instance_of(errors.BatchError)))
+
+    def test_when_operation_cancelled_then_is_left_out(self):
+        deadline = self.users.get(1, self.on_result)
+        self.users.get(2, self.on_result)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 2, 'name': 'Foo'}}])
+
+        deadline.cancel()
+        self.batch.send()
+
+        assert_that(escape.json_decode(self.client.last_request.body), has_length(1))
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.Cancelled)),
+            contains(has_properties(id=2), None)))
+
+    def test_when_operation_response_is_over_its_max_body_size_then_fails_it(self):
+        self.batch.fetch('/users/1', self.on_response, max_body_size=4)
+        self.batch.fetch('/users/2', self.on_response)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 1, 'name': 'Foo'}},
+            {'status': 200, 'body': {'id': 2, 'name': 'Bar'}}])
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            has_properties(code=599, error=instance_of(errors.BodyTooLarge)),
+            has_properties(code=OK)))
+
+    def test_when_batch_has_max_body_size_then_fetches_with_it(self):
+        self.batch.max_body_size = 1024
+        self.users.get(1, self.on_result)
+        self.client.next_response = OK, escape.json_encode([{'status': 404}])
+
+        self.batch.send()
+
+        assert_that(self.client.last_request.options, has_entry('max_body_size', 1024))
+
+    def test_when_operation_cancelled_after_sending_then_runs_its_callback_with_cancelled(self):
+        self.batch.client = self.client = fake_httpclient.DeferredHTTPClient()
+        deadline = self.users.get(1, self.on_result)
+        self.users.get(2, self.on_result)
+        self.batch.send()
+
+        deadline.cancel()
+
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.Cancelled))))
+
+        self.client.respond(OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 1, 'name': 'Foo'}},
+            {'status': 200, 'body': {'id': 2, 'name': 'Bar'}}]))
+
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.Cancelled)),
+            contains(has_properties(id=2), None)))
+
+    def test_when_every_operation_cancelled_after_sending_then_cancels_batch(self):
+        self.batch.client = self.client = fake_httpclient.DeferredHTTPClient()
+        deadline = self.users.get(1, self.on_result)
+        self.batch.send()
+
+        deadline.cancel()
+
+        assert_that(self.client.requests[0].options['deadline'].cancelled, is_(True))
+
+    def test_when_sent_then_batch_expires_with_earliest_operation_deadline(self):
+        self.users.get(1, self.on_result, deadline=60)
+        self.users.get(2, self.on_result, deadline=5)
+        self.client.next_response = OK, escape.json_encode([{'status': 404}] * 2)
+
+        self.batch.send(deadline=30)
+
+        assert_that(self.client.last_request.options['deadline'].remaining(),
+                    less_than_or_equal_to(5))
+
+    def test_when_client_is_a_tornado_client_then_sends_batch(self):
+        self.batch.client = self.client = fake_httpclient.TornadoHTTPClient()
+        self.batch.max_body_size = 1024
+        self.users.get(1, self.on_result, deadline=5)
+        self.client.next_response = OK, escape.json_encode([
+            {'status': 200, 'body': {'id': 1, 'name': 'Foo'}}])
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            contains(has_properties(id=1, name='Foo'), None)))
+
+    def test_when_nothing_to_send_then_runs_callback_without_request(self):
+        self.batch.send(self.on_error)
+
+        assert_that(self.client.requests, is_(empty()))
+        assert_that(self.results, contains(None))
+
+    def test_when_used_as_context_then_sends_on_exit(self):
+        self.client.next_response = OK, escape.json_encode([{'status': 204}])
+
+        with self.batch:
+            self.users.delete(User(id=2), self.on_error)
+
+        assert_that(self.client.requests, has_length(1))
+        assert_that(self.results, contains(None))
+
+    def on_result(self, result, error):
+        self.results.append((result, error))
+
+    def on_error(self, error):
+        self.results.append(error)
+
+    def on_response(self, response):
+        self.results.append(response)
+
+    def setup_method(self, method):
+        self.client = fake_httpclient.HTTPClient()
+        self.batch = Batch(self.client, '/batch', format=JSONArrayFormat())
+        self.users = Users(self.batch)
+        self.results = []
+
+
+class TestODataBatch(object):
+    def test_encodes_requests_with_ids(self):
+        body, content_type = self.format.encode(self.requests())
+
+        assert_that(escape.json_decode(body), has_entries(requests=contains(
+            has_entries(id='0', method='GET', url='/users/1'),
+            has_entries(id='1', method='DELETE', url='/users/2'))))
+        assert_that(content_type, is_('application/json'))
+
+    def test_matches_responses_by_id(self):
+        response = fake_httpclient._HTTPResponse(OK, escape.json_encode({
+            'responses': [
+                {'id': '1', 'status': 204},
+                {'id': '0', 'status': 200, 'body': {'id': 1}}]}))
+
+        parts = self.format.decode(response, 2)
+
+        assert_that(parts, contains(
+            contains(OK, anything(), b'{"id": 1}'),
+            contains(NO_CONTENT, anything(), b'')))
+
+    def requests(self):
+        batch = Batch(None, '/batch')
+        batch.fetch('/users/1', None)
+        batch.fetch('/users/2', None, method='DELETE')
+
+        return [operation.request for operation in batch._operations]
+
+    def setup_method(self, method):
+        self.format = ODataFormat()
+
+
+class TestMultipartBatch(object):
+    def test_encodes_each_request_as_http_part(self):
+        self.users.add(User(name='Bar'), self.on_result)
+
+        body = self.client_body()
+
+        assert_that(body, contains_string(
+            'Content-Type: application/http\r\n'
+            'Content-Transfer-Encoding: binary\r\n'))
+        assert_that(body, contains_string(
+            'POST /users HTTP/1.1\r\n'
+            'Content-Type: application/json\r\n'
+            '\r\n'))
+        assert_that(self.client.last_request.headers['Content-Type'],
+                    starts_with('multipart/mixed; boundary='))
+
+    def test_splits_multipart_response_into_callbacks(self):
+        self.users.get(1, self.on_result)
+        self.users.add(User(name='Bar'), self.on_result)
+        self.client.next_response = OK, (
+            'preamble\r\n'
+            '--b\r\n'
+            'Content-Type: application/http\r\n'
+            '\r\n'
+            'HTTP/1.1 200 OK\r\n'
+            'Content-Type: application/json\r\n'
+            '\r\n'
+            '{"id": 1, "name": "Foo"}\r\n'
+            '--b\r\n'
+            'Content-Type: application/http\r\n'
+            '\r\n'
+            'HTTP/1.1 201 Created\r\n'
+            'Location: /users/2\r\n'
+            '\r\n'
+            '\r\n'
+            '--b--\r\n'), {'Content-Type': 'multipart/mixed; boundary="b"'}
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            contains(has_properties(id=1, name='Foo'), None),
+            contains(has_properties(name='Bar', _url='/users/2'), None)))
+
+    def test_when_response_is_not_multipart_then_runs_callbacks_with_batch_error(self):
+        self.users.get(1, self.on_result)
+        self.client.next_response = OK, '[]', {'Content-Type': 'application/json'}
+
+        self.batch.send()
+
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.BatchError))))
+
+    def client_body(self):
+        self.client.next_response = CREATED, ''
+        self.batch.send()
+
+        return self.client.last_request.body.decode('utf-8')
+
+    def on_result(self, result, error):
+        self.results.append((result, error))
+
+    def setup_method(self, method):
+        self.client = fake_httpclient.HTTPClient()
+        self.batch = Batch(self.client, '/batch', format=MultipartFormat())
+        self.users = Users(self.batch)
+        self.results = []
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+
+
+class Users(Collection):
+    model = User
+    url = '/users'
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+from io import BytesIO
+
+from tornado import httpclient
+from hamcrest import *
+
+from tests.unit import fake_httpclient
+
+from finch import errors
+from finch.body import SpooledBody, body_view, json_decode
+
+
+class TestBodyView(object):
+    def test_when_body_was_not_read_then_returns_view_of_response_buffer(self):
+        response = self.response(b'[1, 2]')
+
+        view = body_view(response)
+
+        assert_that(view.tobytes(), is_(b'[1, 2]'))
+        assert_that(response._body, is_(None))
+
+    def test_when_body_was_read_then_returns_view_of_body(self):
+        response = self.response(b'[1, 2]')
+        response.body
+
+        assert_that(body_view(response).tobytes(), is_(b'[1, 2]'))
+
+    def test_when_response_has_no_buffer_then_returns_view_of_body(self):
+        response = fake_httpclient._HTTPResponse(200, u'[1, 2]')
+
+        assert_that(body_view(response).tobytes(), is_(b'[1, 2]'))
+
+    def response(self, body):
+        request = httpclient.HTTPRequest('http://example.com/')
+
+        return httpclient.HTTPResponse(request, 200, buffer=BytesIO(body))
+
+
+class TestSpooledBody(object):
+    def test_when_under_spool_threshold_then_keeps_body_in_memory(self):
+        body = self.body(b'[1, 2]', spool_threshold=16)
+
+        assert_that(body.spooled, is_(False))
+        assert_that(body.getbuffer().tobytes(), is_(b'[1, 2]'))
+
+    def test_when_over_spool_threshold_then_maps_spooled_file(self):
+        body = self.body(b'[1, 2]', spool_threshold=4)
+
+        assert_that(body.spooled, is_(True))
+        assert_that(json_decode(body.getbuffer()), is_([1, 2]))
+        assert_that(body.getvalue(), is_(b'[1, 2]'))
+
+    def test_when_finished_then_maps_spooled_file_and_closes_it(self):
+        body = self.body(b'[1, 2]', spool_threshold=4)
+        file_ = body._file
+
+        body.finish()
+
+        assert_that(file_.closed, is_(True))
+        assert_that(body.getbuffer().tobytes(), is_(b'[1, 2]'))
+        assert_that(body.getvalue(), is_(b'[1, 2]'))
+
+    def test_when_used_as_context_then_closes_on_exit(self):
+        with self.body(b'[1, 2]', spool_threshold=4) as body:
+            pass
+
+        assert_that(body._file.closed, is_(True))
+
+    def test_when_over_max_size_then_raises_body_too_large(self):
+        body = SpooledBody(max_size=4)
+
+        assert_that(calling(body.write).with_args(b'[1, 2]'),
+                    raises(errors.BodyTooLarge))
+
+    def test_when_response_buffer_then_returns_view_of_it(self):
+        request = httpclient.HTTPRequest('http://example.com/')
+        response = httpclient.HTTPResponse(
+            request, 200, buffer=self.body(b'[1, 2]', spool_threshold=4))
+
+        assert_that(body_view(response).tobytes(), is_(b'[1, 2]'))
+
+    def body(self, data, **kwargs):
+        body = SpooledBody(**kwargs)
+        body.write(data[:3])
+        body.write(data[3:])
+
+        return body
+
+
+class TestJSONDecode(object):
+    def test_when_memoryview_then_returns_decoded_document(self):
+        data = memoryview(u'{"name": "José"}'.encode('utf-8'))
+
+        assert_that(json_decode(data), is_({'name': u'José'}))
+
+    def test_when_bytes_then_returns_decoded_document(self):
+        assert_that(json_decode(b'[1, 2]'), is_([1, 2]))
+
+    def test_when_text_then_returns_decoded_document(self):
+        assert_that(json_decode(u'[1, 2]'), is_([1, 2]))
+
+    def test_when_not_json_then_raises_value_error(self):
+        assert_that(calling(json_decode).with_args(b'<html>'), raises(ValueError))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from hamcrest import *
+
+from tests.unit import fake_httpclient
+
+from finch.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+HOST = 'example.com'
+OK = fake_httpclient._HTTPResponse(200, '')
+ERROR = fake_httpclient._HTTPResponse(503, '')
+
+
+class TestCircuitBreaker(object):
+    def test_when_failure_rate_is_reached_then_opens_circuit(self):
+        breaker, now = self.breaker()
+
+        self.record(breaker, OK, OK, ERROR, ERROR)
+
+        assert_that(breaker.state(HOST), is_(OPEN))
+        assert_that(breaker.allow(HOST), is_(False))
+
+    def test_when_not_enough_requests_then_keeps_circuit_closed(self):
+        breaker, now = self.breaker()
+
+        self.record(breaker, ERROR, ERROR, ERROR)
+
+        assert_that(breaker.state(HOST), is_(CLOSED))
+        assert_that(breaker.allow(HOST), is_(True))
+
+    def test_when_requests_are_slow_then_counts_them_as_failures(self):
+        breaker, now = self.breaker(slow_threshold=1)
+
+        for _ in range(4):
+            breaker.record(HOST, OK, 2)
+
+        assert_that(breaker.state(HOST), is_(OPEN))
+
+    def test_when_circuit_is_open_then_other_hosts_are_allowed(self):
+        breaker, now = self.breaker()
+
+        self.record(breaker, ERROR, ERROR, ERROR, ERROR)
+
+        assert_that(breaker.allow('example.org'), is_(True))
+
+    def test_when_reset_timeout_passes_then_allows_probe_requests(self):
+        breaker, now = self.breaker(half_open_probes=1)
+        self.record(breaker, ERROR, ERROR, ERROR, ERROR)
+
+        now[0] += 31
+
+        assert_that(breaker.allow(HOST), is_(True))
+        assert_that(breaker.state(HOST), is_(HALF_OPEN))
+        assert_that(breaker.allow(HOST), is_(False))
+
+    def test_when_probe_succeeds_then_closes_circuit(self):
+        breaker, now = self.breaker()
+        self.record(breaker, ERROR, ERROR, ERROR, ERROR)
+        now[0] += 31
+        breaker.allow(HOST)
+
+        breaker.record(HOST, OK, 0)
+
+        assert_that(breaker.state(HOST), is_(CLOSED))
+
+    def test_when_probe_fails_then_opens_circuit_again(self):
+        breaker, now = self.breaker()
+        self.record(breaker, ERROR, ERROR, ERROR, ERROR)
+        now[0] += 31
+        breaker.allow(HOST)
+
+        breaker.record(HOST, ERROR, 0)
+
+        assert_that(breaker.state(HOST), is_(OPEN))
+        assert_that(breaker.allow(HOST), is_(False))
+
+    def test_when_probe_is_discarded_then_allows_another_probe(self):
+        breaker, now = self.breaker()
+        self.record(breaker, ERROR, ERROR, ERROR, ERROR)
+        now[0] += 31
+        breaker.allow(HOST)
+
+        breaker.discard(HOST)
+
+        assert_that(breaker.allow(HOST), is_(True))
+
+    def breaker(self, **kwargs):
+        now = [100]
+        kwargs.setdefault('min_requests', 4)
+        kwargs.setdefault('reset_timeout', 30)
+
+        return CircuitBreaker(clock=lambda: now[0], **kwargs), now
+
+    def record(self, breaker, *responses):
+        for response in responses:
+            breaker.record(HOST, response, 0)
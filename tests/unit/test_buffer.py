@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from http.client import CREATED, BAD_REQUEST
+except ImportError:
+    from httplib import CREATED, BAD_REQUEST
+
+from booby import Model, fields
+from tornado import escape
+from hamcrest import *
+
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import errors, Collection
+from finch.buffer import WriteBuffer
+
+
+class TestWriteBufferWithBatchUrl(AsyncTestCase):
+    def test_when_max_size_is_reached_then_sends_single_batch_request(self):
+        self.client.next_response = CREATED, ''
+
+        self.add_users(3)
+
+        assert_that(self.client.requests, has_length(1))
+        assert_that(self.client.last_request, has_properties(
+            url='/users/batch', method='POST'))
+        assert_that(escape.json_decode(self.client.last_request.body), has_length(3))
+
+    def test_when_under_max_size_then_waits_for_max_latency(self):
+        self.client.next_response = CREATED, ''
+
+        self.add_users(2)
+
+        assert_that(self.client.requests, is_(empty()))
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.05, self.stop)
+        self.wait()
+
+        assert_that(self.client.requests, has_length(1))
+        assert_that(self.results, has_length(2))
+
+    def test_when_batch_succeeds_then_runs_each_callback_with_its_object(self):
+        self.client.next_response = CREATED, escape.json_encode([
+            {'id': 1, 'name': 'user0'},
+            {'id': 2, 'name': 'user1'},
+            {'id': 3, 'name': 'user2'}
+        ])
+
+        users = self.add_users(3)
+
+        assert_that(self.results, contains(
+            contains(is_(users[0]), None),
+            contains(is_(users[1]), None),
+            contains(is_(users[2]), None)))
+        assert_that(users[2], has_properties(id=3, _persisted=True))
+
+    def test_when_batch_fails_then_runs_each_callback_with_error(self):
+        self.client.next_response = BAD_REQUEST, 'Bad Request'
+
+        self.add_users(3)
+
+        assert_that(self.results, has_length(3))
+        assert_that(self.results, only_contains(
+            contains(None, instance_of(errors.HTTPError))))
+
+    def test_when_batch_response_does_not_match_objects_then_runs_callbacks_with_value_error(self):
+        self.client.next_response = CREATED, escape.json_encode([{'id': 1}])
+
+        self.add_users(3)
+
+        assert_that(self.results, only_contains(
+            contains(None, instance_of(ValueError))))
+
+    def test_when_object_has_json_encode_then_sends_its_encoded_body(self):
+        self.client.next_response = CREATED, ''
+
+        self.buffer.add(UserWithEncode(name='foo'),
+                        lambda *args: self.results.append(args))
+        self.buffer.flush()
+
+        assert_that(escape.json_decode(self.client.last_request.body),
+                    contains(has_entries(user_name='foo')))
+
+    def test_when_object_has_other_encode_then_adds_it_alone(self):
+        self.client.next_response = CREATED, '', {'Location': '/users/1'}
+
+        user = UserWithFormEncode(name='foo')
+        self.buffer.add(user, lambda *args: self.results.append(args))
+        self.buffer.flush()
+
+        assert_that(self.client.last_request, has_properties(
+            url='/users', body='name=foo'))
+        assert_that(user, has_properties(_url='/users/1', _persisted=True))
+
+    def test_when_callback_raises_then_runs_other_callbacks(self):
+        self.client.next_response = CREATED, ''
+
+        def fail(*args):
+            raise ValueError()
+
+        self.buffer.add(User(name='foo'), fail)
+        self.add_users(2)
+
+        assert_that(self.results, has_length(2))
+
+    def add_users(self, count):
+        users = [User(name='user{}'.format(i)) for i in range(count)]
+
+        for user in users:
+            self.buffer.add(user, lambda *args: self.results.append(args))
+
+        return users
+
+    def test_when_collection_has_max_body_size_then_sends_batch_with_it(self):
+        self.buffer.collection.max_body_size = 1024
+        self.client.next_response = CREATED, ''
+
+        self.add_users(3)
+
+        assert_that(self.client.last_request.options, has_entry('max_body_size', 1024))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.buffer = WriteBuffer(BatchUsers(self.client), max_size=3,
+                                  max_latency=0.01)
+        self.results = []
+
+
+class TestWriteBufferWithoutBatchUrl(AsyncTestCase):
+    def test_when_flushed_then_adds_each_object(self):
+        for i in range(3):
+            self.buffer.add(User(name='user{}'.format(i)),
+                            lambda *args: self.results.append(args))
+
+        self.client.respond(CREATED)
+        self.client.respond(CREATED)
+        self.client.respond(CREATED)
+
+        assert_that(self.results, has_length(3))
+        assert_that(self.results, only_contains(contains(anything(), None)))
+
+    def test_when_flushed_then_keeps_at_most_max_concurrency_requests_in_flight(self):
+        for i in range(3):
+            self.buffer.add(User(name='user{}'.format(i)),
+                            lambda *args: self.results.append(args))
+
+        assert_that(self.client.pending, has_length(2))
+
+        self.client.respond(CREATED)
+
+        assert_that(self.client.pending, has_length(2))
+
+    def test_when_adds_complete_at_once_then_adds_every_object(self):
+        client = fake_httpclient.HTTPClient()
+        client.next_response = CREATED, ''
+        buffer_ = WriteBuffer(Users(client), max_size=2000)
+
+        for i in range(2000):
+            buffer_.add(User(name='user{}'.format(i)),
+                        lambda *args: self.results.append(args))
+
+        assert_that(self.results, has_length(2000))
+
+    def setup(self):
+        self.client = fake_httpclient.DeferredHTTPClient()
+        self.buffer = WriteBuffer(Users(self.client), max_size=3,
+                                  max_concurrency=2)
+        self.results = []
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+
+
+class UserWithEncode(User):
+    def encode(self):
+        return escape.json_encode({'user_name': self.name}), 'application/json'
+
+
+class UserWithFormEncode(User):
+    def encode(self):
+        return 'name={}'.format(self.name), 'application/x-www-form-urlencoded'
+
+
+class Users(Collection):
+    model = User
+    url = '/users'
+
+
+class BatchUsers(Users):
+    batch_url = '/users/batch'
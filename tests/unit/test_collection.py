@@ -9,6 +9,10 @@ try:
 except ImportError:
     from httplib import OK, NOT_FOUND, CREATED, NO_CONTENT, INTERNAL_SERVER_ERROR, BAD_REQUEST
 
+import io
+import threading
+from concurrent import futures
+
 import booby
 from booby import Model, fields
 from tornado import escape
@@ -17,6 +21,9 @@ from hamcrest import *
 from tests.unit import AsyncTestCase, fake_httpclient
 
 from finch import errors, Collection
+from finch.cache import Cache
+from finch.deadline import Deadline
+from finch.results import LazyResult
 
 
 class TestGetEntireCollection(AsyncTestCase):
@@ -152,6 +159,61 @@ class TestGetEntireCollection(AsyncTestCase):
             has_properties(id=2, name=u'Jack', email=u'jack@example.com')
         ))
 
+    def test_when_fetching_then_returns_cancellable_deadline(self):
+        self.client.next_response = OK, self.json_collection
+
+        deadline = self.collection.all(self.stop)
+        self.wait()
+
+        assert_that(deadline, instance_of(Deadline))
+        assert_that(self.client.last_request.options['deadline'], is_(deadline))
+
+    def test_when_collection_has_max_body_size_then_passes_it_to_client(self):
+        self.collection.max_body_size = 1024
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop)
+        self.wait()
+
+        assert_that(self.client.last_request.options['max_body_size'], is_(1024))
+
+    def test_when_client_is_a_tornado_client_then_only_passes_options_it_takes(self):
+        self.collection.client = self.client = fake_httpclient.TornadoHTTPClient()
+        self.collection.max_body_size = 1024
+        self.collection.hedging = 0.1
+        self.client.next_response = OK, self.json_collection
+
+        deadline = self.collection.all(self.stop, deadline=5)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, has_length(2))
+        assert_that(deadline, instance_of(Deadline))
+        assert_that(self.client.last_request.options, all_of(
+            is_not(has_key('deadline')),
+            is_not(has_key('hedge')),
+            is_not(has_key('max_body_size'))))
+
+    def test_when_client_is_a_tornado_client_then_gets_object(self):
+        self.collection.client = self.client = fake_httpclient.TornadoHTTPClient()
+        self.client.next_response = OK, escape.json_encode(
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'})
+
+        self.collection.get(1, self.stop)
+        user, error = self.wait()
+
+        assert_that(not error)
+        assert_that(user, has_properties(id=1, name=u'Foo'))
+
+    def test_when_body_too_large_then_runs_callback_with_error(self):
+        self.client.next_response = 599, ''
+        self.client.next_response.error = errors.BodyTooLarge(1024)
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(error, instance_of(errors.BodyTooLarge))
+
     def test_when_response_is_not_found_then_runs_callback_with_http_error(self):
         self.client.next_response = NOT_FOUND, 'Not Found'
 
@@ -202,6 +264,46 @@ class TestQueryCollection(AsyncTestCase):
 
         assert_that(last_request.params, is_({'name': 'Jack'}))
 
+    def test_when_querying_with_fields_then_client_performs_http_get_with_fields_param(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.query(self.stop, {'name': 'Jack'}, fields=['id', 'name'])
+        self.wait()
+
+        last_request = self.client.last_request
+
+        assert_that(last_request.params, is_({'name': 'Jack', 'fields': 'id,name'}))
+
+    def test_when_querying_with_fields_and_custom_fields_param_then_client_performs_http_get_with_custom_param(self):
+        self.collection.fields_param = '$select'
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.query(self.stop, {'name': 'Jack'}, fields=['id', 'name'])
+        self.wait()
+
+        last_request = self.client.last_request
+
+        assert_that(last_request.params, has_entry('$select', 'id,name'))
+
+    def test_when_querying_with_fields_then_runs_callback_with_projected_models(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.query(self.stop, {'name': 'Jack'}, fields=['id', 'name'])
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, contains(
+            has_properties(id=2, name=u'Jack', email=None)))
+
+    def test_when_called_with_keywords_then_sends_params(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.query(params={'name': 'Jack'}, callback=self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(self.client.last_request.params, is_({'name': 'Jack'}))
+
     def setup(self):
         self.client = fake_httpclient.HTTPClient()
         self.collection = Users(self.client)
@@ -215,6 +317,652 @@ class TestQueryCollection(AsyncTestCase):
         ])
 
 
+class TestGetPaginatedCollection(AsyncTestCase):
+    def test_when_response_has_next_page_then_fetches_it(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (OK, self.second_page))
+
+        self.collection.all(self.stop)
+        self.wait()
+
+        assert_that(self.client.requests, contains(
+            has_property('url', '/users'),
+            has_property('url', '/users?page=2')))
+
+    def test_when_all_pages_are_fetched_then_runs_callback_with_entire_collection(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (OK, self.second_page))
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, contains(
+            has_properties(id=1, name=u'Foo'),
+            has_properties(id=2, name=u'Jack')))
+
+    def test_when_next_page_fails_then_runs_callback_with_http_error(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (INTERNAL_SERVER_ERROR, 'Internal Server Error'))
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not users)
+        assert_that(error, instance_of(errors.HTTPError))
+
+    def test_when_deadline_then_every_page_request_shares_it(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (OK, self.second_page))
+
+        self.collection.all(self.stop, deadline=10)
+        self.wait()
+
+        first, second = self.client.requests
+
+        assert_that(first.options['deadline'], instance_of(Deadline))
+        assert_that(second.options['deadline'], is_(first.options['deadline']))
+
+    def test_when_response_has_finch_error_then_runs_callback_with_it(self):
+        self.client.next_response = 599, ''
+        self.client.next_response.error = errors.DeadlineExceeded()
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(error, instance_of(errors.DeadlineExceeded))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = PaginatedUsers(self.client)
+
+        self.first_page = escape.json_encode([
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'}
+        ])
+
+        self.second_page = escape.json_encode([
+            {'id': 2, 'name': 'Jack', 'email': 'jack@example.com'}
+        ])
+
+
+class TestGetParallelPages(AsyncTestCase):
+    def test_when_response_has_total_count_then_fetches_remaining_pages(self):
+        self.client.queue_responses(
+            (OK, self.page(1), {'X-Total-Count': '3'}),
+            (OK, self.page(2)),
+            (OK, self.page(3)))
+
+        self.collection.all(self.stop, parallel_pages=2)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, contains(
+            has_properties(id=1), has_properties(id=2), has_properties(id=3)))
+        assert_that(self.client.requests, contains(
+            has_property('params', {'page': 1}),
+            has_property('params', {'page': 2}),
+            has_property('params', {'page': 3})))
+
+    def test_when_response_has_not_total_count_then_fetches_first_page_only(self):
+        self.client.next_response = OK, self.page(1)
+
+        self.collection.all(self.stop, parallel_pages=2)
+        users, error = self.wait()
+
+        assert_that(users, contains(has_properties(id=1)))
+        assert_that(self.client.requests, has_length(1))
+
+    def test_when_fetching_pages_then_keeps_at_most_parallel_pages_in_flight(self):
+        self.use_deferred_client()
+
+        self.collection.all(self.results.append, parallel_pages=2)
+        self.client.respond(OK, self.page(1), {'X-Total-Count': '4'})
+
+        assert_that(self.client.pending, has_length(2))
+
+        self.client.respond(OK, self.page(2))
+
+        assert_that(self.client.pending, has_length(2))
+
+    def test_when_pages_arrive_out_of_order_then_runs_callback_with_collection_in_order(self):
+        self.use_deferred_client()
+
+        self.collection.all(lambda *args: self.results.append(args), parallel_pages=2)
+        self.client.respond(OK, self.page(1), {'X-Total-Count': '3'})
+        self.client.respond(OK, self.page(3), index=1)
+        self.client.respond(OK, self.page(2))
+
+        users, error = self.results[0]
+
+        assert_that(users, contains(
+            has_properties(id=1), has_properties(id=2), has_properties(id=3)))
+
+    def test_when_streaming_then_runs_on_page_in_order(self):
+        self.use_deferred_client()
+        pages = []
+
+        self.collection.all(lambda *args: self.results.append(args),
+                            parallel_pages=2, on_page=pages.append)
+        self.client.respond(OK, self.page(1), {'X-Total-Count': '3'})
+        self.client.respond(OK, self.page(3), index=1)
+
+        assert_that(pages, has_length(1))
+
+        self.client.respond(OK, self.page(2))
+
+        assert_that(pages, contains(
+            contains(has_properties(id=1)),
+            contains(has_properties(id=2)),
+            contains(has_properties(id=3))))
+        assert_that(self.results, contains((None, None)))
+
+    def test_when_page_fails_then_runs_callback_once_with_http_error(self):
+        self.use_deferred_client()
+
+        self.collection.all(lambda *args: self.results.append(args), parallel_pages=2)
+        self.client.respond(OK, self.page(1), {'X-Total-Count': '3'})
+        self.client.respond(INTERNAL_SERVER_ERROR)
+        self.client.respond(OK, self.page(3))
+
+        assert_that(self.results, contains(
+            contains(None, instance_of(errors.HTTPError))))
+
+    def test_when_collection_has_offset_param_then_requests_pages_by_offset(self):
+        self.collection = OffsetPaginatedUsers(self.client)
+        self.client.queue_responses(
+            (OK, self.page(1), {'X-Total-Count': '2'}),
+            (OK, self.page(2)))
+
+        self.collection.all(self.stop, parallel_pages=2)
+        self.wait()
+
+        assert_that(self.client.requests, contains(
+            has_property('params', {'offset': 0}),
+            has_property('params', {'offset': 1})))
+
+    def test_when_collection_has_page_size_param_then_requests_pages_with_page_size(self):
+        self.collection = OffsetPaginatedUsers(self.client)
+        self.collection.page_size_param = 'limit'
+        self.client.next_response = OK, self.page(1), {'X-Total-Count': '1'}
+
+        self.collection.all(self.stop, parallel_pages=2)
+        self.wait()
+
+        assert_that(self.client.last_request.params, is_({'offset': 0, 'limit': 1}))
+
+    def test_when_collection_has_offset_param_without_page_size_then_raises_value_error(self):
+        self.collection = OffsetPaginatedUsers(self.client)
+        self.collection.page_size = None
+
+        assert_that(calling(self.collection.all).with_args(
+                    self.stop, parallel_pages=2),
+                    raises(ValueError, 'page_size'))
+        assert_that(self.client.requests, is_(empty()))
+
+    def use_deferred_client(self):
+        self.collection.client = self.client = fake_httpclient.DeferredHTTPClient()
+
+    def page(self, id_):
+        return escape.json_encode([
+            {'id': id_, 'name': 'Foo', 'email': 'foo@example.com'}
+        ])
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = CountedUsers(self.client)
+        self.results = []
+
+
+class TestExportCollection(AsyncTestCase):
+    def test_when_exporting_then_writes_every_page_to_file(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (OK, self.second_page))
+
+        self.collection.export(self.fileobj, self.stop)
+        count, error = self.wait()
+
+        assert_that(not error)
+        assert_that(count, is_(2))
+        assert_that([escape.json_decode(line) for line in self.fileobj.getvalue().splitlines()],
+                    contains(has_entries(id=1, name=u'Foo'), has_entries(id=2, name=u'Jack')))
+
+    def test_when_exporting_csv_then_writes_model_fields(self):
+        self.client.next_response = OK, self.second_page
+
+        self.collection.export(self.fileobj, self.stop, format='csv')
+        self.wait()
+
+        assert_that(self.fileobj.getvalue().decode('utf-8').splitlines(), contains(
+            'id,name,email', '2,Jack,jack@example.com'))
+
+    def test_when_exporting_fields_then_client_performs_http_get_with_fields_param(self):
+        self.client.next_response = OK, self.second_page
+
+        self.collection.export(self.fileobj, self.stop, params={'name': 'Jack'},
+                               fields=['id'])
+        self.wait()
+
+        assert_that(self.client.last_request.params, is_({'name': 'Jack', 'fields': 'id'}))
+        assert_that(self.fileobj.getvalue(), is_(b'{"id": 2}\n'))
+
+    def test_when_page_fails_then_runs_callback_with_http_error(self):
+        self.client.queue_responses(
+            (OK, self.first_page, {'Link': '/users?page=2'}),
+            (INTERNAL_SERVER_ERROR, 'Internal Server Error'))
+
+        self.collection.export(self.fileobj, self.stop)
+        count, error = self.wait()
+
+        assert_that(count, is_(None))
+        assert_that(error, instance_of(errors.HTTPError))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = PaginatedUsers(self.client)
+        self.fileobj = io.BytesIO()
+
+        self.first_page = escape.json_encode([
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'}
+        ])
+
+        self.second_page = escape.json_encode([
+            {'id': 2, 'name': 'Jack', 'email': 'jack@example.com'}
+        ])
+
+
+class TestCachedCollection(AsyncTestCase):
+    def test_when_result_is_fresh_then_runs_callback_without_fetching(self):
+        self.fetch_all()
+
+        self.now += 5
+        users, error = self.fetch_all()
+
+        assert_that(not error)
+        assert_that(users, contains(has_properties(id=1, name=u'Foo')))
+        assert_that(self.client.requests, has_length(1))
+
+    def test_when_result_is_stale_then_runs_callback_and_refreshes_in_background(self):
+        self.fetch_all()
+
+        self.now += 15
+        self.client.next_response = OK, self.updated_collection
+        users, error = self.fetch_all()
+
+        assert_that(users, contains(has_properties(name=u'Foo')))
+        assert_that(self.client.requests, has_length(2))
+
+        users, error = self.fetch_all()
+
+        assert_that(users, contains(has_properties(name=u'Foo Bar')))
+
+    def test_when_result_is_too_old_then_waits_for_fetch(self):
+        self.fetch_all()
+
+        self.now += 40
+        self.client.next_response = OK, self.updated_collection
+        users, error = self.fetch_all()
+
+        assert_that(users, contains(has_properties(name=u'Foo Bar')))
+
+    def test_when_refreshing_concurrently_then_fetches_once(self):
+        self.collection.client = self.client = fake_httpclient.DeferredHTTPClient()
+        results = []
+
+        self.collection.all(lambda *args: results.append(args))
+        self.collection.all(lambda *args: results.append(args))
+        self.client.respond(OK, self.json_collection)
+
+        assert_that(self.client.pending, is_(empty()))
+        assert_that(results, has_length(2))
+
+    def test_when_fetch_fails_then_does_not_cache_error(self):
+        self.client.next_response = INTERNAL_SERVER_ERROR, 'Internal Server Error'
+        self.fetch_all()
+
+        self.client.next_response = OK, self.json_collection
+        users, error = self.fetch_all()
+
+        assert_that(not error)
+        assert_that(self.client.requests, has_length(2))
+
+    def test_when_getting_fresh_model_then_runs_callback_without_fetching(self):
+        self.client.next_response = OK, escape.json_encode(
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'})
+
+        self.collection.get(1, self.stop)
+        self.wait()
+        self.collection.get(1, self.stop)
+        user, error = self.wait()
+
+        assert_that(user, has_properties(id=1, name=u'Foo'))
+        assert_that(self.client.requests, has_length(1))
+
+    def test_when_querying_with_same_params_in_other_order_then_runs_callback_without_fetching(self):
+        self.collection.query(self.stop, {'name': 'Foo', 'page': 1})
+        self.wait()
+        self.collection.query(self.stop, [('page', '1'), ('name', 'Foo')])
+        users, error = self.wait()
+
+        assert_that(users, contains(has_properties(id=1, name=u'Foo')))
+        assert_that(self.client.requests, has_length(1))
+
+    def test_when_querying_with_other_params_then_fetches(self):
+        self.collection.query(self.stop, {'name': 'Foo'})
+        self.wait()
+        self.client.next_response = OK, self.json_collection
+        self.collection.query(self.stop, {'name': 'Bar'})
+        self.wait()
+
+        assert_that(self.client.requests, has_length(2))
+
+    def test_when_object_is_added_then_fetches_collection_again(self):
+        self.fetch_all()
+        user = User(id=2, name='Jack', email='jack@example.com')
+        self.client.next_response = CREATED, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        self.client.next_response = OK, self.updated_collection
+        users, error = self.fetch_all()
+
+        assert_that(users, contains(has_properties(name=u'Foo Bar')))
+
+    def test_when_object_is_deleted_then_fetches_queries_and_model_again(self):
+        self.collection.query(self.stop, {'name': 'Foo'})
+        users, _ = self.wait()
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.delete(users[0], self.stop)
+        self.wait()
+
+        self.client.next_response = OK, self.updated_collection
+        self.collection.query(self.stop, {'name': 'Foo'})
+        users, error = self.wait()
+
+        assert_that(users, contains(has_properties(name=u'Foo Bar')))
+        assert_that(self.client.requests, has_length(3))
+
+    def test_when_delete_fails_then_keeps_cached_results(self):
+        users, _ = self.fetch_all()
+        self.client.next_response = INTERNAL_SERVER_ERROR, 'Internal Server Error'
+        self.collection.delete(users[0], self.stop)
+        self.wait()
+
+        self.fetch_all()
+
+        assert_that(self.client.requests, has_length(2))
+
+    def test_when_read_completes_after_a_write_then_does_not_cache_it(self):
+        self.collection.client = self.client = fake_httpclient.DeferredHTTPClient()
+        user = User(id=1, name='Foo', email='foo@example.com')
+        user._persisted = True
+
+        self.collection.all(lambda *args: None)
+        self.collection.delete(user, lambda error: None)
+        self.client.respond(NO_CONTENT, index=1)
+        self.client.respond(OK, self.json_collection)
+        self.collection.all(lambda *args: None)
+
+        assert_that(self.client.pending, has_length(1))
+
+    def test_when_cache_is_full_then_evicts_least_recently_used_result(self):
+        self.collection = CachedUsers(self.client)
+        self.collection.cache = Cache(clock=lambda: self.now, max_size=2)
+
+        for name in ('Foo', 'Bar', 'Foo', 'Baz', 'Bar'):
+            self.client.next_response = OK, self.json_collection
+            self.collection.query(self.stop, {'name': name})
+            self.wait()
+
+        assert_that(self.client.requests, has_length(4))
+
+    def test_when_result_has_expired_then_is_dropped_on_next_write(self):
+        self.collection.query(self.stop, {'name': 'Foo'})
+        self.wait()
+
+        self.now += 40
+        self.client.next_response = OK, self.json_collection
+        self.collection.query(self.stop, {'name': 'Bar'})
+        self.wait()
+
+        assert_that(self.collection.cache, has_length(1))
+
+    def test_when_cached_model_is_changed_then_other_callers_get_it_unchanged(self):
+        self.client.next_response = OK, escape.json_encode(
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'})
+        self.collection.get(1, self.stop)
+        user, _ = self.wait()
+
+        user.name = 'Bar'
+        self.collection.get(1, self.stop)
+        cached, _ = self.wait()
+
+        assert_that(cached, is_not(same_instance(user)))
+        assert_that(cached.name, is_(u'Foo'))
+
+    def test_when_cached_collection_is_changed_then_other_callers_get_it_unchanged(self):
+        users, _ = self.fetch_all()
+
+        users[0].name = 'Bar'
+        cached, _ = self.fetch_all()
+
+        assert_that(cached, contains(has_properties(name=u'Foo')))
+
+    def test_when_concurrent_read_is_cancelled_then_other_readers_get_result(self):
+        self.collection.client = self.client = fake_httpclient.DeferredHTTPClient()
+        results = []
+
+        first = self.collection.all(lambda *args: results.append(args))
+        self.collection.all(lambda *args: results.append(args))
+        first.cancel()
+        self.client.respond(OK, self.json_collection)
+
+        assert_that(results, contains(
+            contains(None, instance_of(errors.Cancelled)),
+            contains(contains(has_properties(id=1)), None)))
+        assert_that(self.client.requests[0].options['deadline'], is_not(first))
+
+    def fetch_all(self):
+        self.collection.all(self.stop)
+
+        return self.wait()
+
+    def setup(self):
+        self.now = 1000
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = CachedUsers(self.client)
+        self.collection.cache.clock = lambda: self.now
+
+        self.json_collection = escape.json_encode([
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'}
+        ])
+
+        self.updated_collection = escape.json_encode([
+            {'id': 1, 'name': 'Foo Bar', 'email': 'foo@example.com'}
+        ])
+
+        self.client.next_response = OK, self.json_collection
+
+
+class TestGetLazyCollection(AsyncTestCase):
+    def test_when_response_is_a_json_array_then_runs_callback_with_lazy_result(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, instance_of(LazyResult))
+        assert_that(users, has_length(2))
+
+    def test_when_item_accessed_then_returns_persisted_model(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(users[0], has_properties(id=1, name=u'Foo', _persisted=True))
+        assert_that(users[0], is_(users[0]))
+
+    def test_when_item_cannot_be_hydrated_then_raises_on_access(self):
+        self.client.next_response = OK, self.json_collection_with_extra_field
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users[0], has_properties(id=1))
+        assert_that(calling(users.__getitem__).with_args(1),
+                    raises(booby.errors.FieldError))
+
+    def test_when_validating_then_returns_hydration_errors(self):
+        self.client.next_response = OK, self.json_collection_with_extra_field
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(calling(users.validate), raises(booby.errors.FieldError))
+        assert_that(list(users.hydration_errors), contains(
+            contains(1, instance_of(booby.errors.FieldError))))
+
+    def test_when_validating_models_then_returns_validation_errors(self):
+        self.collection.validate_models = True
+        self.client.next_response = OK, escape.json_encode([
+            {'id': 1, 'name': 'Foo'}, {'id': '2', 'name': 'Jack'}])
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(users[0], has_properties(id=1))
+        assert_that(list(users.hydration_errors), contains(
+            contains(1, instance_of(booby.errors.ValidationError))))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = LazyUsers(self.client)
+
+        self.json_collection = escape.json_encode([
+            {
+                'id': 1,
+                'name': 'Foo',
+                'email': 'foo@example.com'
+            },
+            {
+                'id': 2,
+                'name': 'Jack',
+                'email': 'jack@example.com'
+            }
+        ])
+
+        self.json_collection_with_extra_field = escape.json_encode([
+            {
+                'id': 1,
+                'name': 'Foo',
+                'email': 'foo@example.com'
+            },
+            {
+                'id': 2,
+                'name': 'Jack',
+                'email': 'jack@example.com',
+                'url': 'http://example.com/Jack'
+            }
+        ])
+
+
+class TestDecodeInExecutor(AsyncTestCase):
+    def test_when_body_is_over_threshold_then_decodes_in_executor(self):
+        self.collection.decode_threshold = 0
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(users, contains(
+            has_properties(id=1, name=u'Foo', _persisted=True)))
+        assert_that(self.collection.decoded_in, is_not(threading.current_thread()))
+
+    def test_when_body_is_under_threshold_then_decodes_in_current_thread(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not error)
+        assert_that(self.collection.decoded_in, is_(threading.current_thread()))
+
+    def test_when_decoding_in_executor_fails_then_runs_callback_with_error(self):
+        self.collection.decode_threshold = 0
+        self.client.next_response = OK, '{"id": '
+
+        self.collection.all(self.stop)
+        users, error = self.wait()
+
+        assert_that(not users)
+        assert_that(error, instance_of(ValueError))
+
+    def test_when_getting_model_with_body_over_threshold_then_decodes_in_executor(self):
+        self.collection = Users(self.client)
+        self.collection.decode_executor = self.executor
+        self.collection.decode_threshold = 0
+        self.client.next_response = OK, escape.json_encode(
+            {'id': 1, 'name': 'Foo', 'email': 'foo@example.com'})
+
+        self.collection.get(1, self.stop)
+        user, error = self.wait()
+
+        assert_that(not error)
+        assert_that(user, has_properties(id=1, name=u'Foo', _persisted=True))
+
+    def test_when_cancelled_while_decoding_in_executor_then_runs_callback_with_cancelled_error(self):
+        self.collection.decode_threshold = 0
+        self.client.next_response = OK, self.json_collection
+
+        self.collection.all(self.stop).cancel()
+        users, error = self.wait()
+
+        assert_that(users, is_(None))
+        assert_that(error, instance_of(errors.Cancelled))
+
+    def test_when_process_pool_cannot_run_decode_method_then_warns_and_decodes_in_current_thread(self):
+        executor = futures.ProcessPoolExecutor(1)
+        self.collection.decode_executor = executor
+        self.collection.decode_threshold = 0
+        self.client.next_response = OK, self.json_collection
+
+        with self.assertLogs('finch.collection', 'WARNING') as logs:
+            self.collection.all(self.stop)
+            users, error = self.wait()
+
+        executor.shutdown()
+
+        assert_that(not error)
+        assert_that(self.collection.decoded_in, is_(threading.current_thread()))
+        assert_that(logs.output, contains(contains_string('UsersWithThreadRecord')))
+
+    def setup(self):
+        self.executor = futures.ThreadPoolExecutor(1)
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = UsersWithThreadRecord(self.client)
+        self.collection.decode_executor = self.executor
+
+        self.json_collection = escape.json_encode([
+            {
+                'id': 1,
+                'name': 'Foo',
+                'email': 'foo@example.com'
+            }
+        ])
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(TestDecodeInExecutor, self).tearDown()
+
+
 class TestGetModelFromCollection(AsyncTestCase):
     def test_when_response_is_a_json_object_then_runs_callback_with_model(self):
         self.client.next_response = OK, self.json_model
@@ -541,6 +1289,92 @@ class TestAddPersistedModelToCollection(AddModelMixin, AsyncTestCase):
         })
 
 
+class TestPatchModelInCollection(AsyncTestCase):
+    def test_when_model_was_fetched_then_client_performs_http_patch_with_changed_fields(self):
+        self.client.next_response = OK, self.json_model
+        self.collection.get(1, self.stop)
+        user, _ = self.wait()
+        user.name = 'Bar'
+
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        last_request = self.client.last_request
+
+        assert_that(last_request.method, is_('PATCH'))
+        assert_that(last_request.url, is_('/users/1'))
+        assert_that(last_request.headers['Content-Type'], is_('application/merge-patch+json'))
+        assert_that(escape.json_decode(last_request.body), is_({'name': 'Bar'}))
+
+    def test_when_patch_format_is_json_patch_then_client_performs_http_patch_with_operations(self):
+        self.collection.patch_format = 'json-patch'
+        self.client.next_response = OK, self.json_model
+        self.collection.get(1, self.stop)
+        user, _ = self.wait()
+        user.email = 'bar@example.com'
+
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        last_request = self.client.last_request
+
+        assert_that(last_request.headers['Content-Type'], is_('application/json-patch+json'))
+        assert_that(escape.json_decode(last_request.body), is_([
+            {'op': 'replace', 'path': '/email', 'value': 'bar@example.com'}]))
+
+    def test_when_model_has_not_changed_then_runs_callback_without_request(self):
+        self.client.next_response = OK, self.json_model
+        self.collection.get(1, self.stop)
+        user, _ = self.wait()
+        requests = len(self.client.requests)
+
+        self.collection.add(user, self.stop)
+        result, error = self.wait()
+
+        assert_that(result, is_(user))
+        assert_that(error, is_(None))
+        assert_that(self.client.requests, has_length(requests))
+
+    def test_when_patched_then_only_later_changes_are_sent(self):
+        self.client.next_response = OK, self.json_model
+        self.collection.get(1, self.stop)
+        user, _ = self.wait()
+        user.name = 'Bar'
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        user.email = 'bar@example.com'
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        assert_that(escape.json_decode(self.client.last_request.body),
+                    is_({'email': 'bar@example.com'}))
+
+    def test_when_model_has_no_baseline_then_client_performs_http_put(self):
+        user = User(id=1, name='Foo', email='foo@example.com')
+        user._persisted = True
+
+        self.client.next_response = NO_CONTENT, ''
+        self.collection.add(user, self.stop)
+        self.wait()
+
+        assert_that(self.client.last_request.method, is_('PUT'))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = PatchedUsers(self.client)
+
+        self.json_model = escape.json_encode({
+            'id': 1,
+            'name': 'Foo',
+            'email': 'foo@example.com'
+        })
+
+
 class TestDelete(AsyncTestCase):
     def test_should_perform_http_delete_to_resource_url(self):
         self.client.next_response = NO_CONTENT, ''
@@ -622,6 +1456,42 @@ class Users(Collection):
     url = '/users'
 
 
+class PatchedUsers(Users):
+    patch_format = 'merge'
+
+
+class PaginatedUsers(Users):
+    def next_page(self, response):
+        return response.headers.get('Link')
+
+
+class CountedUsers(Users):
+    total_header = 'X-Total-Count'
+
+
+class OffsetPaginatedUsers(CountedUsers):
+    offset_param = 'offset'
+    page_size = 1
+
+
+class CachedUsers(Users):
+    fresh_ttl = 10
+    stale_ttl = 20
+
+
+class LazyUsers(Users):
+    lazy = True
+
+
+class UsersWithThreadRecord(Users):
+    decoded_in = None
+
+    def decode(self, response):
+        self.decoded_in = threading.current_thread()
+
+        return escape.json_decode(response.body)
+
+
 class UsersWithCollectionDecode(Users):
     def decode(self, response):
         raw = escape.json_decode(response.body)
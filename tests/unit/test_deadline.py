@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from hamcrest import *
+
+from finch.deadline import Deadline
+
+
+class TestDeadline(object):
+    def test_when_created_then_remaining_is_timeout(self):
+        deadline = Deadline(5, clock=lambda: 100)
+
+        assert_that(deadline.remaining(), is_(5))
+        assert_that(deadline.expired, is_(False))
+
+    def test_when_time_passes_then_remaining_shrinks(self):
+        now = [100]
+        deadline = Deadline(5, clock=lambda: now[0])
+
+        now[0] = 103
+
+        assert_that(deadline.remaining(), is_(2))
+
+    def test_when_timeout_is_spent_then_is_expired(self):
+        now = [100]
+        deadline = Deadline(5, clock=lambda: now[0])
+
+        now[0] = 106
+
+        assert_that(deadline.remaining(), is_(0))
+        assert_that(deadline.expired, is_(True))
+
+    def test_when_from_timeout_with_deadline_then_returns_same_deadline(self):
+        deadline = Deadline(5)
+
+        assert_that(Deadline.from_timeout(deadline), is_(deadline))
+        assert_that(Deadline.from_timeout(None), is_(None))
+        assert_that(Deadline.from_timeout(5), instance_of(Deadline))
+
+    def test_when_created_without_timeout_then_never_expires(self):
+        deadline = Deadline()
+
+        assert_that(deadline.remaining(), is_(None))
+        assert_that(deadline.expired, is_(False))
+
+    def test_when_cancelled_then_runs_cancel_callbacks_once(self):
+        deadline = Deadline()
+        calls = []
+        deadline.add_cancel_callback(lambda: calls.append(1))
+        deadline.add_cancel_callback(lambda: calls.append(2))
+
+        deadline.cancel()
+        deadline.cancel()
+
+        assert_that(deadline.cancelled, is_(True))
+        assert_that(calls, contains(1, 2))
+
+    def test_when_cancel_callback_is_removed_then_does_not_run_it(self):
+        deadline = Deadline()
+        calls = []
+        callback = lambda: calls.append(1)
+        deadline.add_cancel_callback(callback)
+
+        deadline.remove_cancel_callback(callback)
+        deadline.cancel()
+
+        assert_that(calls, is_(empty()))
+
+    def test_when_detached_then_expires_with_deadline_but_is_not_cancelled(self):
+        deadline = Deadline(5, clock=lambda: 100)
+        detached = deadline.detached()
+
+        deadline.cancel()
+
+        assert_that(detached.remaining(), is_(5))
+        assert_that(detached.cancelled, is_(False))
+
+    def test_when_child_then_is_cancelled_with_deadline(self):
+        deadline = Deadline(5, clock=lambda: 100)
+        child = deadline.child()
+
+        deadline.cancel()
+
+        assert_that(child.remaining(), is_(5))
+        assert_that(child.cancelled, is_(True))
+
+    def test_when_child_is_cancelled_then_deadline_is_not(self):
+        deadline = Deadline()
+
+        deadline.child().cancel()
+
+        assert_that(deadline.cancelled, is_(False))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import time
+from concurrent import futures
+from functools import partial
+
+from hamcrest import *
+
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import Session, Collection
+from finch.diagnostics import Diagnostics
+
+
+class TestTimedCallbacks(object):
+    def test_runs_callback_with_its_arguments(self):
+        results = []
+
+        self.diagnostics.timed(lambda *args: results.append(args))(1, 2)
+
+        assert_that(results, contains((1, 2)))
+
+    def test_records_duration_by_collection_and_method_name(self):
+        users = Users(None)
+
+        self.diagnostics.timed(partial(users.on_delete, lambda error: None))(
+            fake_httpclient._HTTPResponse(204, ''))
+
+        assert_that(self.diagnostics.stats['callbacks'], has_entries({
+            'Users.on_delete': has_entries(count=1)}))
+
+    def test_when_callback_is_slow_then_records_it(self):
+        self.diagnostics.timed(self.slow, url='/users')()
+
+        assert_that(self.diagnostics.slow, contains(has_properties(
+            name='slow', collection='TestTimedCallbacks', url='/users',
+            duration=greater_than(0.01))))
+
+    def test_when_callback_is_fast_then_does_not_record_it(self):
+        self.diagnostics.timed(lambda: None)()
+
+        assert_that(self.diagnostics.slow, is_(empty()))
+
+    def test_when_callback_raises_then_records_it(self):
+        def fail():
+            raise ValueError()
+
+        assert_that(calling(self.diagnostics.timed(fail)), raises(ValueError))
+        assert_that(self.diagnostics.stats['callbacks'], has_key('fail'))
+
+    def test_when_watchdog_running_then_samples_stack_of_slow_callback(self):
+        diagnostics = Diagnostics(slow_threshold=0.01, lag_interval=60)
+        diagnostics.start()
+
+        try:
+            diagnostics.timed(partial(self.slow, 0.1))()
+        finally:
+            diagnostics.stop()
+
+        assert_that(diagnostics.slow[0].stack, has_item(contains_string('in slow')))
+
+    def slow(self, seconds=0.02):
+        time.sleep(seconds)
+
+    def setup_method(self, method):
+        self.diagnostics = Diagnostics(slow_threshold=0.01, sample_stacks=False)
+
+
+class TestLoopLag(AsyncTestCase):
+    def test_measures_lag_of_scheduled_probes(self):
+        self.diagnostics.start()
+        self.io_loop.add_callback(time.sleep, 0.05)
+        self.io_loop.call_later(0.1, self.stop)
+        self.wait()
+
+        assert_that(self.diagnostics.stats['lag'], has_entries(
+            count=greater_than(0), max=greater_than(0.02)))
+
+    def setup(self):
+        self.diagnostics = Diagnostics(lag_interval=0.01, sample_stacks=False)
+
+    def tearDown(self):
+        self.diagnostics.stop()
+        super(TestLoopLag, self).tearDown()
+
+
+class TestSessionWithDiagnostics(object):
+    def test_times_response_callback(self):
+        self.session.fetch('/users', callback=self.on_response)
+
+        assert_that(self.diagnostics.stats['callbacks'], has_key(
+            'TestSessionWithDiagnostics.on_response'))
+
+    def test_times_auth_hook(self):
+        self.session.auth = Signer()
+
+        self.session.fetch('/users', callback=self.on_response)
+
+        assert_that(self.diagnostics.stats['callbacks'], has_key('Signer'))
+
+    def test_times_streaming_callback(self):
+        self.session.fetch('/users', callback=self.on_response,
+                           streaming_callback=self.on_chunk)
+        self.http_client.last_request.url.streaming_callback(b'[]')
+
+        assert_that(self.diagnostics.stats['callbacks'], has_key(
+            'TestSessionWithDiagnostics.on_chunk'))
+
+    def on_response(self, response):
+        pass
+
+    def on_chunk(self, chunk):
+        pass
+
+    def setup_method(self, method):
+        self.http_client = fake_httpclient.HTTPClient()
+        self.http_client.next_response = 200, ''
+        self.diagnostics = Diagnostics(sample_stacks=False)
+        self.session = Session(self.http_client, diagnostics=self.diagnostics)
+
+
+class TestCollectionWithDiagnostics(AsyncTestCase):
+    def test_times_callback_of_decode_executor(self):
+        self.collection.all(self.stop)
+        self.wait()
+
+        assert_that(self.diagnostics.stats['callbacks'], has_key(
+            'Users._on_decoded'))
+
+    def setup(self):
+        http_client = fake_httpclient.HTTPClient()
+        http_client.next_response = 200, '[]'
+        self.diagnostics = Diagnostics(sample_stacks=False)
+        self.collection = Users(Session(http_client, diagnostics=self.diagnostics))
+        self.collection.decode_executor = self.executor = futures.ThreadPoolExecutor(1)
+        self.collection.decode_threshold = 0
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(TestCollectionWithDiagnostics, self).tearDown()
+
+
+class Signer(object):
+    def __call__(self, request):
+        pass
+
+
+class Users(Collection):
+    url = '/users'
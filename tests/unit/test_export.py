@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+from hamcrest import *
+
+from finch.export import Exporter, CSV, NDJSON
+
+
+class TestExporter(object):
+    def test_when_ndjson_then_writes_a_json_document_per_line(self):
+        fileobj = io.BytesIO()
+        exporter = Exporter(fileobj, NDJSON)
+
+        exporter.write([{'id': 1}, {'id': 2}])
+        exporter.flush()
+
+        assert_that(fileobj.getvalue(), is_(b'{"id": 1}\n{"id": 2}\n'))
+        assert_that(exporter.count, is_(2))
+
+    def test_when_ndjson_with_fields_then_writes_only_those_fields(self):
+        fileobj = io.BytesIO()
+        exporter = Exporter(fileobj, NDJSON, fields=['id'])
+
+        exporter.write([{'id': 1, 'name': 'Foo'}])
+        exporter.flush()
+
+        assert_that(fileobj.getvalue(), is_(b'{"id": 1}\n'))
+
+    def test_when_csv_then_writes_header_and_a_row_per_resource(self):
+        fileobj = io.BytesIO()
+        exporter = Exporter(fileobj, CSV, fields=['id', 'name', 'tags'])
+
+        exporter.write([{'id': 1, 'name': 'Foo, Bar', 'tags': ['a']}, {'id': 2}])
+        exporter.flush()
+
+        assert_that(fileobj.getvalue().decode('utf-8').splitlines(), contains(
+            'id,name,tags',
+            '1,"Foo, Bar","[""a""]"',
+            '2,,'))
+
+    def test_when_csv_value_is_not_ascii_then_writes_it_encoded(self):
+        fileobj = io.BytesIO()
+        exporter = Exporter(fileobj, CSV, fields=[u'id', u'name'])
+
+        exporter.write([{u'id': 1, u'name': u'José'}])
+        exporter.flush()
+
+        assert_that(fileobj.getvalue(), is_(u'id,name\n1,José\n'.encode('utf-8')))
+
+    def test_when_file_is_text_then_writes_text(self):
+        fileobj = io.StringIO()
+        exporter = Exporter(fileobj, NDJSON)
+
+        exporter.write([{'name': u'José'}])
+        exporter.flush()
+
+        assert_that(fileobj.getvalue(), is_(u'{"name": "Jos\\u00e9"}\n'))
+
+    def test_when_pending_output_is_under_buffer_size_then_does_not_write(self):
+        fileobj = io.BytesIO()
+        exporter = Exporter(fileobj, NDJSON, buffer_size=20)
+
+        exporter.write([{'id': 1}])
+
+        assert_that(fileobj.getvalue(), is_(b''))
+
+        exporter.write([{'id': 2}, {'id': 3}])
+
+        assert_that(fileobj.getvalue(), is_(b'{"id": 1}\n{"id": 2}\n'))
+
+    def test_when_csv_without_fields_then_raises_value_error(self):
+        assert_that(calling(Exporter).with_args(io.BytesIO(), CSV),
+                    raises(ValueError))
+
+    def test_when_unknown_format_then_raises_value_error(self):
+        assert_that(calling(Exporter).with_args(io.BytesIO(), 'xml'),
+                    raises(ValueError))
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from hamcrest import *
+
+from finch.hedging import HedgingPolicy
+
+
+class TestHedgingPolicy(object):
+    def test_when_fixed_delay_then_returns_it(self):
+        policy = HedgingPolicy(delay=0.1)
+
+        assert_that(policy.delay(), is_(0.1))
+
+    def test_when_not_enough_latencies_then_does_not_hedge(self):
+        policy = HedgingPolicy(min_samples=3)
+
+        policy.record(0.1)
+        policy.record(0.2)
+
+        assert_that(policy.delay(), is_(None))
+
+    def test_when_enough_latencies_then_delay_is_latency_percentile(self):
+        policy = HedgingPolicy(percentile=0.9, min_samples=10)
+
+        for latency in range(1, 12):
+            policy.record(latency / 100.0)
+
+        assert_that(policy.delay(), is_(0.1))
+
+    def test_when_hedge_budget_is_spent_then_does_not_allow_hedges(self):
+        policy = HedgingPolicy(delay=0.1, max_rate=0.5)
+
+        policy.delay()
+        policy.delay()
+
+        assert_that(policy.allow(), is_(True))
+        assert_that(policy.allow(), is_(False))
+        assert_that(policy, has_properties(requests=2, hedges=1))
+
+    def test_when_budget_is_saved_then_caps_at_burst(self):
+        policy = HedgingPolicy(delay=0.1, max_rate=1, burst=2)
+
+        for _ in range(10):
+            policy.delay()
+
+        assert_that([policy.allow() for _ in range(3)], contains(True, True, False))
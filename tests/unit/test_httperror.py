@@ -27,3 +27,10 @@ class TestHTTPError(object):
 
         assert_that(str(http_error), is_('Timeout'))
         assert_that(http_error.code, is_(599))
+
+    def test_when_deadline_exceeded_then_is_timeout_http_error(self):
+        http_error = errors.DeadlineExceeded()
+
+        assert_that(http_error, instance_of(errors.HTTPError))
+        assert_that(str(http_error), is_('Deadline exceeded'))
+        assert_that(http_error.code, is_(599))
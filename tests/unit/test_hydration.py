@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+from booby import Model, errors, fields
+from hamcrest import *
+
+from finch import hydration
+
+
+class TestHydrator(object):
+    def test_builds_model_with_the_same_data_as_generic_path(self):
+        resource = {'id': 1, 'name': 'Foo', 'active': True, 'tags': ['a']}
+
+        user = hydration.hydrator(User)(resource)
+
+        assert_that(user, instance_of(User))
+        assert_that(user._data, is_(User(**resource)._data))
+
+    def test_when_fields_missing_then_uses_their_defaults(self):
+        user = hydration.hydrator(User)({'id': 1})
+
+        assert_that(user.name, is_(None))
+        assert_that(user.active, is_(False))
+
+    def test_when_unknown_key_then_raises_field_error(self):
+        assert_that(calling(hydration.hydrator(User)).with_args(
+                    {'id': 1, 'foo': 'bar'}),
+                    raises(errors.FieldError, 'foo'))
+
+    def test_when_resource_is_not_a_dict_then_raises_like_generic_path(self):
+        assert_that(calling(hydration.hydrator(User)).with_args([1]),
+                    raises(TypeError))
+
+    def test_when_embedded_field_then_builds_embedded_model(self):
+        owner = hydration.hydrator(Repo)({'id': 1, 'owner': {'id': 2}})
+
+        assert_that(owner.owner, instance_of(User))
+        assert_that(owner.owner.id, is_(2))
+
+    def test_when_embedded_field_fails_then_raises_like_generic_path(self):
+        assert_that(calling(hydration.hydrator(Repo)).with_args(
+                    {'id': 1, 'owner': {'foo': 2}}),
+                    raises(errors.FieldError, 'foo'))
+
+    def test_when_fields_have_setters_then_sets_them_in_resource_order(self):
+        Logged.log = []
+        hydration.hydrator(Logged)({'second': 2, 'first': 1})
+        generic, Logged.log = Logged.log, []
+
+        Logged(second=2, first=1)
+
+        assert_that(generic, is_([2, 1]))
+        assert_that(generic, is_(Logged.log))
+
+    def test_when_model_overrides_init_then_uses_it(self):
+        obj = hydration.hydrator(Custom)({'name': 'foo'})
+
+        assert_that(obj.name, is_('FOO'))
+
+    def test_when_field_name_is_not_an_identifier_then_builds_model(self):
+        obj = hydration.hydrator(Escaped)({'a/b': 1})
+
+        assert_that(obj['a/b'], is_(1))
+
+    def test_is_cached_per_model_class(self):
+        assert_that(hydration.hydrator(User), is_(hydration.hydrator(User)))
+
+
+class TestUpdater(object):
+    def test_updates_model_with_the_same_data_as_generic_path(self):
+        expected = User(id=1, name='Foo')
+        expected.update({'name': 'Bar', 'active': True})
+
+        hydration.updater(User)(self.user, {'name': 'Bar', 'active': True})
+
+        assert_that(self.user._data, is_(expected._data))
+
+    def test_when_unknown_key_then_raises_field_error(self):
+        assert_that(calling(hydration.updater(User)).with_args(
+                    self.user, {'foo': 'bar'}),
+                    raises(errors.FieldError, 'foo'))
+
+    def setup_method(self, method):
+        self.user = User(id=1, name='Foo')
+
+
+class TestValidator(object):
+    def test_when_values_have_field_types_then_does_not_raise(self):
+        hydration.validator(User)(User(id=1, name='Foo', active=True))
+
+    def test_when_value_is_none_then_does_not_raise(self):
+        hydration.validator(User)(User(id=1))
+
+    def test_when_value_has_wrong_type_then_raises_same_error_as_model(self):
+        user = User(id='1', name=2)
+
+        assert_that(calling(hydration.validator(User)).with_args(user),
+                    raises(errors.ValidationError, 'should be an integer'))
+        assert_that(calling(user.validate),
+                    raises(errors.ValidationError, 'should be an integer'))
+
+    def test_when_value_is_unicode_then_is_a_string(self):
+        hydration.validator(User)(User(name=u'Foo'))
+
+    def test_when_field_has_other_validators_then_runs_them(self):
+        assert_that(calling(hydration.validator(Custom)).with_args(Custom()),
+                    raises(errors.ValidationError, 'is required'))
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+    active = fields.Boolean(default=False)
+    tags = fields.Field()
+
+
+class Repo(Model):
+    id = fields.Integer()
+    owner = fields.Embedded(User)
+
+
+class LoggedField(fields.Field):
+    def __set__(self, instance, value):
+        type(instance).log.append(value)
+        super(LoggedField, self).__set__(instance, value)
+
+
+class Logged(Model):
+    log = []
+
+    first = LoggedField()
+    second = LoggedField()
+
+
+class Custom(Model):
+    name = fields.String(required=True)
+
+    def __init__(self, **kwargs):
+        super(Custom, self).__init__(**kwargs)
+
+        if self.name is not None:
+            self.name = self.name.upper()
+
+
+Escaped = type('Escaped', (Model,), {'a/b': fields.Integer()})
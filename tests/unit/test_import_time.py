@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+import unittest
+
+from hamcrest import *
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Microseconds, generous enough for slow CI machines
+IMPORT_TIME_BUDGET = 500000
+
+LAZY_MODULES = ['oauthlib', 'multiprocessing', 'pycurl', 'tempfile', 'mmap']
+
+
+class TestImportTime(object):
+    def test_when_importing_finch_then_takes_less_than_budget(self):
+        times = self.import_times()
+
+        assert_that(times['finch'], less_than(IMPORT_TIME_BUDGET))
+
+    def test_when_importing_finch_then_does_not_import_optional_dependencies(self):
+        imported = [name.split('.')[0] for name in self.import_times()]
+
+        for name in LAZY_MODULES:
+            assert_that(imported, is_not(has_item(name)))
+
+    def import_times(self):
+        if sys.version_info < (3, 7):
+            raise unittest.SkipTest('-X importtime requires Python 3.7')
+
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-c', 'import finch'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+
+        _, output = process.communicate()
+
+        assert_that(process.returncode, is_(0), output)
+
+        times = {}
+
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+
+            _, cumulative, name = line.split('|')
+            times[name.strip()] = int(cumulative)
+
+        return times
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from hamcrest import *
+
+from tests.unit import fake_httpclient
+
+from finch.limiter import AdaptiveLimiter
+
+HOST = 'example.com'
+OK = fake_httpclient._HTTPResponse(200, '')
+TOO_MANY_REQUESTS = fake_httpclient._HTTPResponse(429, '')
+TIMEOUT = fake_httpclient._HTTPResponse(599, '')
+
+
+class TestAdaptiveLimiter(object):
+    def test_when_under_limit_then_starts_request(self):
+        limiter, started, now = self.limiter(initial_limit=2)
+
+        self.acquire(limiter, started, 2)
+
+        assert_that(started, has_length(2))
+        assert_that(limiter.pending(HOST), is_(0))
+
+    def test_when_limit_is_reached_then_waits_for_release(self):
+        limiter, started, now = self.limiter(initial_limit=1)
+
+        self.acquire(limiter, started, 2)
+
+        assert_that(started, has_length(1))
+
+        limiter.release(HOST, OK, 0.1)
+
+        assert_that(started, has_length(2))
+
+    def test_when_saturated_with_fast_responses_then_increases_limit(self):
+        limiter, started, now = self.limiter(initial_limit=2)
+        self.acquire(limiter, started, 3)
+
+        for _ in range(6):
+            limiter.release(HOST, OK, 0.1)
+            self.acquire(limiter, started, 1)
+
+        assert_that(limiter.limit(HOST), is_(4))
+
+    def test_when_not_saturated_then_keeps_limit(self):
+        limiter, started, now = self.limiter(initial_limit=2)
+
+        for _ in range(10):
+            self.acquire(limiter, started, 1)
+            limiter.release(HOST, OK, 0.1)
+
+        assert_that(limiter.limit(HOST), is_(2))
+
+    def test_when_overload_response_then_decreases_limit(self):
+        for response in (TOO_MANY_REQUESTS, TIMEOUT):
+            limiter, started, now = self.limiter(initial_limit=8)
+            self.acquire(limiter, started, 1)
+
+            limiter.release(HOST, response, 0.1)
+
+            assert_that(limiter.limit(HOST), is_(4))
+
+    def test_when_latency_rises_over_tolerance_then_decreases_limit(self):
+        limiter, started, now = self.limiter(initial_limit=8, tolerance=2)
+        self.acquire(limiter, started, 2)
+
+        limiter.release(HOST, OK, 0.1)
+        now[0] += 1
+        limiter.release(HOST, OK, 0.3)
+
+        assert_that(limiter.limit(HOST), is_(4))
+
+    def test_when_latency_stays_higher_then_baseline_follows_it(self):
+        limiter, started, now = self.limiter(initial_limit=8, tolerance=2, window=10)
+        self.acquire(limiter, started, 1)
+        limiter.release(HOST, OK, 0.1)
+
+        for _ in range(30):
+            now[0] += 1
+            self.acquire(limiter, started, 1)
+            limiter.release(HOST, OK, 0.25)
+
+        assert_that(limiter.limit(HOST), is_(4))
+
+    def test_when_burst_of_failures_then_decreases_limit_once(self):
+        limiter, started, now = self.limiter(initial_limit=8)
+        self.acquire(limiter, started, 3)
+        now[0] += 1
+
+        for _ in range(3):
+            limiter.release(HOST, TOO_MANY_REQUESTS, 0.5)
+
+        assert_that(limiter.limit(HOST), is_(4))
+
+    def test_when_limit_decreases_then_keeps_min_limit(self):
+        limiter, started, now = self.limiter(initial_limit=1, min_limit=1)
+        self.acquire(limiter, started, 1)
+
+        limiter.release(HOST, TOO_MANY_REQUESTS, 0.1)
+
+        assert_that(limiter.limit(HOST), is_(1))
+
+    def test_when_released_without_response_then_keeps_limit(self):
+        limiter, started, now = self.limiter(initial_limit=2)
+        self.acquire(limiter, started, 2)
+
+        limiter.release(HOST)
+
+        assert_that(limiter.limit(HOST), is_(2))
+        assert_that(limiter.in_flight(HOST), is_(1))
+
+    def limiter(self, **options):
+        now = [1000]
+        limiter = AdaptiveLimiter(clock=lambda: now[0], **options)
+
+        return limiter, [], now
+
+    def acquire(self, limiter, started, count):
+        for _ in range(count):
+            limiter.acquire(HOST, lambda: started.append(True))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from booby import Model, fields
+from tornado import escape
+from hamcrest import *
+
+from finch import patch
+
+
+class TestChangedFields(object):
+    def test_when_model_has_no_snapshot_then_returns_none(self):
+        assert_that(patch.changed_fields(self.user), is_(None))
+
+    def test_when_no_field_changed_then_returns_empty_list(self):
+        patch.snapshot(self.user)
+
+        assert_that(patch.changed_fields(self.user), is_([]))
+
+    def test_when_fields_changed_then_returns_their_names(self):
+        patch.snapshot(self.user)
+        self.user.name = 'Bar'
+
+        assert_that(patch.changed_fields(self.user), is_(['name']))
+
+    def test_when_list_field_mutated_in_place_then_returns_its_name(self):
+        patch.snapshot(self.user)
+        self.user.tags.append('c')
+
+        assert_that(patch.changed_fields(self.user), is_(['tags']))
+
+    def setup_method(self, method):
+        self.user = User(id=1, name='Foo', tags=['a', 'b'])
+
+
+class TestEncode(object):
+    def test_when_merge_patch_then_returns_object_with_fields(self):
+        body, content_type = patch.encode(self.user, ['name'], patch.MERGE_PATCH)
+
+        assert_that(escape.json_decode(body), is_({'name': 'Foo'}))
+        assert_that(content_type, is_('application/merge-patch+json'))
+
+    def test_when_json_patch_then_returns_replace_operations(self):
+        patch.snapshot(self.user)
+
+        body, content_type = patch.encode(self.user, ['name', 'tags'], patch.JSON_PATCH)
+
+        assert_that(escape.json_decode(body), is_([
+            {'op': 'replace', 'path': '/name', 'value': 'Foo'},
+            {'op': 'replace', 'path': '/tags', 'value': ['a', 'b']}]))
+        assert_that(content_type, is_('application/json-patch+json'))
+
+    def test_when_json_patch_field_was_absent_then_returns_add_operation(self):
+        user = User(id=1, tags=['a'])
+        patch.snapshot(user)
+        user.name = 'Foo'
+        user.tags = ['b']
+
+        body, _ = patch.encode(user, patch.changed_fields(user), patch.JSON_PATCH)
+
+        assert_that(escape.json_decode(body), contains_inanyorder(
+            {'op': 'add', 'path': '/name', 'value': 'Foo'},
+            {'op': 'replace', 'path': '/tags', 'value': ['b']}))
+
+    def test_when_json_patch_field_name_has_special_chars_then_escapes_pointer(self):
+        user = Escaped(**{'a/b~c': 1})
+
+        body, _ = patch.encode(user, ['a/b~c'], patch.JSON_PATCH)
+
+        assert_that(escape.json_decode(body)[0]['path'], is_('/a~1b~0c'))
+
+    def test_when_unknown_format_then_raises_value_error(self):
+        assert_that(calling(patch.encode).with_args(self.user, ['name'], 'xml'),
+                    raises(ValueError))
+
+    def setup_method(self, method):
+        self.user = User(id=1, name='Foo', tags=['a', 'b'])
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+    tags = fields.Field()
+
+
+Escaped = type('Escaped', (Model,), {'a/b~c': fields.Integer()})
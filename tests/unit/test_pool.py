@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from hamcrest import *
+
+from tests.unit import fake_httpclient
+
+from finch.pool import ConnectionPool
+
+
+class TestConnectionPool(object):
+    def test_when_host_has_free_slots_then_starts_immediately(self):
+        pool = ConnectionPool(max_host_connections=2)
+        started = []
+
+        pool.acquire('example.com', lambda: started.append(1))
+        pool.acquire('example.com', lambda: started.append(2))
+
+        assert_that(started, contains(1, 2))
+
+    def test_when_host_is_full_then_queues_until_released(self):
+        pool = ConnectionPool(max_host_connections=1)
+        started = []
+
+        pool.acquire('example.com', lambda: started.append(1))
+        pool.acquire('example.com', lambda: started.append(2))
+
+        assert_that(started, contains(1))
+        assert_that(pool.pending('example.com'), is_(1))
+
+        pool.release('example.com')
+
+        assert_that(started, contains(1, 2))
+        assert_that(pool.pending('example.com'), is_(0))
+
+    def test_when_host_is_full_then_other_hosts_are_not_queued(self):
+        pool = ConnectionPool(max_host_connections=1)
+        started = []
+
+        pool.acquire('example.com', lambda: started.append(1))
+        pool.acquire('example.org', lambda: started.append(2))
+
+        assert_that(started, contains(1, 2))
+
+    def test_when_response_made_new_connection_then_counts_new_connection_and_handshake(self):
+        pool = ConnectionPool(curl=True)
+
+        pool.record(fake_httpclient._HTTPResponse(
+            200, '', time_info={'connect': 0.01, 'appconnect': 0.05}))
+
+        assert_that(pool.stats, has_entries(
+            requests=1, new_connections=1, reused_connections=0,
+            handshake_time=close_to(0.04, 0.0001)))
+
+    def test_when_response_reused_connection_then_counts_reused_connection(self):
+        pool = ConnectionPool(curl=True)
+
+        pool.record(fake_httpclient._HTTPResponse(
+            200, '', time_info={'connect': 0, 'appconnect': 0}))
+
+        assert_that(pool.stats, has_entries(
+            requests=1, new_connections=0, reused_connections=1))
+
+    def test_when_not_curl_then_connection_stats_are_none(self):
+        pool = ConnectionPool()
+
+        pool.record(fake_httpclient._HTTPResponse(200, ''))
+
+        assert_that(pool.stats, has_entries(
+            requests=1, new_connections=None, reused_connections=None,
+            handshake_time=None))
+
+    def test_when_curl_then_request_options_include_prepare_curl_callback(self):
+        pool = ConnectionPool(curl=True)
+
+        assert_that(pool.request_options(), has_key('prepare_curl_callback'))
+
+    def test_when_not_curl_then_creates_simple_client(self):
+        pool = ConnectionPool(max_clients=20)
+
+        client = pool.create_client()
+
+        assert_that(type(client).__name__, is_('SimpleAsyncHTTPClient'))
+        assert_that(client.max_clients, is_(20))
+
+        client.close()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from http.client import OK, NOT_FOUND
+except ImportError:
+    from httplib import OK, NOT_FOUND
+
+from booby import Model, fields
+from tornado import escape
+from hamcrest import *
+
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import errors, Collection
+
+
+class TestIncludeReferences(AsyncTestCase):
+    def test_when_including_reference_then_attaches_related_models(self):
+        self.collection.all(self.stop, include=['owner'])
+        repos, error = self.wait()
+
+        assert_that(not error)
+        assert_that(repos, contains(
+            has_property('_related', has_entry('owner', has_properties(id=1, name=u'Foo'))),
+            has_property('_related', has_entry('owner', has_properties(id=1, name=u'Foo'))),
+            has_property('_related', has_entry('owner', has_properties(id=2, name=u'Jack')))))
+
+    def test_when_including_reference_then_fetches_each_related_resource_once(self):
+        self.collection.all(self.stop, include=['owner'])
+        self.wait()
+
+        assert_that(self.client.urls, contains_inanyorder(
+            '/repos', '/users/1', '/users/2'))
+
+    def test_when_including_url_reference_then_fetches_related_url(self):
+        self.collection.all(self.stop, include=['creator'])
+        repos, error = self.wait()
+
+        assert_that(not error)
+        assert_that(repos[0]._related['creator'], has_properties(id=2, name=u'Jack'))
+        assert_that(self.client.urls, contains_inanyorder(
+            '/repos', 'http://example.com/users/jack'))
+
+    def test_when_querying_with_include_then_attaches_related_models(self):
+        self.collection.query(self.stop, {'private': 'false'}, include=['owner'])
+        repos, error = self.wait()
+
+        assert_that(not error)
+        assert_that(repos[2]._related['owner'], has_properties(id=2))
+
+    def test_when_related_resource_fails_then_runs_callback_with_error(self):
+        del self.client.routes['/users/2']
+
+        self.collection.all(self.stop, include=['owner'])
+        repos, error = self.wait()
+
+        assert_that(not repos)
+        assert_that(error, instance_of(errors.HTTPError))
+
+    def test_when_including_field_that_is_not_reference_then_runs_callback_with_value_error(self):
+        self.collection.all(self.stop, include=['name'])
+        repos, error = self.wait()
+
+        assert_that(not repos)
+        assert_that(error, instance_of(ValueError))
+
+    def setup(self):
+        self.client = RoutingHTTPClient({
+            '/repos': escape.json_encode([
+                {'id': 1, 'name': 'finch', 'owner': 1, 'creator': 'http://example.com/users/jack'},
+                {'id': 2, 'name': 'booby', 'owner': 1, 'creator': 'http://example.com/users/jack'},
+                {'id': 3, 'name': 'doublex', 'owner': 2, 'creator': 'http://example.com/users/jack'}
+            ]),
+            '/users/1': escape.json_encode({'id': 1, 'name': 'Foo'}),
+            '/users/2': escape.json_encode({'id': 2, 'name': 'Jack'}),
+            'http://example.com/users/jack': escape.json_encode({'id': 2, 'name': 'Jack'})
+        })
+        self.collection = Repos(self.client)
+
+
+class RoutingHTTPClient(object):
+    def __init__(self, routes):
+        self.routes = routes
+        self.urls = []
+
+    def fetch(self, url, callback, **kwargs):
+        self.urls.append(url)
+
+        if url in self.routes:
+            callback(fake_httpclient._HTTPResponse(OK, self.routes[url]))
+        else:
+            callback(fake_httpclient._HTTPResponse(NOT_FOUND, 'Not Found'))
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+
+
+class Users(Collection):
+    model = User
+    url = '/users'
+
+
+class Repo(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+    owner = fields.Integer(reference=Users)
+    creator = fields.String(reference=Users, reference_by='url')
+
+
+class Repos(Collection):
+    model = Repo
+    url = '/repos'
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import socket
+
+from hamcrest import *
+from tornado.concurrent import Future
+
+from tests.unit import AsyncTestCase
+
+from finch.resolver import CachingResolver
+
+ADDRINFO = [(socket.AF_INET, ('10.0.0.1', 80))]
+
+
+class TestCachingResolver(AsyncTestCase):
+    def test_when_resolving_then_returns_wrapped_resolver_addresses(self):
+        future = self.resolver.resolve('example.com', 80)
+        self.fake.lookups.pop().set_result(ADDRINFO)
+
+        assert_that(self.result(future), is_(ADDRINFO))
+
+    def test_when_resolving_cached_name_then_does_not_query_wrapped_resolver(self):
+        self.resolve_once()
+
+        future = self.resolver.resolve('example.com', 80)
+
+        assert_that(self.fake.lookups, is_(empty()))
+        assert_that(self.result(future), is_(ADDRINFO))
+
+    def test_when_cached_name_expires_then_queries_wrapped_resolver(self):
+        self.resolve_once()
+        self.now += 301
+
+        self.resolver.resolve('example.com', 80)
+
+        assert_that(self.fake.lookups, has_length(1))
+
+    def test_when_resolving_name_concurrently_then_queries_wrapped_resolver_once(self):
+        first = self.resolver.resolve('example.com', 80)
+        second = self.resolver.resolve('example.com', 80)
+
+        assert_that(self.fake.lookups, has_length(1))
+
+        self.fake.lookups.pop().set_result(ADDRINFO)
+
+        assert_that(self.result(first), is_(ADDRINFO))
+        assert_that(self.result(second), is_(ADDRINFO))
+
+    def test_when_lookup_fails_and_stale_entry_then_returns_stale_addresses(self):
+        self.resolve_once()
+        self.now += 301
+
+        future = self.resolver.resolve('example.com', 80)
+        self.fake.lookups.pop().set_exception(IOError('DNS failure'))
+
+        assert_that(self.result(future), is_(ADDRINFO))
+
+    def test_when_lookup_fails_and_stale_entry_is_too_old_then_raises_error(self):
+        self.resolve_once()
+        self.now += 301 + 3600
+
+        future = self.resolver.resolve('example.com', 80)
+        self.fake.lookups.pop().set_exception(IOError('DNS failure'))
+
+        assert_that(calling(self.result).with_args(future), raises(IOError))
+
+    def test_when_name_is_overridden_then_returns_override_address(self):
+        self.resolver = CachingResolver(
+            resolver=self.fake, overrides={'example.com': '127.0.0.1'})
+
+        future = self.resolver.resolve('example.com', 8080)
+
+        assert_that(self.fake.lookups, is_(empty()))
+        assert_that(self.result(future), is_(
+            [(socket.AF_INET, ('127.0.0.1', 8080))]))
+
+    def resolve_once(self):
+        future = self.resolver.resolve('example.com', 80)
+        self.fake.lookups.pop().set_result(ADDRINFO)
+        self.result(future)
+
+    def result(self, future):
+        self.io_loop.add_future(future, self.stop)
+
+        return self.wait()[0].result()
+
+    def setup(self):
+        self.now = 1000
+        self.fake = FakeResolver()
+        self.resolver = CachingResolver(resolver=self.fake, clock=lambda: self.now)
+
+
+class FakeResolver(object):
+    def __init__(self):
+        self.lookups = []
+
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        future = Future()
+        self.lookups.append(future)
+
+        return future
+
+    def close(self):
+        pass
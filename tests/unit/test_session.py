@@ -1,15 +1,36 @@
 # -*- coding: utf-8 -*-
 
+import logging
+import sys
+import time
+from io import BytesIO
+
 from tornado import httpclient
 from hamcrest import *
 from doublex import *
 
-from finch import Session, auth
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import Session, auth, errors
+from finch.breaker import CircuitBreaker, CLOSED, OPEN
+from finch.deadline import Deadline
+from finch.hedging import HedgingPolicy
+from finch.limiter import AdaptiveLimiter
+from finch.pool import ConnectionPool
+from finch.resolver import CachingResolver
 
 
 CALLBACK = lambda: None
 
 
+def _pooled(http_client, pool, **kwargs):
+    # The pool can't configure a fake client, so it is set afterwards
+    session = Session(http_client, **kwargs)
+    session.pool = pool
+
+    return session
+
+
 class TestSession(object):
     def test_when_fetch_then_calls_http_client_fetch_with_the_same_args(self):
         with Spy(httpclient.HTTPClient()) as http_client:
@@ -78,3 +99,572 @@ class TestSessionWithAuth(object):
         session.fetch('/users', callback=CALLBACK)
 
         assert_that(auth, called().with_args(instance_of(httpclient.HTTPRequest)))
+
+
+class TestSessionWithPool(object):
+    def test_when_host_connections_are_exhausted_then_queues_requests(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = _pooled(http_client, ConnectionPool(max_host_connections=1))
+
+        session.fetch('http://example.com/users', callback=lambda response: None)
+        session.fetch('http://example.com/users/1', callback=lambda response: None)
+
+        assert_that(http_client.pending, has_length(1))
+
+        http_client.respond(200)
+
+        assert_that(http_client.pending, contains(
+            contains(has_property('url', 'http://example.com/users/1'), anything())))
+
+    def test_when_response_then_runs_callback_and_records_stats(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = _pooled(http_client, ConnectionPool(curl=True))
+        responses = []
+
+        session.fetch('http://example.com/users', callback=responses.append)
+        http_client.respond(200, time_info={'connect': 0})
+
+        assert_that(responses, contains(has_property('code', 200)))
+        assert_that(session.stats, has_entries(requests=1, reused_connections=1))
+
+    def test_when_warmup_then_opens_one_request_per_connection(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = _pooled(http_client, ConnectionPool(max_host_connections=2),
+                          base_url='http://example.com/')
+        results = []
+
+        session.warmup(results.append)
+
+        assert_that(http_client.pending, contains(
+            contains(has_properties(url='http://example.com/', method='HEAD'), anything()),
+            contains(has_properties(url='http://example.com/', method='HEAD'), anything())))
+
+        http_client.respond(405)
+        http_client.respond(405)
+
+        assert_that(results, contains(None))
+
+    def test_when_warmup_cannot_connect_then_runs_callback_with_http_error(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = _pooled(http_client, ConnectionPool())
+        results = []
+
+        session.warmup(results.append, urls=['http://example.com/'])
+        http_client.respond(599)
+
+        assert_that(results, contains(instance_of(errors.HTTPError)))
+
+    def test_when_warmup_without_urls_then_runs_callback_at_once(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = _pooled(http_client, ConnectionPool())
+        results = []
+
+        session.warmup(results.append, urls=[])
+
+        assert_that(http_client.pending, is_(empty()))
+        assert_that(results, contains(None))
+
+    def test_when_warmup_without_urls_nor_base_url_then_raises_value_error(self):
+        session = _pooled(fake_httpclient.DeferredHTTPClient(), ConnectionPool())
+
+        assert_that(calling(session.warmup).with_args(CALLBACK), raises(ValueError))
+
+    def test_when_pool_and_http_client_then_raises_value_error(self):
+        assert_that(calling(Session).with_args(
+                    fake_httpclient.HTTPClient(), pool=ConnectionPool()),
+                    raises(ValueError))
+
+
+class TestSessionWithResolver(object):
+    def test_when_pool_uses_curl_then_raises_value_error(self):
+        assert_that(calling(Session).with_args(
+                    pool=ConnectionPool(curl=True), resolver=CachingResolver()),
+                    raises(ValueError))
+
+    def test_when_session_creates_http_client_then_uses_resolver(self):
+        resolver = CachingResolver(overrides={'example.com': '127.0.0.1'})
+
+        session = Session(resolver=resolver)
+
+        assert_that(session.http_client.resolver, is_(resolver))
+
+        session.http_client.close()
+
+    def test_when_http_client_is_given_then_resolver_raises_value_error(self):
+        assert_that(calling(Session).with_args(Stub(), resolver=CachingResolver()),
+                    raises(ValueError))
+
+
+class TestSessionWithHedging(AsyncTestCase):
+    def test_when_request_is_slower_than_delay_then_sends_duplicate(self):
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        assert_that(self.http_client.pending, has_length(2))
+
+    def test_when_duplicate_answers_first_then_runs_callback_once_with_it(self):
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        self.http_client.respond(200, 'hedged', index=1)
+        self.http_client.respond(200, 'primary')
+
+        assert_that(self.responses, contains(has_property('body', 'hedged')))
+
+    def test_when_request_answers_before_delay_then_does_not_send_duplicate(self):
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+        self.http_client.respond(200)
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        assert_that(self.http_client.pending, is_(empty()))
+        assert_that(self.responses, has_length(1))
+
+    def test_when_first_response_is_server_error_then_waits_for_the_other(self):
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        self.http_client.respond(503)
+        self.http_client.respond(200)
+
+        assert_that(self.responses, contains(has_property('code', 200)))
+
+    def test_when_one_attempt_answers_then_cancels_the_other(self):
+        self.session.limiter = limiter = AdaptiveLimiter()
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        self.http_client.respond(200, 'hedged', index=1)
+
+        assert_that(limiter.in_flight('example.com'), is_(0))
+
+    def test_when_deadline_is_cancelled_then_cancels_every_attempt(self):
+        self.session.limiter = limiter = AdaptiveLimiter()
+        deadline = Deadline()
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy, deadline=deadline)
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        deadline.cancel()
+
+        assert_that(limiter.in_flight('example.com'), is_(0))
+        assert_that(self.responses, contains(has_property(
+            'error', instance_of(errors.Cancelled))))
+
+    def test_when_session_has_auth_then_signs_each_attempt(self):
+        self.session.auth = Nonce()
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy)
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        assert_that([request.headers['X-Nonce'] for request, _ in self.http_client.pending],
+                    contains('1', '2'))
+
+    def test_when_request_is_not_get_then_does_not_hedge(self):
+        self.session.fetch('http://example.com/users', callback=self.responses.append,
+                           hedge=self.policy, method='DELETE')
+
+        self.io_loop.add_timeout(self.io_loop.time() + 0.02, self.stop)
+        self.wait()
+
+        assert_that(self.http_client.pending, has_length(1))
+
+    def setup(self):
+        self.http_client = fake_httpclient.DeferredHTTPClient()
+        self.session = Session(self.http_client)
+        self.policy = HedgingPolicy(delay=0.01, max_rate=1)
+        self.responses = []
+
+
+class Nonce(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, request):
+        self.count += 1
+        request.headers['X-Nonce'] = str(self.count)
+
+
+class TestSessionWithDeadline(object):
+    def test_when_deadline_is_expired_then_runs_callback_without_fetching(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+        responses = []
+
+        session.fetch('/users', callback=responses.append, deadline=Deadline(0))
+
+        assert_that(http_client.pending, is_(empty()))
+        assert_that(responses, contains(has_properties(
+            code=599, error=instance_of(errors.DeadlineExceeded))))
+
+    def test_when_deadline_is_shorter_than_request_timeout_then_shrinks_timeouts(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+
+        session.fetch('/users', callback=CALLBACK, request_timeout=60,
+                      deadline=Deadline(5))
+
+        request = http_client.pending[0][0]
+
+        assert_that(request.request_timeout, less_than_or_equal_to(5))
+        assert_that(request.connect_timeout, less_than_or_equal_to(5))
+
+    def test_when_request_times_out_after_deadline_then_response_has_deadline_error(self):
+        now = [100]
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+        responses = []
+
+        session.fetch('/users', callback=responses.append,
+                      deadline=Deadline(5, clock=lambda: now[0]))
+        now[0] = 106
+        http_client.respond(599)
+
+        assert_that(responses, contains(has_property(
+            'error', instance_of(errors.DeadlineExceeded))))
+
+
+class TestSessionWithCircuitBreaker(object):
+    def test_when_host_keeps_failing_then_opens_circuit(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        breaker = CircuitBreaker(min_requests=2)
+        session = Session(http_client, circuit_breaker=breaker)
+
+        for _ in range(2):
+            session.fetch('http://example.com/users', callback=lambda response: None)
+            http_client.respond(599)
+
+        assert_that(breaker.state('example.com'), is_(OPEN))
+
+    def test_when_circuit_is_open_then_rejects_requests_without_fetching(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client, circuit_breaker=CircuitBreaker(min_requests=1))
+        responses = []
+
+        session.fetch('http://example.com/users', callback=responses.append)
+        http_client.respond(503)
+        session.fetch('http://example.com/users', callback=responses.append)
+
+        assert_that(http_client.pending, is_(empty()))
+        assert_that(responses[-1], has_properties(
+            code=599, error=instance_of(errors.CircuitOpenError)))
+
+
+    def test_when_response_has_request_time_then_records_it_as_latency(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        breaker = CircuitBreaker(min_requests=1, slow_threshold=0.05)
+        session = Session(http_client, circuit_breaker=breaker)
+
+        session.fetch('http://example.com/users', callback=lambda response: None)
+        request, callback = http_client.pending.pop()
+        time.sleep(0.06)
+        callback(httpclient.HTTPResponse(request, 200, request_time=0.01))
+
+        assert_that(breaker.state('example.com'), is_(CLOSED))
+
+
+class TestSessionWithLimiter(object):
+    def test_when_limit_is_reached_then_queues_requests(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client, limiter=AdaptiveLimiter(initial_limit=2))
+
+        for _ in range(3):
+            session.fetch('http://example.com/users', callback=lambda response: None)
+
+        assert_that(http_client.pending, has_length(2))
+
+    def test_when_response_arrives_then_sends_queued_request(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=1)
+        session = Session(http_client, limiter=limiter)
+        responses = []
+
+        session.fetch('http://example.com/users', callback=responses.append)
+        session.fetch('http://example.com/users', callback=responses.append)
+        http_client.respond(200)
+
+        assert_that(responses, has_length(1))
+        assert_that(http_client.pending, has_length(1))
+        assert_that(limiter.in_flight('example.com'), is_(1))
+
+    def test_when_host_is_overloaded_then_decreases_limit(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=4)
+        session = Session(http_client, limiter=limiter)
+
+        session.fetch('http://example.com/users', callback=lambda response: None)
+        http_client.respond(503)
+
+        assert_that(limiter.limit('example.com'), is_(2))
+
+    def test_when_response_has_request_time_then_releases_with_it_as_latency(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=4)
+        session = Session(http_client, limiter=limiter)
+
+        for wait in (0, 0.03):
+            session.fetch('http://example.com/users', callback=lambda response: None)
+            request, callback = http_client.pending.pop()
+            time.sleep(wait)
+            callback(httpclient.HTTPResponse(request, 200, request_time=0.01))
+
+        assert_that(limiter.limit('example.com'), is_(4))
+
+    def test_when_deadline_expired_before_sending_then_does_not_decrease_limit(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=4)
+        session = Session(http_client, limiter=limiter)
+        responses = []
+
+        session.fetch('http://example.com/users', callback=responses.append,
+                      deadline=Deadline(0))
+
+        assert_that(responses[0].error, instance_of(errors.DeadlineExceeded))
+        assert_that(limiter.limit('example.com'), is_(4))
+        assert_that(limiter.in_flight('example.com'), is_(0))
+
+
+class TestSessionWithCancellation(object):
+    def test_when_cancelled_in_flight_then_runs_callback_with_cancelled_error(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+        deadline = Deadline()
+        responses = []
+
+        session.fetch('/users', callback=responses.append, deadline=deadline)
+        deadline.cancel()
+
+        assert_that(responses, contains(has_properties(
+            code=599, error=instance_of(errors.Cancelled))))
+
+        http_client.respond(200)
+
+        assert_that(responses, has_length(1))
+
+    def test_when_streamed_request_cancelled_in_flight_then_aborts_transfer(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+        deadline = Deadline()
+        chunks = []
+
+        session.fetch('/users', callback=lambda response: None, deadline=deadline,
+                      streaming_callback=chunks.append)
+        streaming_callback = http_client.pending[0][0].streaming_callback
+        streaming_callback(b'[')
+        deadline.cancel()
+
+        assert_that(calling(streaming_callback).with_args(b'1'),
+                    raises(errors.Cancelled))
+        assert_that(chunks, contains(b'['))
+
+    def test_when_request_has_deadline_then_does_not_stream_response(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+
+        session.fetch('/users', callback=lambda response: None, deadline=Deadline())
+
+        assert_that(http_client.pending[0][0].streaming_callback, is_(None))
+
+    def test_when_cancelled_in_flight_then_releases_pool_connection(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        pool = ConnectionPool(max_host_connections=1)
+        session = _pooled(http_client, pool)
+        deadline = Deadline()
+
+        session.fetch('http://example.com/users', callback=lambda response: None,
+                      deadline=deadline)
+        session.fetch('http://example.com/users/1', callback=lambda response: None)
+        deadline.cancel()
+
+        assert_that(pool.pending('example.com'), is_(0))
+        assert_that(http_client.pending, has_length(2))
+
+    def test_when_cancelled_in_flight_then_releases_limiter_slot(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=1)
+        session = Session(http_client, limiter=limiter)
+        deadline = Deadline()
+
+        session.fetch('http://example.com/users', callback=lambda response: None,
+                      deadline=deadline)
+        deadline.cancel()
+
+        assert_that(limiter.in_flight('example.com'), is_(0))
+
+        http_client.respond(200)
+
+        assert_that(limiter.in_flight('example.com'), is_(0))
+
+    def test_when_cancelled_while_queued_then_removes_it_from_pool_queue(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        pool = ConnectionPool(max_host_connections=1)
+        session = _pooled(http_client, pool)
+        deadline = Deadline()
+        responses = []
+
+        session.fetch('http://example.com/users', callback=lambda response: None)
+        session.fetch('http://example.com/users/1', callback=responses.append,
+                      deadline=deadline)
+        deadline.cancel()
+
+        assert_that(pool.pending('example.com'), is_(0))
+        assert_that(responses, contains(has_property('error', instance_of(errors.Cancelled))))
+
+        http_client.respond(200)
+
+        assert_that(http_client.pending, is_(empty()))
+
+    def test_when_cancelled_while_queued_then_removes_it_from_limiter_queue(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        limiter = AdaptiveLimiter(initial_limit=1)
+        session = Session(http_client, limiter=limiter)
+        deadline = Deadline()
+
+        session.fetch('http://example.com/users', callback=lambda response: None)
+        session.fetch('http://example.com/users/1', callback=lambda response: None,
+                      deadline=deadline)
+        deadline.cancel()
+        http_client.respond(200)
+
+        assert_that(limiter.pending('example.com'), is_(0))
+        assert_that(limiter.in_flight('example.com'), is_(0))
+        assert_that(http_client.pending, is_(empty()))
+
+    def test_when_cancelled_before_fetching_then_does_not_fetch(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        session = Session(http_client)
+        deadline = Deadline()
+        responses = []
+
+        deadline.cancel()
+        session.fetch('/users', callback=responses.append, deadline=deadline)
+
+        assert_that(http_client.pending, is_(empty()))
+        assert_that(responses, contains(has_property('error', instance_of(errors.Cancelled))))
+
+
+class TestSessionWithMaxBodySize(object):
+    def test_when_body_over_max_size_then_aborts_transfer(self):
+        session = Session(self.http_client, max_body_size=4)
+
+        session.fetch('/users', callback=CALLBACK)
+        streaming_callback = self.http_client.pending[0][0].streaming_callback
+        streaming_callback(b'[1, ')
+
+        assert_that(calling(streaming_callback).with_args(b'2]'),
+                    raises(errors.BodyTooLarge))
+
+    def test_when_aborted_for_size_then_runs_callback_with_body_too_large(self):
+        session = Session(self.http_client, max_body_size=4)
+        responses = []
+
+        session.fetch('/users', callback=responses.append)
+        request, callback = self.http_client.pending.pop()
+
+        try:
+            request.streaming_callback(b'[1, 2]')
+        except errors.BodyTooLarge:
+            callback(httpclient.HTTPResponse(request, 599, error=IOError('closed')))
+
+        assert_that(responses, contains(has_properties(
+            code=599, error=instance_of(errors.BodyTooLarge))))
+
+    def test_when_content_length_over_max_size_then_aborts_on_headers(self):
+        session = Session(self.http_client, max_body_size=4)
+
+        session.fetch('/users', callback=CALLBACK)
+        header_callback = self.http_client.pending[0][0].header_callback
+        header_callback('HTTP/1.1 200 OK\r\n')
+
+        assert_that(calling(header_callback).with_args('Content-Length: 6\r\n'),
+                    raises(errors.BodyTooLarge))
+
+    def test_when_fetch_has_max_body_size_then_overrides_session_one(self):
+        session = Session(self.http_client, max_body_size=4)
+
+        session.fetch('/users', callback=CALLBACK, max_body_size=8)
+        streaming_callback = self.http_client.pending[0][0].streaming_callback
+
+        streaming_callback(b'[1, 2]')
+
+    def test_when_fetch_has_zero_max_body_size_then_overrides_session_one(self):
+        session = Session(self.http_client, max_body_size=4)
+
+        session.fetch('/users', callback=CALLBACK, max_body_size=0)
+        streaming_callback = self.http_client.pending[0][0].streaming_callback
+
+        assert_that(calling(streaming_callback).with_args(b'['),
+                    raises(errors.BodyTooLarge))
+
+    def test_when_aborted_for_size_then_tornado_does_not_log_it(self):
+        session = Session(self.http_client, max_body_size=4)
+        logger = logging.getLogger('tornado.application')
+
+        session.fetch('/users', callback=CALLBACK)
+        streaming_callback = self.http_client.pending[0][0].streaming_callback
+
+        try:
+            streaming_callback(b'[1, 2]')
+        except errors.BodyTooLarge:
+            aborted = self._record(logger)
+
+        try:
+            raise ValueError()
+        except ValueError:
+            other = self._record(logger)
+
+        assert_that(bool(logger.filter(aborted)), is_(False))
+        assert_that(bool(logger.filter(other)), is_(True))
+
+    def _record(self, logger):
+        return logger.makeRecord(logger.name, logging.ERROR, __file__, 0,
+                                 'Uncaught exception', (), sys.exc_info())
+
+    def test_when_body_under_max_size_then_runs_callback_with_entire_body(self):
+        session = Session(self.http_client, max_body_size=8)
+        responses = []
+
+        session.fetch('/users', callback=responses.append)
+        request, callback = self.http_client.pending.pop()
+        request.streaming_callback(b'[1, 2]')
+        callback(httpclient.HTTPResponse(request, 200, buffer=BytesIO()))
+
+        assert_that(responses[0].body, is_(b'[1, 2]'))
+
+    def test_when_request_has_streaming_callback_then_does_not_limit_it(self):
+        session = Session(self.http_client, max_body_size=4)
+        chunks = []
+
+        session.fetch('/users', callback=CALLBACK, streaming_callback=chunks.append)
+        self.http_client.pending[0][0].streaming_callback(b'[1, 2]')
+
+        assert_that(chunks, contains(b'[1, 2]'))
+
+    def test_when_body_over_spool_threshold_then_spools_it_to_file(self):
+        session = Session(self.http_client, spool_threshold=4)
+        responses = []
+
+        session.fetch('/users', callback=responses.append)
+        request, callback = self.http_client.pending.pop()
+        request.streaming_callback(b'[1, ')
+        request.streaming_callback(b'2]')
+        callback(httpclient.HTTPResponse(request, 200, buffer=BytesIO()))
+
+        assert_that(responses[0].buffer.spooled, is_(True))
+        assert_that(responses[0].body, is_(b'[1, 2]'))
+
+    def setup_method(self, method):
+        self.http_client = fake_httpclient.DeferredHTTPClient()
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from http.client import OK, INTERNAL_SERVER_ERROR
+except ImportError:
+    from httplib import OK, INTERNAL_SERVER_ERROR
+
+from booby import Model, fields
+from tornado import escape, httpclient
+from hamcrest import *
+
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import errors, Collection, Session
+from finch.sync import Mirror
+
+
+class TestMirror(AsyncTestCase):
+    def test_when_first_refresh_then_fetches_entire_collection(self):
+        self.client.next_response = OK, self.json_collection
+
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(not error)
+        assert_that(self.client.last_request.params, is_(None))
+        assert_that(items, has_entries({
+            1: has_properties(id=1, name=u'Foo'),
+            2: has_properties(id=2, name=u'Jack')
+        }))
+
+    def test_when_refreshed_then_sends_high_water_mark_as_query_param(self):
+        self.client.next_response = OK, self.json_collection
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        self.client.next_response = OK, escape.json_encode([])
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        assert_that(self.client.last_request.params,
+                    is_({'updated_since': u'2014-01-02'}))
+
+    def test_when_refreshed_then_merges_changes_into_items(self):
+        self.client.next_response = OK, self.json_collection
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        self.client.next_response = OK, escape.json_encode([
+            {'id': 2, 'name': 'Jack Sparrow', 'updated_at': '2014-01-03'},
+            {'id': 3, 'name': 'Bar', 'updated_at': '2014-01-04'}
+        ])
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(not error)
+        assert_that(items, has_entries({
+            1: has_properties(name=u'Foo'),
+            2: has_properties(name=u'Jack Sparrow'),
+            3: has_properties(name=u'Bar', _persisted=True)
+        }))
+        assert_that(self.mirror.mark, is_(u'2014-01-04'))
+
+    def test_when_refresh_returns_tombstones_then_removes_items(self):
+        self.client.next_response = OK, self.json_collection
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        self.client.next_response = OK, escape.json_encode([
+            {'id': 1, 'deleted': True, 'updated_at': '2014-01-03'}
+        ])
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(not error)
+        assert_that(items, is_not(has_key(1)))
+        assert_that(self.mirror.tombstones, has_entry(1, u'2014-01-03'))
+
+    def test_when_cursor_header_then_uses_it_as_high_water_mark(self):
+        self.mirror = Mirror(self.collection, since_param='cursor',
+                             cursor_header='X-Cursor')
+        self.client.next_response = OK, self.json_collection, {'X-Cursor': 'abc'}
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        self.client.next_response = OK, escape.json_encode([])
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        assert_that(self.client.last_request.params, is_({'cursor': 'abc'}))
+
+    def test_when_response_is_error_then_keeps_high_water_mark(self):
+        self.client.next_response = OK, self.json_collection
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        self.client.next_response = INTERNAL_SERVER_ERROR, 'Internal Server Error'
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(not items)
+        assert_that(error, instance_of(errors.HTTPError))
+        assert_that(self.mirror.mark, is_(u'2014-01-02'))
+        assert_that(self.mirror.items, has_length(2))
+
+    def test_when_delta_is_paginated_then_applies_every_page(self):
+        self.collection = PaginatedUsers(self.client)
+        self.mirror = Mirror(self.collection)
+        self.client.queue_responses(
+            (OK, escape.json_encode([{'id': 1, 'name': 'Foo', 'updated_at': '2014-01-01'}]),
+             {'Link': '/users?page=2'}),
+            (OK, escape.json_encode([{'id': 2, 'name': 'Jack', 'updated_at': '2014-01-02'}])))
+
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(self.client.last_request.url, is_('/users?page=2'))
+        assert_that(items, has_length(2))
+        assert_that(self.mirror.mark, is_(u'2014-01-02'))
+
+    def test_when_a_page_fails_then_keeps_items_and_high_water_mark(self):
+        self.collection = PaginatedUsers(self.client)
+        self.mirror = Mirror(self.collection)
+        self.client.queue_responses(
+            (OK, escape.json_encode([{'id': 1, 'name': 'Foo', 'updated_at': '2014-01-01'}]),
+             {'Link': '/users?page=2'}),
+            (INTERNAL_SERVER_ERROR, 'Internal Server Error'))
+
+        self.mirror.refresh(self.stop)
+        items, error = self.wait()
+
+        assert_that(error, instance_of(errors.HTTPError))
+        assert_that(self.mirror.items, is_({}))
+        assert_that(self.mirror.mark, is_(None))
+
+    def test_when_collection_has_max_body_size_then_refreshes_with_it(self):
+        http_client = fake_httpclient.DeferredHTTPClient()
+        self.collection = Users(Session(http_client))
+        self.collection.max_body_size = 4
+        self.mirror = Mirror(self.collection)
+        results = []
+
+        self.mirror.refresh(lambda *args: results.append(args))
+        request, callback = http_client.pending.pop()
+
+        try:
+            request.streaming_callback(self.json_collection)
+        except errors.BodyTooLarge:
+            callback(httpclient.HTTPResponse(request, 599, error=IOError('closed')))
+
+        assert_that(results, contains(
+            contains(None, instance_of(errors.BodyTooLarge))))
+        assert_that(self.mirror.items, is_({}))
+
+    def test_when_delta_is_paginated_then_fetches_every_page_with_max_body_size(self):
+        self.collection = PaginatedUsers(self.client)
+        self.collection.max_body_size = 1024
+        self.mirror = Mirror(self.collection)
+        self.client.queue_responses(
+            (OK, escape.json_encode([]), {'Link': '/users?page=2'}),
+            (OK, escape.json_encode([])))
+
+        self.mirror.refresh(self.stop)
+        self.wait()
+
+        assert_that(self.client.requests, only_contains(has_property(
+            'options', has_entry('max_body_size', 1024))))
+
+    def setup(self):
+        self.client = fake_httpclient.HTTPClient()
+        self.collection = Users(self.client)
+        self.mirror = Mirror(self.collection)
+
+        self.json_collection = escape.json_encode([
+            {'id': 1, 'name': 'Foo', 'updated_at': '2014-01-01'},
+            {'id': 2, 'name': 'Jack', 'updated_at': '2014-01-02'}
+        ])
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+    updated_at = fields.String()
+
+
+class Users(Collection):
+    model = User
+    url = '/users'
+
+
+class PaginatedUsers(Users):
+    def next_page(self, response):
+        return response.headers.get('Link')
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from http.client import OK, SERVICE_UNAVAILABLE
+except ImportError:
+    from httplib import OK, SERVICE_UNAVAILABLE
+
+from booby import Model, fields
+from tornado import escape
+from hamcrest import *
+
+from tests.unit import AsyncTestCase, fake_httpclient
+
+from finch import errors, Collection
+from finch.watch import Watch, _EventParser
+
+
+class TestServerSentEventsWatch(AsyncTestCase):
+    def test_when_watching_then_requests_event_stream(self):
+        self.collection.watch(self.changes.append)
+
+        request = self.client.requests[0]
+
+        assert_that(request.url, is_('/users/changes'))
+        assert_that(request.headers, has_entry('Accept', 'text/event-stream'))
+        assert_that(request.options, has_key('streaming_callback'))
+
+    def test_when_events_arrive_then_runs_callback_with_changes(self):
+        self.collection.watch(self.on_change)
+
+        self.stream(b'event: create\ndata: {"id": 1, "name": "Foo"}\n\n'
+                    b'event: delete\ndata: {"id": 2}\n\n')
+
+        assert_that(self.changes, contains(
+            has_properties(action='create', obj=has_properties(id=1, name=u'Foo')),
+            has_properties(action='delete', obj=has_properties(id=2))))
+
+    def test_when_event_is_split_across_chunks_then_runs_callback_once_complete(self):
+        self.collection.watch(self.on_change)
+
+        self.stream(b'event: update\r\ndata: {"id": 1,\r')
+
+        assert_that(self.changes, is_(empty()))
+
+        self.stream(b'\ndata:  "name": "Foo"}\r\n\r\n')
+
+        assert_that(self.changes, contains(
+            has_properties(action='update', obj=has_properties(id=1, name=u'Foo'))))
+
+    def test_when_event_type_is_unknown_then_ignores_it(self):
+        self.collection.watch(self.on_change)
+
+        self.stream(b': keep-alive\n\ndata: hello\n\n')
+
+        assert_that(self.changes, is_(empty()))
+        assert_that(self.errors, is_(empty()))
+
+    def test_when_stream_ends_then_reconnects_with_last_event_id(self):
+        self.collection.watch(self.on_change, retry=0.01)
+        self.stream(b'id: 42\nevent: update\ndata: {"id": 1}\n\n')
+        self.client.respond(OK)
+
+        self.wait_for(0.05)
+
+        assert_that(self.client.requests, has_length(2))
+        assert_that(self.client.requests[1].headers, has_entry('Last-Event-ID', '42'))
+
+    def test_when_server_sends_retry_then_uses_it_as_reconnection_delay(self):
+        watch = self.collection.watch(self.on_change)
+        self.stream(b'retry: 10\n\n')
+
+        assert_that(watch.retry, is_(0.01))
+
+    def test_when_connection_fails_then_runs_callback_with_error_and_backs_off(self):
+        self.collection.watch(self.on_change, retry=0.02)
+
+        self.client.respond(SERVICE_UNAVAILABLE)
+        self.wait_for(0.03)
+        self.client.respond(SERVICE_UNAVAILABLE)
+        self.wait_for(0.02)
+
+        assert_that(self.errors, contains(
+            instance_of(errors.HTTPError), instance_of(errors.HTTPError)))
+        assert_that(self.client.requests, has_length(2))
+
+        self.wait_for(0.04)
+
+        assert_that(self.client.requests, has_length(3))
+
+    def test_when_stopped_then_does_not_reconnect(self):
+        watch = self.collection.watch(self.on_change, retry=0.01)
+        watch.stop()
+        self.client.respond(OK)
+
+        self.wait_for(0.03)
+
+        assert_that(self.client.requests, has_length(1))
+
+    def test_when_stopped_then_cancels_connection_in_flight(self):
+        watch = self.collection.watch(self.on_change)
+
+        watch.stop()
+
+        assert_that(self.client.requests[0].options['deadline'].cancelled, is_(True))
+
+    def test_when_collection_has_max_body_size_then_stream_is_not_limited(self):
+        self.collection.max_body_size = 1024
+
+        self.collection.watch(self.changes.append)
+
+        assert_that(self.client.requests[0].options, is_not(has_key('max_body_size')))
+
+    def test_when_watching_then_stream_has_no_request_timeout(self):
+        self.collection.watch(self.on_change)
+
+        assert_that(self.client.requests[0].options['request_timeout'], is_(0))
+
+    def test_when_stream_is_idle_for_timeout_then_reconnects_without_error(self):
+        self.collection.watch(self.on_change, timeout=0.02, retry=0)
+
+        self.wait_for(0.05)
+
+        assert_that(self.client.requests, has_length(greater_than(1)))
+        assert_that(self.client.requests[0].options['deadline'].cancelled, is_(True))
+        assert_that(self.errors, is_(empty()))
+
+    def test_when_heartbeats_arrive_then_keeps_stream_open(self):
+        self.collection.watch(self.on_change, timeout=0.03, retry=0)
+
+        for _ in range(3):
+            self.wait_for(0.015)
+            self.stream(b': heartbeat\n')
+
+        assert_that(self.client.requests, has_length(1))
+
+    def stream(self, chunk):
+        self.client.requests[-1].options['streaming_callback'](chunk)
+
+    def wait_for(self, seconds):
+        self.io_loop.add_timeout(self.io_loop.time() + seconds, self.stop)
+        self.wait()
+
+    def on_change(self, change, error):
+        if error is not None:
+            self.errors.append(error)
+        else:
+            self.changes.append(change)
+
+    def setup(self):
+        self.client = fake_httpclient.DeferredHTTPClient()
+        self.collection = Users(self.client)
+        self.changes = []
+        self.errors = []
+
+
+class TestLongPollWatch(AsyncTestCase):
+    def test_when_response_has_events_then_runs_callback_with_changes_and_polls_again(self):
+        watch = self.collection.watch(self.on_change, mode='long-poll')
+
+        self.client.respond(OK, escape.json_encode([
+            {'event': 'update', 'data': {'id': 1, 'name': 'Foo'}, 'id': '7'}]))
+        self.io_loop.add_callback(self.stop)
+        self.wait()
+
+        assert_that(self.changes, contains(has_properties(action='update')))
+        assert_that(self.client.requests, has_length(2))
+        assert_that(self.client.requests[1].headers, has_entry('Last-Event-ID', '7'))
+
+    def test_when_collection_has_max_body_size_then_polls_with_it(self):
+        self.collection.max_body_size = 1024
+
+        self.collection.watch(self.on_change, mode='long-poll')
+
+        assert_that(self.client.requests[0].options, has_entry('max_body_size', 1024))
+
+    def test_when_polling_then_request_has_timeout(self):
+        self.collection.watch(self.on_change, mode='long-poll', timeout=30)
+
+        assert_that(self.client.requests[0].options['request_timeout'], is_(30))
+
+    def test_when_response_is_not_a_json_array_then_runs_callback_with_error(self):
+        self.collection.watch(self.on_change, mode='long-poll')
+
+        self.client.respond(OK, '{}')
+
+        assert_that(self.errors, contains(instance_of(ValueError)))
+
+    def on_change(self, change, error):
+        if error is not None:
+            self.errors.append(error)
+        else:
+            self.changes.append(change)
+
+    def setup(self):
+        self.client = fake_httpclient.DeferredHTTPClient()
+        self.collection = Users(self.client)
+        self.changes = []
+        self.errors = []
+
+
+class TestWatch(object):
+    def test_when_unknown_mode_then_raises_value_error(self):
+        assert_that(calling(Watch).with_args(Users(None), mode='poll'),
+                    raises(ValueError))
+
+
+class TestEventParser(object):
+    def test_when_event_has_multiple_data_lines_then_joins_them(self):
+        parser = _EventParser()
+
+        events = parser.feed(b'data: a\ndata: b\n\n')
+
+        assert_that(events, contains(has_entries(event='message', data='a\nb')))
+
+    def test_when_line_is_split_across_many_chunks_then_parses_it_once_complete(self):
+        parser = _EventParser()
+
+        for char in 'data: abc':
+            assert_that(parser.feed(char.encode('utf-8')), is_(empty()))
+
+        events = parser.feed(b'\r') + parser.feed(b'\n\n')
+
+        assert_that(events, contains(has_entries(data='abc')))
+
+    def test_when_line_ends_with_cr_then_next_chunk_starts_a_new_line(self):
+        parser = _EventParser()
+
+        events = parser.feed(b'data: a\r') + parser.feed(b'data: b\r\r\n')
+
+        assert_that(events, contains(has_entries(data='a\nb')))
+
+    def test_when_multibyte_character_is_split_then_decodes_it(self):
+        parser = _EventParser()
+        chunk = u'data: é\n\n'.encode('utf-8')
+
+        events = parser.feed(chunk[:7]) + parser.feed(chunk[7:])
+
+        assert_that(events, contains(has_entries(data=u'é')))
+
+
+class User(Model):
+    id = fields.Integer(primary=True)
+    name = fields.String()
+
+
+class Users(Collection):
+    model = User
+    url = '/users'
+    watch_url = '/users/changes'